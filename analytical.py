@@ -0,0 +1,278 @@
+import math
+
+import yaml
+
+# Число итераций бисекции для квантилей: точность ~1e-9 от диапазона
+_BISECTION_STEPS = 30
+# Хвосты меньше этого — остатки арифметики (exp от большого отрицательного), а не вероятность
+_TAIL_EPSILON = 1e-15
+
+
+def finite_source_wait(users, source_rate, mean_service, servers):
+    """Ожидание в очереди M/M/c//N (модель «ремонтника»): N источников, c серверов.
+
+    Каждый из users источников обращается к серверу с интенсивностью source_rate,
+    пока не ждет ответа. По теореме о прибытии входящая заявка видит стационарное
+    распределение системы с users - 1 источниками; если перед ней k = n - c + 1
+    обслуживаний, ожидание — сумма k экспонент с интенсивностью c / mean_service.
+    Возвращает (вероятность ожидания, среднее и дисперсию ожидания при условии ожидания).
+    """
+    if users <= 1 and servers >= 1 or source_rate <= 0 or mean_service <= 0:
+        return 0.0, 0.0, 0.0
+
+    # p_n ∝ p_{n-1} * (sources - n + 1) * ratio / min(n, c); нормировка по ходу
+    sources = users - 1
+    ratio = source_rate * mean_service
+    probs = [1.0]
+    for n in range(1, sources + 1):
+        probs.append(probs[-1] * (sources - n + 1) * ratio / min(n, servers))
+        if probs[-1] > 1e200:
+            probs = [p / 1e200 for p in probs]
+    total = sum(probs)
+
+    waiting = probs[servers:]
+    prob_wait = sum(waiting) / total
+    if prob_wait == 0:
+        return 0.0, 0.0, 0.0
+    weight = sum(waiting)
+    k_mean = sum(p * (i + 1) for i, p in enumerate(waiting)) / weight
+    k_second = sum(p * (i + 1) ** 2 for i, p in enumerate(waiting)) / weight
+    stage = mean_service / servers
+    cond_mean = k_mean * stage
+    # Var = E[K] * stage^2 (внутри Эрланга) + Var[K] * stage^2 (разброс числа этапов)
+    cond_var = (k_mean + k_second - k_mean * k_mean) * stage * stage
+    return prob_wait, cond_mean, cond_var
+
+
+def _uniform_tail_integral(a, m):
+    # ∫_0^a P(X > t) dt, X ~ U(0, m)
+    if a <= 0:
+        return 0.0
+    if m <= 0:
+        return 0.0
+    return m / 2 if a >= m else a - a * a / (2 * m)
+
+
+def _excess_tail(u, m, theta):
+    # P(E + X > u) - P(X > u), E ~ Exp(theta), X ~ U(0, m), u >= 0
+    if m <= 0:
+        return math.exp(-theta * u)
+    return (math.exp(-theta * max(0.0, u - m)) - math.exp(-theta * u)) / (m * theta)
+
+
+def _excess_integral(a, m, theta):
+    # ∫_0^a _excess_tail(u) du
+    if a <= 0:
+        return 0.0
+    if m <= 0:
+        return (1 - math.exp(-theta * a)) / theta
+    first = min(a, m)
+    if a > m:
+        first += (1 - math.exp(-theta * (a - m))) / theta
+    second = (1 - math.exp(-theta * a)) / theta
+    return (first - second) / (m * theta)
+
+
+class _Queue:
+    """Время ответа S: ожидание W плюс обслуживание X ~ U(0, m).
+
+    W = 0 с вероятностью 1 - C, иначе W = shift + Exp(θ) — сдвинутая
+    экспонента, подобранная по среднему и дисперсии ожидания.
+    """
+
+    def __init__(self, prob_wait, cond_mean, cond_var):
+        self.prob_wait = prob_wait if cond_mean > 0 else 0.0
+        self.mean_wait = self.prob_wait * cond_mean
+        if self.prob_wait > 0:
+            std = min(math.sqrt(cond_var), cond_mean) if cond_var > 0 else cond_mean
+            self.theta = 1 / std
+            self.shift = cond_mean - std
+        else:
+            self.theta = math.inf
+            self.shift = 0.0
+
+    def tail(self, t, m):
+        """P(W + X > t) — время ответа S с ожиданием в очереди."""
+        if t < 0:
+            return 1.0
+        p = max(0.0, 1 - t / m) if m > 0 else 0.0
+        if self.prob_wait == 0:
+            return p
+        u = t - self.shift
+        waited = 1.0 if u < 0 else (max(0.0, 1 - u / m) if m > 0 else 0.0) + _excess_tail(
+            u, m, self.theta
+        )
+        tail = (1 - self.prob_wait) * p + self.prob_wait * waited
+        return tail if tail > _TAIL_EPSILON else 0.0
+
+    def capped_mean(self, m, cap):
+        """E[min(W + X, cap)] — среднее время ответа S с учетом таймаута Q."""
+        head = _uniform_tail_integral(cap, m)
+        if self.prob_wait == 0:
+            return head
+        rest = cap - self.shift
+        waited = min(cap, self.shift) + _uniform_tail_integral(rest, m)
+        waited += _excess_integral(rest, m, self.theta)
+        return (1 - self.prob_wait) * head + self.prob_wait * waited
+
+
+def _mix_moments(f_w, m_w, f_r, m_r):
+    # Первые два момента времени обслуживания S: смесь U(0, m_w) и U(0, m_r)
+    f = f_w + f_r
+    mean = (f_w * m_w / 2 + f_r * m_r / 2) / f
+    second = (f_w * m_w * m_w / 3 + f_r * m_r * m_r / 3) / f
+    scv = second / (mean * mean) - 1 if mean > 0 else 0.0
+    return mean, scv
+
+
+def run_analytical(config):
+    """Приближенная оценка метрик без дискретно-событийной симуляции.
+
+    Путь записи T->S и путь чтения с откатом на S моделируются как одна очередь
+    M/G/c с concurrency_limit серверами и равномерными временами обслуживания.
+    P — замкнутая система из num_users источников (следующий запрос уходит
+    после ответа на предыдущий), поэтому используется очередь с конечным числом
+    источников M/M/c//N, ожидание в которой масштабируется на (1 + Cs²) / 2
+    (поправка Аллена — Каннина на неэкспоненциальное обслуживание) и
+    ограничивается снизу законом узкого места.
+    Ключи результата совпадают с ключами сводки run_simulation там, где это возможно.
+    """
+    p_cfg, s_cfg, t_cfg = config["P"], config["S"], config["T"]
+    users = p_cfg.get("num_users", 1)
+    think = p_cfg["mean_interarrival"]
+    p_read = p_cfg["read_probability"]
+    timeout = config["Q"]["response_timeout"]
+    servers = s_cfg["concurrency_limit"]
+    m_w, m_r = s_cfg["max_write_time"], s_cfg["max_read_time"]
+
+    # Доли запросов, которые доходят до S
+    f_w = (1 - p_read) * (1 - t_cfg["write_failure_probability"])
+    f_r = p_read * t_cfg["read_failure_probability"]
+    f_s = f_w + f_r
+
+    if f_s > 0:
+        mean_service, scv = _mix_moments(f_w, m_w, f_r, m_r)
+        # Между обращениями к S пользователь в среднем проводит think / f_s
+        # (запросы, обслуженные T, мгновенны)
+        source_rate = f_s / think if think > 0 else math.inf
+        prob_wait, cond_mean, cond_var = finite_source_wait(
+            users, source_rate, mean_service, servers
+        )
+        factor = (1 + scv) / 2
+        cond_mean, cond_var = cond_mean * factor, cond_var * factor * factor
+        # Закон узкого места: при полной загрузке S пропускная способность не выше
+        # c / (f_s * E[X]), значит среднее ожидание не меньше, чем требует этот предел
+        bound_wait = users * mean_service / servers - think / f_s - mean_service
+        if prob_wait > 0 and prob_wait * cond_mean < bound_wait:
+            cond_mean = bound_wait / prob_wait
+        queue = _Queue(prob_wait, cond_mean, cond_var)
+        latency = f_w * queue.capped_mean(m_w, timeout) + f_r * queue.capped_mean(
+            m_r, timeout
+        )
+    else:
+        mean_service = 0.0
+        queue = _Queue(0.0, 0.0, 0.0)
+        latency = 0.0
+
+    # Закон Литтла для цикла пользователя: «думает» think, затем ждет ответа
+    cycle = think + latency
+    rate = users / cycle if cycle > 0 else math.inf
+    utilization = min(1.0, rate * f_s * mean_service / servers)
+
+    def tail(t):
+        # P(latency > t); запросы, обслуженные T, имеют нулевую латентность
+        if t >= timeout or f_s == 0:
+            return 0.0
+        return f_w * queue.tail(t, m_w) + f_r * queue.tail(t, m_r)
+
+    def quantile(q):
+        target = 1 - q
+        if tail(0.0) <= target:
+            return 0.0
+        low, high = 0.0, timeout
+        if math.isinf(high):
+            high = max(m_w, m_r) + queue.shift
+            if queue.prob_wait:
+                high += 40 / queue.theta
+        for _ in range(_BISECTION_STEPS):
+            mid = (low + high) / 2
+            if tail(mid) > target:
+                low = mid
+            else:
+                high = mid
+        return high
+
+    # Вероятность, что обращение к S не уложится в таймаут Q
+    timeout_w = queue.tail(timeout, m_w) if f_s and not math.isinf(timeout) else 0.0
+    timeout_r = queue.tail(timeout, m_r) if f_s and not math.isinf(timeout) else 0.0
+    error_rate = (1 - p_read) * t_cfg["write_failure_probability"]
+    error_rate += f_w * (timeout_w + (1 - timeout_w) * s_cfg["write_failure_probability"])
+    error_rate += f_r * (timeout_r + (1 - timeout_r) * s_cfg["read_failure_probability"])
+
+    return {
+        "throughput": rate,
+        "s_arrival_rate": rate * f_s,
+        "utilization": utilization,
+        "prob_wait": queue.prob_wait,
+        "avg_time": latency,
+        "p50": quantile(0.5),
+        "p95": quantile(0.95),
+        "p99": quantile(0.99),
+        "error_rate": error_rate,
+    }
+
+
+# Метрики, которые сравнивает validate_analytical
+VALIDATED_METRICS = ("throughput", "avg_time", "p99", "error_rate")
+
+
+def validate_analytical(
+    configs, replications=3, workers=None, tolerance=0.15, absolute_floor=0.01
+):
+    """Сравнивает run_analytical с run_simulation и помечает точки, где приближение ломается.
+
+    Для каждой точки считается относительная ошибка по VALIDATED_METRICS
+    (разница меньше absolute_floor не считается ошибкой); точка помечается
+    флагом "ok": False, если хотя бы одна ошибка больше tolerance.
+    """
+    from replications import run_replications
+
+    rows = []
+    for config in configs:
+        estimate = run_analytical(config)
+        result = run_replications(
+            config,
+            replications,
+            workers=workers,
+            metrics=("successes", "errors", "throughput", "avg_time", "p99"),
+        )
+        measured = {name: stats["mean"] for name, stats in result["metrics"].items()}
+        total = measured["successes"] + measured["errors"]
+        measured["error_rate"] = measured["errors"] / total if total else 0.0
+
+        errors = {}
+        for name in VALIDATED_METRICS:
+            diff = abs(estimate[name] - measured[name])
+            scale = max(abs(measured[name]), 1e-12)
+            errors[name] = 0.0 if diff < absolute_floor else diff / scale
+
+        rows.append(
+            {
+                "config": config,
+                "analytical": estimate,
+                "simulation": {name: measured[name] for name in VALIDATED_METRICS},
+                "relative_error": errors,
+                "ok": all(err <= tolerance for err in errors.values()),
+            }
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+
+    estimate = run_analytical(config)
+    print("Analytical estimate:")
+    for key, value in estimate.items():
+        print(f"{key}: {value}")
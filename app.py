@@ -1,4 +1,5 @@
 import copy
+import os
 
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -6,6 +7,17 @@ import streamlit as st
 import yaml
 
 from main import run_simulation
+from services.recorder import OUTCOME_ERROR, OUTCOME_OK, OUTCOME_REJECTED
+from sweep import (
+    flatten_config,
+    get_path,
+    grid_design,
+    lhs_design,
+    linspace_levels,
+    random_design,
+    run_sweep,
+    table_to_csv,
+)
 
 st.title("Микросервисная симуляция")
 
@@ -14,7 +26,7 @@ with open("config.yaml", "r") as f:
     base_config = yaml.safe_load(f)
 
 # Создадим вкладки для настроек
-tab_config, tab_scenarios = st.tabs(["Конфигурация", "Сценарии"])
+tab_config, tab_scenarios = st.tabs(["Конфигурация", "Свип параметров"])
 
 with tab_config:
     st.header("Настройка параметров")
@@ -57,6 +69,19 @@ with tab_config:
         step=1,
     )
 
+    open_loop = st.checkbox(
+        "Открытый цикл: отправлять по расписанию, не дожидаясь ответов.",
+        help="Латентность считается от запланированного момента отправки.",
+    )
+    max_in_flight = 0
+    if open_loop:
+        max_in_flight = st.number_input(
+            "Макс. незавершенных запросов на пользователя (0 — без предела).",
+            min_value=0,
+            value=0,
+            step=1,
+        )
+
     # Параметры Q
     st.subheader("Параметры Q (промежуточный сервис)")
     response_timeout = st.number_input(
@@ -66,11 +91,71 @@ with tab_config:
         value=1.0,
         step=0.1,
     )
+    q_replicas = st.number_input("Число реплик Q.", min_value=1, max_value=64, value=1)
+    q_balancer = "round_robin"
+    if q_replicas > 1:
+        q_balancer = st.selectbox(
+            "Политика балансировки.", ["round_robin", "least_outstanding", "p2c"]
+        )
+    q_concurrency = st.number_input(
+        "Одновременных запросов на реплику Q (0 — без ограничения).",
+        min_value=0,
+        value=0,
+        step=1,
+    )
+    read_through = st.checkbox("Записывать в T значения, прочитанные из S (read-through).")
+    single_flight = st.checkbox("Объединять одновременные промахи по одному ключу (single-flight).")
+    hedge_reads = st.checkbox(
+        "Hedged-чтения из S.",
+        help="Если чтение S не ответило за перцентиль латентности, отправляется второе.",
+    )
+    hedge_percentile = 0.95
+    if hedge_reads:
+        hedge_percentile = st.slider("Перцентиль задержки второго чтения.", 0.5, 0.99, 0.95, 0.01)
+    s_retry_attempts = st.number_input(
+        "Попыток обращения к S (1 — без повторов).", min_value=1, max_value=10, value=1
+    )
+    s_retry_budget = None
+    if s_retry_attempts > 1:
+        s_retry_budget = st.slider("Бюджет повторов S (доля запросов).", 0.0, 1.0, 0.1, 0.05)
+    s_breaker = st.checkbox(
+        "Автомат (circuit breaker) для S.",
+        help="Пока S отказывает, запросы к нему сразу получают ошибку, чтения идут только из T.",
+    )
+    admission_policy = st.selectbox(
+        "Контроль допуска вызовов S.",
+        ["нет", "max_in_flight", "bounded_queue", "codel", "adaptive"],
+        help="Лишние вызовы S сразу получают отказ (REJECTED), а не ждут в очереди S.",
+    )
+    admission_limit = 10
+    if admission_policy != "нет":
+        admission_limit = st.number_input(
+            "Лимит одновременных вызовов S на реплику Q.", min_value=1, value=10
+        )
+    write_policy = st.selectbox(
+        "Политика записи в S.",
+        ["write_through", "write_behind"],
+        help="write_behind подтверждает запись после T и пишет в S из фоновой очереди.",
+    )
+    flush_workers = 1
+    if write_policy == "write_behind":
+        flush_workers = st.number_input(
+            "Число фоновых процессов записи в S.", min_value=1, max_value=100, value=1
+        )
 
     # Параметры T
     st.subheader("Параметры T (кеш)")
     t_read_failure = st.slider("Вероятность отказа T при чтении.", 0.0, 1.0, 0.0, 0.05)
     t_write_failure = st.slider("Вероятность отказа T при записи.", 0.0, 1.0, 0.0, 0.05)
+    t_capacity = st.number_input(
+        "Емкость кеша T (0 — без ограничения).", min_value=0, value=0, step=1
+    )
+    t_eviction_policy = st.selectbox(
+        "Политика вытеснения T.", ["lru", "lfu", "ttl", "random"]
+    )
+    t_ttl = None
+    if t_eviction_policy == "ttl":
+        t_ttl = st.number_input("TTL значения в T.", min_value=0.01, value=10.0)
 
     # Параметры S
     st.subheader("Параметры S (постоянное хранилище)")
@@ -86,53 +171,201 @@ with tab_config:
         step=1,
     )
 
-    if st.button("Запустить симуляцию с текущими параметрами"):
-        config = copy.deepcopy(base_config)
-        config["P"]["arrival_process"] = arrival_process
-        config["P"]["mean_interarrival"] = mean_interarrival
-        config["P"]["read_probability"] = read_probability
-        config["P"]["num_requests"] = num_requests
-        config["P"]["num_users"] = num_users  # Передаем количество пользователей
-
-        config["Q"]["response_timeout"] = response_timeout
-
-        config["T"]["read_failure_probability"] = t_read_failure
-        config["T"]["write_failure_probability"] = t_write_failure
+    s_scheduler = st.selectbox(
+        "Планировщик слотов S.",
+        ["fifo", "priority", "wfq", "edf"],
+        help="priority — чтения раньше записей, wfq — справедливое деление времени слотов, "
+        "edf — раньше операция с ближайшим таймаутом Q.",
+    )
+    propagate_deadlines = st.checkbox(
+        "Передавать S дедлайны вызовов.",
+        help="S не выполняет операции, которые уже не успеют до таймаута Q.",
+    )
 
-        config["S"]["read_failure_probability"] = s_read_failure
-        config["S"]["write_failure_probability"] = s_write_failure
-        config["S"]["max_write_time"] = s_max_write_time
-        config["S"]["max_read_time"] = s_max_read_time
-        config["S"]["concurrency_limit"] = s_concurrency
+    s_autoscaling = st.checkbox(
+        "Автоскейлинг слотов S.",
+        help="Число слотов меняется во время прогона под загрузку (target tracking).",
+    )
+    s_max_capacity = 10
+    s_provisioning_delay = 1.0
+    if s_autoscaling:
+        s_max_capacity = st.number_input(
+            "Максимум слотов S.", min_value=int(s_concurrency), value=max(10, int(s_concurrency))
+        )
+        s_provisioning_delay = st.slider("Задержка появления новых слотов.", 0.0, 10.0, 1.0, 0.5)
+
+    s_shards = st.number_input(
+        "Число шардов S (консистентное хеширование).", min_value=1, max_value=64, value=1
+    )
+    s_replication = 1
+    if s_shards > 1:
+        s_replication = st.number_input(
+            "Фактор репликации S.", min_value=1, max_value=int(s_shards), value=1
+        )
+
+    config = copy.deepcopy(base_config)
+    config["P"]["arrival_process"] = arrival_process
+    config["P"]["mean_interarrival"] = mean_interarrival
+    config["P"]["read_probability"] = read_probability
+    config["P"]["num_requests"] = num_requests
+    config["P"]["num_users"] = num_users  # Передаем количество пользователей
+    config["P"]["open_loop"] = open_loop
+    config["P"]["max_in_flight"] = max_in_flight or None
+
+    config["Q"]["response_timeout"] = response_timeout
+    config["Q"]["read_through"] = read_through
+    config["Q"]["replicas"] = q_replicas
+    config["Q"]["balancer"] = q_balancer
+    config["Q"]["concurrency_limit"] = q_concurrency or None
+    config["Q"]["single_flight"] = single_flight
+    config["Q"]["hedge_reads"] = hedge_reads
+    config["Q"]["hedge_percentile"] = hedge_percentile
+    s_retry = config["Q"].setdefault("retry", {}).setdefault("S", {})
+    s_retry.update(max_attempts=s_retry_attempts, budget_ratio=s_retry_budget)
+    config["Q"].setdefault("circuit_breaker", {}).setdefault("S", {})["enabled"] = s_breaker
+    config["Q"].setdefault("admission", {}).update(
+        policy=None if admission_policy == "нет" else admission_policy,
+        limit=admission_limit,
+    )
+    config["Q"]["propagate_deadlines"] = propagate_deadlines
+    config["Q"]["write_policy"] = write_policy
+    config["Q"]["flush_workers"] = flush_workers
+
+    config["T"]["read_failure_probability"] = t_read_failure
+    config["T"]["write_failure_probability"] = t_write_failure
+    config["T"]["capacity"] = t_capacity or None
+    config["T"]["eviction_policy"] = t_eviction_policy
+    config["T"]["ttl"] = t_ttl
+
+    config["S"]["read_failure_probability"] = s_read_failure
+    config["S"]["write_failure_probability"] = s_write_failure
+    config["S"]["max_write_time"] = s_max_write_time
+    config["S"]["max_read_time"] = s_max_read_time
+    config["S"]["concurrency_limit"] = s_concurrency
+    config["S"]["scheduler"] = s_scheduler
+    config["S"].setdefault("autoscaling", {}).update(
+        enabled=s_autoscaling,
+        policy="target",
+        min_capacity=1,
+        max_capacity=s_max_capacity,
+        provisioning_delay=s_provisioning_delay,
+    )
+    config["S"]["shards"] = s_shards
+    config["S"]["replication_factor"] = s_replication
+    config["S"]["read_quorum"] = 1
+    config["S"]["write_quorum"] = None
 
+    if st.button("Запустить симуляцию с текущими параметрами"):
         summary = run_simulation(config)
 
         st.write("**Результаты симуляции:**")
         st.write(f"- Успешных запросов: {summary['successes']}")
         st.write(f"- Ошибок: {summary['errors']}")
+        if summary["rejected"]:
+            st.write(
+                f"- Отклонено контролем допуска: {summary['rejected']}, "
+                f"goodput {summary['goodput']:.2f} успешных ответов в единицу времени"
+            )
         st.write(f"- Среднее время ответа: {summary['avg_time']:.4f}")
+        if "P" in summary:
+            st.write(
+                f"- Открытый цикл: предложенная нагрузка {summary['P']['offered_load']:.2f}, "
+                f"фактическая {summary['throughput']:.2f} запросов в единицу времени, "
+                f"отложенных отправок {summary['P']['delayed_sends']}"
+            )
+        t_stats = summary["T"]
+        st.write(
+            f"- Кеш T: доля попаданий {t_stats['hit_ratio']:.3f}, "
+            f"вытеснений {t_stats['evictions']}, истекло по TTL {t_stats['expirations']}"
+        )
+        st.write(f"- Чтений, ушедших в S: {summary['s_fallback_reads']}")
+        st.write(f"- Загрузка S: {summary['s_utilization']:.3f}")
+        if "retries" in summary:
+            st.write(
+                f"- Повторов: {summary['retries']}, "
+                f"отклонено бюджетом: {summary['retry_budget_rejections']}"
+            )
+        for name, row in summary.get("breakers", {}).items():
+            st.write(
+                f"- Автомат {name}: размыкался {row['opened']} раз, "
+                f"отклонено вызовов {row['rejected']}, разомкнут {row['open_time']:.2f}"
+            )
+            if len(row["timeline"]) > 1:
+                st.dataframe(
+                    [{"время": time, "состояние": state} for time, state in row["timeline"]]
+                )
+        if "hedged_reads" in summary:
+            st.write(
+                f"- Hedged-чтения: {summary['hedged_reads']} "
+                f"(+{summary['hedge_extra_load']:.1%} чтений S), "
+                f"p99 чтения S {summary['s_read_p99']:.4f}"
+            )
+        if "replicas" in summary["Q"]:
+            st.write("- Реплики Q:")
+            st.dataframe(
+                [
+                    {
+                        "реплика": name,
+                        "запросов": row["requests"],
+                        "ошибок": row["errors"],
+                        "отклонено": row["rejected"],
+                        "среднее": row["avg_time"],
+                        "p99": row["p99"],
+                        "макс. незавершенных": row["max_outstanding"],
+                    }
+                    for name, row in summary["Q"]["replicas"].items()
+                ]
+            )
+        st.write("- Латентность S по классам (ожидание слота + обслуживание):")
+        st.dataframe(
+            [
+                {
+                    "класс": op,
+                    "операций": row["count"],
+                    "среднее": row["mean"],
+                    "p99": row["p99"],
+                    "отброшено по дедлайну": row["expired"],
+                }
+                for op, row in summary["S"]["classes"].items()
+            ]
+        )
+        for name, row in summary.get("autoscaling", {}).items():
+            st.write(
+                f"- Автоскейлинг {name}: средняя емкость {row['avg_capacity']:.2f}, "
+                f"пиковая {row['max_capacity']}, capacity-time {row['capacity_time']:.2f}"
+            )
+            # Ступенчатый график: емкость держится до следующего изменения
+            fig8, ax8 = plt.subplots(figsize=(6, 4))
+            ax8.step(
+                [time for time, _ in row["timeline"]],
+                [capacity for _, capacity in row["timeline"]],
+                where="post",
+            )
+            ax8.set_xlabel("Время")
+            ax8.set_ylabel("Слотов S")
+            st.pyplot(fig8)
+        if "hot_shards" in summary["S"]:
+            st.write(
+                f"- Шарды S: макс. загрузка {summary['s_max_utilization']:.3f}, "
+                f"дисбаланс {summary['s_imbalance']:.2f}, "
+                f"горячие: {', '.join(summary['S']['hot_shards']) or 'нет'}"
+            )
+            st.bar_chart(
+                {name: row["utilization"] for name, row in summary["S"]["shards"].items()}
+            )
+        write_behind = summary["Q"].get("write_behind")
+        if write_behind is not None:
+            st.write(
+                f"- Write-behind: потеряно записей {write_behind['lost']}, "
+                f"макс. глубина очереди {write_behind['max_depth']}, "
+                f"задержка сохранности: средняя {write_behind['lag_mean']:.4f}, "
+                f"p99 {write_behind['lag_p99']:.4f}"
+            )
 
-        details = summary.get("details", [])
-        if details:
-            # Сортируем по start_time
-            # Формат details: (req_type, req_id, result, start_time, end_time, duration)
-            sorted_details = sorted(details, key=lambda x: x[3])
-
-            time_points = []
-            errors_over_time = []
-            successes_over_time = []
-            cumulative_errors = 0
-            cumulative_success = 0
-
-            for d in sorted_details:
-                req_type, req_id, result, start_time, end_time, duration = d
-                if "ERROR" in result:
-                    cumulative_errors += 1
-                else:
-                    cumulative_success += 1
-                time_points.append(end_time)
-                errors_over_time.append(cumulative_errors)
-                successes_over_time.append(cumulative_success)
+        recorder = summary.get("details")
+        if recorder is not None and len(recorder):
+            # Все графики считаются векторно по колонкам рекордера
+            time_points, errors_over_time = recorder.cumulative_errors()
 
             # График ошибок по времени
             fig5, ax5 = plt.subplots(figsize=(6, 4))
@@ -142,10 +375,12 @@ with tab_config:
             ax5.set_ylabel("Число ошибок (накопленное)")
             st.pyplot(fig5)
 
-            # Соотношение операций read и write
-            read_count = sum(1 for d in details if d[0] == "read")
-            write_count = sum(1 for d in details if d[0] == "write")
+            # counts[op, outcome], op: 0 - read, 1 - write;
+            # outcome: 0 - OK, 1 - ERROR, 2 - REJECTED
+            counts = recorder.outcome_counts()
+            read_count, write_count = counts.sum(axis=1)
 
+            # Соотношение операций read и write
             fig6, ax6 = plt.subplots(figsize=(4, 4))
             ax6.pie(
                 [read_count, write_count], labels=["read", "write"], autopct="%1.1f%%"
@@ -154,84 +389,126 @@ with tab_config:
             st.pyplot(fig6)
 
             # Распределение успехов и ошибок по типам запросов
-            read_success = sum(
-                1 for d in details if d[0] == "read" and not d[2].startswith("ERROR")
-            )
-            read_error = sum(
-                1 for d in details if d[0] == "read" and d[2].startswith("ERROR")
-            )
-            write_success = sum(
-                1 for d in details if d[0] == "write" and not d[2].startswith("ERROR")
-            )
-            write_error = sum(
-                1 for d in details if d[0] == "write" and d[2].startswith("ERROR")
-            )
-
             fig7, ax7 = plt.subplots(figsize=(6, 4))
             ops = ["read", "write"]
-            success_values = [read_success, write_success]
-            error_values = [read_error, write_error]
+            success_values = counts[:, OUTCOME_OK]
+            error_values = counts[:, OUTCOME_ERROR]
+            rejected_values = counts[:, OUTCOME_REJECTED]
 
             ax7.bar(ops, success_values, color="green", label="Success")
             ax7.bar(
                 ops, error_values, bottom=success_values, color="red", label="Error"
             )
+            ax7.bar(
+                ops,
+                rejected_values,
+                bottom=success_values + error_values,
+                color="orange",
+                label="Rejected",
+            )
             ax7.set_title("Распределение успехов и ошибок по типам запросов")
             ax7.set_ylabel("Количество запросов")
             ax7.legend()
             st.pyplot(fig7)
 
-        # Сохраним конфиг и результаты в сессию для сценариев
-        if "scenarios" not in st.session_state:
-            st.session_state["scenarios"] = []
-        scenario_data = {
-            "config": {
-                "mean_interarrival": mean_interarrival,
-                "read_probability": read_probability,
-                "response_timeout": response_timeout,
-                "t_read_failure": t_read_failure,
-                "t_write_failure": t_write_failure,
-                "s_read_failure": s_read_failure,
-                "s_write_failure": s_write_failure,
-            },
-            "summary": summary,
-        }
-        if st.button("Сохранить этот результат как сценарий"):
-            st.session_state["scenarios"].append(scenario_data)
-            st.success("Сценарий добавлен!")
-
 with tab_scenarios:
-    st.header("Сравнение сценариев")
-    if "scenarios" not in st.session_state or not st.session_state["scenarios"]:
-        st.write("Нет сохраненных сценариев. Запустите симуляцию и сохраните сценарий.")
-    else:
-        scenarios_list = st.session_state["scenarios"]
-        st.write("Сохраненные сценарии:")
+    st.header("Свип параметров")
+    st.write(
+        "Базовый конфиг берется с вкладки «Конфигурация». Результат каждой точки "
+        "кешируется на диске, поэтому повторный свип пересчитывает только изменившиеся точки."
+    )
 
-        for i, sc in enumerate(scenarios_list):
-            st.write(
-                f"Сценарий {i+1}: mean_interarrival={sc['config']['mean_interarrival']}, "
-                f"read_prob={sc['config']['read_probability']}, timeout={sc['config']['response_timeout']}"
+    numeric_keys = [
+        key
+        for key, value in flatten_config(config).items()
+        if isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        # Seed — не параметр модели, а выбор реализации случайности
+        and key.rsplit(".", 1)[-1] != "seed"
+        and not key.endswith("_seed")
+    ]
+    sweep_keys = st.multiselect(
+        "Варьируемые параметры",
+        numeric_keys,
+        default=["P.mean_interarrival"],
+    )
+    design = st.selectbox(
+        "Дизайн эксперимента ('grid' - полный перебор, 'lhs' - латинский гиперкуб, 'random' - случайный):",
+        ["grid", "lhs", "random"],
+    )
+
+    space = {}
+    for key in sweep_keys:
+        base_value = get_path(config, key)
+        col_low, col_high = st.columns(2)
+        if key.endswith("_probability"):
+            # Вероятности — дробные и в пределах [0, 1], даже если в конфиге записан 0
+            base_value = float(base_value)
+            high_value = min(1.0, base_value * 2) if base_value > 0 else 1.0
+            low = col_low.number_input(
+                f"{key}: от", min_value=0.0, max_value=1.0, value=base_value / 2
             )
-            st.write(
-                f"  successes={sc['summary']['successes']}, errors={sc['summary']['errors']}, avg_time={sc['summary']['avg_time']:.4f}"
+            high = col_high.number_input(
+                f"{key}: до", min_value=0.0, max_value=1.0, value=high_value
             )
+        elif isinstance(base_value, int):
+            low = col_low.number_input(f"{key}: от", value=max(1, base_value // 2), step=1)
+            high = col_high.number_input(f"{key}: до", value=base_value * 2, step=1)
+        else:
+            low = col_low.number_input(f"{key}: от", value=float(base_value) / 2)
+            high = col_high.number_input(f"{key}: до", value=float(base_value) * 2)
+        space[key] = (low, high)
+
+    if design == "grid":
+        levels = st.number_input("Число уровней на параметр", min_value=2, max_value=50, value=5)
+    else:
+        num_points = st.number_input("Число точек", min_value=2, max_value=10000, value=20)
+    sweep_seed = st.number_input("Seed дизайна", min_value=0, value=0, step=1)
+    workers = st.number_input(
+        "Число процессов", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1
+    )
 
-        # График зависимости ошибок от mean_interarrival
-        x = [sc["config"]["mean_interarrival"] for sc in scenarios_list]
-        errors = [sc["summary"]["errors"] for sc in scenarios_list]
-        avg_times = [sc["summary"]["avg_time"] for sc in scenarios_list]
+    if sweep_keys and st.button("Запустить свип"):
+        if design == "grid":
+            points = grid_design(
+                {key: linspace_levels(low, high, levels) for key, (low, high) in space.items()}
+            )
+        elif design == "lhs":
+            points = lhs_design(space, num_points, seed=sweep_seed)
+        else:
+            points = random_design(space, num_points, seed=sweep_seed)
+        st.session_state["sweep_rows"] = run_sweep(config, points, workers=workers)
+
+    rows = st.session_state.get("sweep_rows")
+    if rows:
+        cached = sum(1 for row in rows if row["cached"])
+        st.write(f"Точек: {len(rows)}, взято из кеша: {cached}")
+        st.dataframe(rows)
+        st.download_button(
+            "Скачать таблицу (CSV)", table_to_csv(rows), file_name="sweep.csv", mime="text/csv"
+        )
+
+        swept = [key for key in rows[0] if key in numeric_keys]
+        x_key = st.selectbox(
+            "Ось X",
+            swept,
+            index=swept.index("P.mean_interarrival") if "P.mean_interarrival" in swept else 0,
+        )
+        sorted_rows = sorted(rows, key=lambda row: row[x_key])
+        x = [row[x_key] for row in sorted_rows]
+        errors = [row["errors"] for row in sorted_rows]
+        avg_times = [row["avg_time"] for row in sorted_rows]
 
         fig3, ax3 = plt.subplots(figsize=(6, 4))
         ax3.plot(x, errors, marker="o", color="red")
-        ax3.set_title("Зависимость числа ошибок от mean_interarrival")
-        ax3.set_xlabel("mean_interarrival")
+        ax3.set_title(f"Зависимость числа ошибок от {x_key}")
+        ax3.set_xlabel(x_key)
         ax3.set_ylabel("Ошибки")
         st.pyplot(fig3)
 
         fig4, ax4 = plt.subplots(figsize=(6, 4))
         ax4.plot(x, avg_times, marker="o", color="purple")
-        ax4.set_title("Зависимость среднего времени ответа от mean_interarrival")
-        ax4.set_xlabel("mean_interarrival")
+        ax4.set_title(f"Зависимость среднего времени ответа от {x_key}")
+        ax4.set_xlabel(x_key)
         ax4.set_ylabel("Среднее время ответа")
         st.pyplot(fig4)
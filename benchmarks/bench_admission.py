@@ -0,0 +1,70 @@
+"""Goodput после насыщения S с контролем допуска в Q и без него.
+
+Запуск из корня репозитория: python benchmarks/bench_admission.py
+Открытый цикл, предложенная нагрузка растет с числом пользователей. Без контроля
+очередь S растет, запросы ждут таймаута Q, а брошенные операции продолжают занимать
+слоты S — goodput (успешные ответы в единицу времени) падает. Контроль допуска
+отклоняет лишнее сразу (исход REJECTED), и S тратит время только на полезные вызовы.
+"""
+
+import copy
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep import run_sweep  # noqa: E402
+
+USERS = [2, 4, 6, 8, 12, 16, 24]
+POLICIES = {
+    "none": {"policy": None},
+    "max_in_flight": {"policy": "max_in_flight", "limit": 3},
+    "bounded_queue": {"policy": "bounded_queue", "limit": 3, "queue_size": 3},
+    "codel": {"policy": "codel", "limit": 3, "queue_size": 100, "target_delay": 0.5},
+    "adaptive": {"policy": "adaptive", "limit": 3, "latency_target": 1.0},
+}
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    # Общее пространство ключей: P читают ключи друг друга (равномерно)
+    config["keyspace"] = {"distribution": "uniform"}
+    config["P"].update(
+        arrival_process="poisson",
+        mean_interarrival=1.0,
+        read_probability=0.0,
+        num_requests=100,
+        open_loop=True,
+    )
+    config["Q"]["response_timeout"] = 2.0
+    config["S"]["concurrency_limit"] = 3
+
+    points = []
+    names = []
+    for name, policy in POLICIES.items():
+        admission = dict(config["Q"]["admission"], **policy)
+        for users in USERS:
+            points.append({"P.num_users": users, "Q.admission": admission})
+            names.append(name)
+    rows = run_sweep(config, points, cache_dir=None)
+
+    print("goodput (успешных ответов в единицу времени) по числу пользователей")
+    print(f"{'policy':>14} " + " ".join(f"{users:>6}" for users in USERS))
+    for name in POLICIES:
+        goodput = [row["goodput"] for n, row in zip(names, rows) if n == name]
+        print(f"{name:>14} " + " ".join(f"{value:>6.2f}" for value in goodput))
+    print("p99 успешных и отклоненных вместе")
+    for name in POLICIES:
+        p99 = [row["p99"] for n, row in zip(names, rows) if n == name]
+        print(f"{name:>14} " + " ".join(f"{value:>6.2f}" for value in p99))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Автоскейлер слотов S против постоянной емкости на всплесках нагрузки.
+
+Запуск из корня репозитория: python benchmarks/bench_autoscaling.py
+Нагрузка — сгенерированная трасса: спокойные периоды чередуются со всплесками
+в несколько раз интенсивнее. Постоянная емкость либо не справляется со всплесками,
+либо оплачивает пиковые слоты все время; автоскейлер добавляет слоты по загрузке
+и очереди S, но они появляются через provisioning_delay. Стоимость емкости —
+capacity_time (сумма слотов по времени).
+"""
+
+import copy
+import os
+import random
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import write_trace  # noqa: E402
+from sweep import run_sweep  # noqa: E402
+
+# (длительность, запросов в единицу времени): четыре цикла «тишина — всплеск»
+PHASES = [(30.0, 2.0), (15.0, 14.0)] * 4
+AUTOSCALING = {
+    "enabled": True,
+    "interval": 0.5,
+    "window": 2.0,
+    "min_capacity": 1,
+    "max_capacity": 10,
+    "cooldown": 2.0,
+}
+SCENARIOS = {
+    "fixed 2": {"S.concurrency_limit": 2},
+    "fixed 7": {"S.concurrency_limit": 7},
+    "step 1, delay 0": {"S.autoscaling": dict(AUTOSCALING, provisioning_delay=0.0)},
+    "step 1, delay 2": {"S.autoscaling": dict(AUTOSCALING, provisioning_delay=2.0)},
+    "step 1, delay 5": {"S.autoscaling": dict(AUTOSCALING, provisioning_delay=5.0)},
+    "step 3, delay 2": {"S.autoscaling": dict(AUTOSCALING, provisioning_delay=2.0, step=3)},
+    "target, delay 0": {
+        "S.autoscaling": dict(AUTOSCALING, policy="target", provisioning_delay=0.0)
+    },
+    "target, delay 2": {
+        "S.autoscaling": dict(AUTOSCALING, policy="target", provisioning_delay=2.0)
+    },
+    "target, delay 5": {
+        "S.autoscaling": dict(AUTOSCALING, policy="target", provisioning_delay=5.0)
+    },
+}
+COLUMNS = [
+    ("p99", "p99"),
+    ("errors", "errors"),
+    ("goodput", "goodput"),
+    ("s_capacity_time", "cap-time"),
+    ("scale_ups", "ups"),
+]
+
+
+def bursty_trace(seed=1, read_probability=0.5):
+    rng = random.Random(seed)
+    records = []
+    now = 0.0
+    written = 0
+    for duration, rate in PHASES:
+        end = now + duration
+        while True:
+            now += rng.expovariate(rate)
+            if now >= end:
+                now = end
+                break
+            if written and rng.random() < read_probability:
+                records.append((now, "read", rng.randrange(written), 0))
+            else:
+                records.append((now, "write", written, 100))
+                written += 1
+    return records
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    config["Q"]["response_timeout"] = 3.0
+    # Значения не задерживаются в T: каждое чтение идет в S
+    config["T"]["capacity"] = 1
+    config["S"]["concurrency_limit"] = 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bursty.bin")
+        write_trace(path, bursty_trace())
+        config["P"].update(trace_path=path, num_users=5)
+        rows = run_sweep(config, list(SCENARIOS.values()), cache_dir=None)
+
+    print(f"{'scenario':>22} " + " ".join(f"{title:>9}" for _, title in COLUMNS))
+    for name, row in zip(SCENARIOS, rows):
+        values = " ".join(f"{row.get(key, 0):>9.2f}" for key, _ in COLUMNS)
+        print(f"{name:>22} {values}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Латентность во время отказа S с автоматом (circuit breaker) и без него.
+
+Запуск из корня репозитория: python benchmarks/bench_circuit_breaker.py
+С момента OUTAGE_START до OUTAGE_END операции S длятся в сотню раз дольше таймаута Q
+(S «завис»): без автомата каждый запрос, ушедший в S, ждет response_timeout, с автоматом —
+сразу получает ошибку, а чтения, попавшие в T, обслуживаются как обычно.
+"""
+
+import copy
+import os
+import sys
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import build_simulation  # noqa: E402
+from services.recorder import OUTCOME_ERROR  # noqa: E402
+
+OUTAGE_START = 50.0
+OUTAGE_END = 150.0
+
+
+def outage(env, s_service):
+    normal = s_service.max_read_time, s_service.max_write_time
+    yield env.timeout(OUTAGE_START)
+    s_service.max_read_time = s_service.max_write_time = 100.0
+    yield env.timeout(OUTAGE_END - OUTAGE_START)
+    s_service.max_read_time, s_service.max_write_time = normal
+
+
+def run(config):
+    sim = build_simulation(config)
+    env = sim["env"]
+    env.process(outage(env, sim["S"]))
+    env.run(until=env.all_of([p.action for p in sim["P"]]))
+    recorder = sim["recorder"]
+    during = (recorder.start_time >= OUTAGE_START) & (recorder.start_time < OUTAGE_END)
+    duration = recorder.duration[during]
+    errors = recorder.outcome[during] == OUTCOME_ERROR
+    breaker = sim["Q"].s_breaker
+    return {
+        "requests": int(during.sum()),
+        "avg": float(duration.mean()),
+        "p99": float(np.quantile(duration, 0.99)),
+        "errors": float(errors.mean()),
+        # Доля запросов, прождавших полный таймаут Q
+        "timed_out": float(np.mean(duration >= config["Q"]["response_timeout"])),
+        "timeline": breaker.stats()["timeline"] if breaker is not None else [],
+    }
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    # Общее пространство ключей: P читают ключи друг друга (равномерно)
+    config["keyspace"] = {"distribution": "uniform"}
+    config["P"].update(
+        arrival_process="poisson",
+        mean_interarrival=1.0,
+        read_probability=0.7,
+        num_requests=200,
+        num_users=5,
+        open_loop=True,
+    )
+    config["Q"]["response_timeout"] = 2.0
+    config["T"]["capacity"] = 200
+
+    print(f"{'breaker':>8} {'requests':>8} {'avg':>7} {'p99':>7} {'errors':>7} {'timeouts':>8}")
+    for enabled in (False, True):
+        run_config = copy.deepcopy(config)
+        run_config["Q"]["circuit_breaker"]["S"]["enabled"] = enabled
+        row = run(run_config)
+        print(
+            f"{'on' if enabled else 'off':>8} {row['requests']:>8} {row['avg']:>7.3f} "
+            f"{row['p99']:>7.3f} {row['errors']:>7.1%} {row['timed_out']:>8.1%}"
+        )
+        if row["timeline"]:
+            print("  " + ", ".join(f"{t:.1f} {state}" for t, state in row["timeline"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Пропускная способность и латентность в зависимости от max_batch и linger групповой записи S.
+
+Запуск из корня репозитория: python benchmarks/bench_group_commit.py
+Нагрузка — только записи, много пользователей, S с накладными расходами на операцию.
+"""
+
+import copy
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep import grid_design, run_sweep  # noqa: E402
+
+BATCH_SIZES = [1, 4, 16, 64]
+LINGERS = [0.0, 0.01, 0.05, 0.2]
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    config["P"].update(
+        arrival_process="poisson",
+        mean_interarrival=0.2,
+        read_probability=0.0,
+        num_requests=200,
+        num_users=50,
+    )
+    config["S"].update(group_commit=True, fixed_cost=0.5, per_item_cost=0.01)
+
+    rows = run_sweep(
+        config,
+        grid_design({"S.max_batch": BATCH_SIZES, "S.linger": LINGERS}),
+        cache_dir=None,
+    )
+
+    print(
+        f"{'max_batch':>9} {'linger':>7} {'throughput':>10} {'avg_time':>9} "
+        f"{'p99':>8} {'batch':>6} {'S util':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['S.max_batch']:>9} {row['S.linger']:>7} {row['throughput']:>10.2f} "
+            f"{row['avg_time']:>9.4f} {row['p99']:>8.4f} "
+            f"{row['s_avg_batch_size']:>6.2f} {row['s_utilization']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
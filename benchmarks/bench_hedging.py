@@ -0,0 +1,56 @@
+"""p99 чтения S с hedged-чтениями против дополнительной нагрузки на S.
+
+Запуск из корня репозитория: python benchmarks/bench_hedging.py
+Нагрузка — в основном чтения мимо T, S из трех шардов с тройной репликацией,
+поэтому второе чтение уходит на другую реплику.
+"""
+
+import copy
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep import run_sweep  # noqa: E402
+
+PERCENTILES = [0.5, 0.9, 0.95, 0.99]
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    # Общее пространство ключей: P читают ключи друг друга (равномерно)
+    config["keyspace"] = {"distribution": "uniform"}
+    config["P"].update(
+        arrival_process="poisson",
+        mean_interarrival=2.0,
+        read_probability=0.8,
+        num_requests=400,
+        num_users=10,
+    )
+    config["T"].update(read_failure_probability=0.8)
+    config["S"].update(shards=3, replication_factor=3, concurrency_limit=1)
+
+    points = [{"Q.hedge_reads": False}] + [
+        {"Q.hedge_reads": True, "Q.hedge_percentile": percentile}
+        for percentile in PERCENTILES
+    ]
+    rows = run_sweep(config, points, cache_dir=None)
+
+    print(f"{'hedge':>8} {'S read p99':>10} {'p99':>8} {'extra S':>8} {'S util':>7}")
+    for row in rows:
+        hedge = row["Q.hedge_percentile"] if row["Q.hedge_reads"] else "off"
+        print(
+            f"{hedge:>8} {row['s_read_p99']:>10.4f} {row['p99']:>8.4f} "
+            f"{row.get('hedge_extra_load', 0.0):>8.1%} {row['s_utilization']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
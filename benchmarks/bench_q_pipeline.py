@@ -0,0 +1,52 @@
+"""Число событий SimPy и процессов на один запрос через ServiceQ.
+
+Запуск из корня репозитория: python benchmarks/bench_q_pipeline.py
+"""
+
+import os
+import sys
+import time
+
+import simpy
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_timeouts import InstrumentedEnvironment  # noqa: E402
+from main import build_simulation  # noqa: E402
+
+
+class CountingEnvironment(InstrumentedEnvironment):
+    """Дополнительно считает созданные процессы."""
+
+    def __init__(self):
+        super().__init__()
+        self.processes = 0
+
+    def process(self, generator):
+        self.processes += 1
+        return simpy.Environment.process(self, generator)
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config["seed"] = 1
+    config["metrics_mode"] = "streaming"
+    config["P"].update(num_users=20, num_requests=2000, arrival_process="poisson")
+
+    env = CountingEnvironment()
+    sim = build_simulation(config, env=env)
+    started = time.perf_counter()
+    env.run(until=env.all_of([p.action for p in sim["P"]]))
+    wall = time.perf_counter() - started
+
+    requests = len(sim["recorder"])
+    print(f"requests:             {requests}")
+    print(f"events per request:   {env.events_processed / requests:.2f}")
+    print(f"processes per request: {env.processes / requests:.2f}")
+    print(f"wall-clock, s:        {wall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Стоимость одного случайного числа: модуль random против блоков NumPy.
+
+Запуск из корня репозитория: python benchmarks/bench_randomness.py
+"""
+
+import copy
+import os
+import random
+import sys
+import time
+import timeit
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import run_simulation  # noqa: E402
+from services import RandomStreams  # noqa: E402
+
+
+def per_draw(fn, number=1_000_000):
+    return timeit.timeit(fn, number=number) / number * 1e9
+
+
+def main():
+    streams = RandomStreams(seed=1)
+    expo = streams.exponential("expo", 0.2)
+    unif = streams.uniform("unif", 0.0, 1.0)
+    flag = streams.bernoulli("flag", 0.5)
+
+    print("ns per draw:")
+    print(f"  random.expovariate      {per_draw(lambda: random.expovariate(5.0)):6.1f}")
+    print(f"  exponential stream      {per_draw(expo.next):6.1f}")
+    print(f"  random.uniform          {per_draw(lambda: random.uniform(0.0, 1.0)):6.1f}")
+    print(f"  uniform stream          {per_draw(unif.next):6.1f}")
+    print(f"  random.random() < p     {per_draw(lambda: random.random() < 0.5):6.1f}")
+    print(f"  bernoulli stream        {per_draw(flag.next):6.1f}")
+
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config["seed"] = 1
+    config["metrics_mode"] = "streaming"
+    config["P"].update(num_users=20, num_requests=2000, arrival_process="poisson")
+
+    print("run_simulation wall-clock, s:")
+    for mode in ("python", "pregenerated"):
+        cfg = copy.deepcopy(config)
+        cfg["randomness"] = {"mode": mode}
+        started = time.perf_counter()
+        run_simulation(cfg)
+        print(f"  {mode:<22}{time.perf_counter() - started:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Цена повторов при отказах S: пропускная способность, ошибки и загрузка S.
+
+Запуск из корня репозитория: python benchmarks/bench_retries.py
+S с низким concurrency_limit и коротким таймаутом Q: повторы после таймаутов
+добавляют работу перегруженному S (retry storm), бюджет повторов ее ограничивает.
+"""
+
+import copy
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep import run_sweep  # noqa: E402
+
+FAILURE_PROBABILITIES = [0.0, 0.1, 0.3]
+POLICIES = {
+    "off": {"max_attempts": 1},
+    "retry x4": {"max_attempts": 4, "budget_ratio": None},
+    "budget 0.1": {"max_attempts": 4, "budget_ratio": 0.1},
+}
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    # Общее пространство ключей: P читают ключи друг друга (равномерно)
+    config["keyspace"] = {"distribution": "uniform"}
+    config["P"].update(
+        arrival_process="poisson",
+        mean_interarrival=3.0,
+        read_probability=0.5,
+        num_requests=200,
+        num_users=8,
+        open_loop=True,
+    )
+    config["Q"].update(response_timeout=1.5)
+    config["S"].update(concurrency_limit=2)
+
+    points = []
+    names = []
+    for probability in FAILURE_PROBABILITIES:
+        for name, policy in POLICIES.items():
+            retry = dict(config["Q"]["retry"]["S"], **policy)
+            points.append(
+                {
+                    "S.read_failure_probability": probability,
+                    "S.write_failure_probability": probability,
+                    "Q.retry.S": retry,
+                }
+            )
+            names.append(name)
+    rows = run_sweep(config, points, cache_dir=None)
+
+    print(
+        f"{'S fail':>6} {'policy':>10} {'goodput':>8} {'errors':>7} "
+        f"{'p99':>8} {'retries':>8} {'rejected':>8} {'S util':>7}"
+    )
+    for name, row in zip(names, rows):
+        total = row["successes"] + row["errors"]
+        # Открытый цикл: throughput задан расписанием, цена повторов видна по успешным ответам
+        goodput = row["throughput"] * row["successes"] / total
+        print(
+            f"{row['S.read_failure_probability']:>6} {name:>10} "
+            f"{goodput:>8.2f} {row['errors'] / total:>7.1%} {row['p99']:>8.3f} "
+            f"{row.get('retries', 0):>8} {row.get('retry_budget_rejections', 0):>8} "
+            f"{row['s_utilization']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
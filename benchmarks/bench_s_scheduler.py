@@ -0,0 +1,86 @@
+"""Латентность чтений и записей S при разных планировщиках слотов S.
+
+Запуск из корня репозитория: python benchmarks/bench_s_scheduler.py
+Открытый цикл, половина запросов — записи (до 1.0 единицы времени), T пуст, поэтому
+каждое чтение (до 0.5) идет в S. В очереди FIFO дешевые чтения ждут за дорогими
+записями. priority пропускает чтения вперед, wfq делит время слотов между классами
+по весам, edf (с propagate_deadlines) обслуживает первой операцию с ближайшим
+таймаутом Q. С propagate_deadlines S не выполняет операции, которые уже не успеют
+к таймауту Q, — они отбрасываются (expired), а не занимают слот впустую: по умолчанию
+те, чей дедлайн уже наступил, с S.expected_service_time — и те, кому не хватит остатка.
+"""
+
+import copy
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sweep import run_sweep  # noqa: E402
+
+WEIGHTS = {"read": 3.0, "write": 1.0}
+SCHEDULERS = {
+    "fifo": {"S.scheduler": "fifo"},
+    "priority": {"S.scheduler": "priority"},
+    "wfq 3:1": {"S.scheduler": "wfq", "S.class_weights": WEIGHTS},
+    # У всех вызовов одинаковый response_timeout, поэтому порядок edf совпадает с FIFO,
+    # и разница с fifo — только отброшенные операции
+    "edf": {"S.scheduler": "edf", "Q.propagate_deadlines": True},
+    "priority+deadlines": {"S.scheduler": "priority", "Q.propagate_deadlines": True},
+    "wfq 3:1+deadlines": {
+        "S.scheduler": "wfq",
+        "S.class_weights": WEIGHTS,
+        "Q.propagate_deadlines": True,
+    },
+    # Оценка времени обслуживания: S сбрасывает и операции, которым не хватит остатка
+    "wfq 3:1+deadlines+est": {
+        "S.scheduler": "wfq",
+        "S.class_weights": WEIGHTS,
+        "Q.propagate_deadlines": True,
+        "S.expected_service_time": 0.5,
+    },
+}
+COLUMNS = [
+    ("s_read_latency_p99", "read p99"),
+    ("s_write_latency_p99", "write p99"),
+    ("s_read_latency_mean", "read mean"),
+    ("s_write_latency_mean", "write mean"),
+    ("s_expired", "expired"),
+    ("errors", "errors"),
+    ("goodput", "goodput"),
+]
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config.pop("logging", None)
+
+    config = copy.deepcopy(config)
+    config["seed"] = 1
+    # Общее пространство ключей: P читают ключи друг друга (равномерно)
+    config["keyspace"] = {"distribution": "uniform"}
+    config["P"].update(
+        arrival_process="poisson",
+        mean_interarrival=0.6,
+        read_probability=0.5,
+        num_requests=400,
+        num_users=5,
+        open_loop=True,
+    )
+    # Значения не попадают в T: каждое чтение идет в S
+    config["T"]["capacity"] = 1
+    config["Q"]["response_timeout"] = 3.0
+    config["S"]["concurrency_limit"] = 3
+
+    rows = run_sweep(config, list(SCHEDULERS.values()), cache_dir=None)
+
+    print(f"{'scheduler':>22} " + " ".join(f"{title:>10}" for _, title in COLUMNS))
+    for name, row in zip(SCHEDULERS, rows):
+        print(f"{name:>22} " + " ".join(f"{row[key]:>10.3f}" for key, _ in COLUMNS))
+
+
+if __name__ == "__main__":
+    main()
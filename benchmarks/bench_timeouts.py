@@ -0,0 +1,87 @@
+"""Размер кучи событий SimPy и время прогона: таймаут на каждый вызов против отменяемых.
+
+Запуск из корня репозитория: python benchmarks/bench_timeouts.py
+Оба режима останавливаются одинаково: «all P» — когда все P завершили запросы (как
+run_simulation), «drain» — когда куча SimPy опустела, включая «мертвые» таймеры.
+Время — минимум из REPEATS прогонов.
+"""
+
+import copy
+import os
+import sys
+import time
+
+import simpy
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import build_simulation  # noqa: E402
+
+REPEATS = 3
+
+
+class InstrumentedEnvironment(simpy.Environment):
+    """Environment, который считает обработанные события и максимальный размер кучи."""
+
+    def __init__(self):
+        super().__init__()
+        self.events_processed = 0
+        self.max_heap = 0
+
+    def step(self):
+        if len(self._queue) > self.max_heap:
+            self.max_heap = len(self._queue)
+        self.events_processed += 1
+        super().step()
+
+
+def bench(config, drain):
+    walls = []
+    for _ in range(REPEATS):
+        env = InstrumentedEnvironment()
+        sim = build_simulation(config, env=env)
+        started = time.perf_counter()
+        if drain:
+            env.run()
+        else:
+            env.run(until=env.all_of([p.action for p in sim["P"]]))
+        walls.append(time.perf_counter() - started)
+    return {
+        "wall": min(walls),
+        "events": env.events_processed,
+        "max_heap": env.max_heap,
+        "heap_left": len(env._queue),
+        "sim_end": env.now,
+    }
+
+
+def main():
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config["seed"] = 1
+    config["metrics_mode"] = "streaming"
+    config["P"].update(num_users=50, num_requests=1000, mean_interarrival=0.05)
+    config["S"]["concurrency_limit"] = 50
+
+    print(
+        f"{'mode':<22}{'stop':>7}{'wall, s':>10}{'events':>10}{'max heap':>10}"
+        f"{'left':>8}{'sim end':>10}"
+    )
+    for drain in (False, True):
+        for name, cancellable in (
+            ("per-call env.timeout", False),
+            ("cancellable deadlines", True),
+        ):
+            cfg = copy.deepcopy(config)
+            cfg["Q"]["cancellable_timeouts"] = cancellable
+            r = bench(cfg, drain)
+            stop = "drain" if drain else "all P"
+            print(
+                f"{name:<22}{stop:>7}{r['wall']:>10.3f}{r['events']:>10}{r['max_heap']:>10}"
+                f"{r['heap_left']:>8}{r['sim_end']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
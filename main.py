@@ -1,41 +1,240 @@
-import statistics
+import random
 
 import simpy
 import yaml
 
-from services import ServiceP, ServiceQ, ServiceS, ServiceT
+from services import (
+    AdmissionController,
+    Autoscaler,
+    CircuitBreaker,
+    KeySpace,
+    LatencySketch,
+    LoadBalancer,
+    ResultRecorder,
+    RandomStreams,
+    RetryPolicy,
+    ServiceP,
+    ServiceQ,
+    ServiceS,
+    ServiceSCluster,
+    ServiceT,
+    StageStats,
+    StreamingAggregator,
+    TraceReplayP,
+)
+from services.log import configure_logging, flush_logging
+from services.metrics import STAGE_Q_S
 
+# Верхняя граница начального предвыделения рекордера (дальше растет удвоением)
+MAX_PREALLOCATED_RESULTS = 1 << 20
+# Предел written_ids каждого P в режиме streaming, если P.max_written_ids не задан
+STREAMING_MAX_WRITTEN_IDS = 100000
 
-def run_simulation(config):
-    env = simpy.Environment()
+
+def _retry_policy(env, q_config, hop):
+    # Политика повторов направления hop из секции Q.retry (None — без повторов)
+    params = q_config.get("retry", {}).get(hop)
+    if not params or params.get("max_attempts", 1) <= 1:
+        return None
+    return RetryPolicy(env, **params)
+
+
+def _circuit_breaker(env, q_config, hop, q_name):
+    # Автомат направления hop из секции Q.circuit_breaker (None — выключен)
+    params = dict(q_config.get("circuit_breaker", {}).get(hop) or {})
+    if not params.pop("enabled", False):
+        return None
+    return CircuitBreaker(env, f"{q_name}.{hop}", **params)
+
+
+def _admission(env, q_config):
+    # Контроль допуска вызовов S из секции Q.admission (None — без контроля)
+    params = dict(q_config.get("admission") or {})
+    if params.get("policy") is None:
+        return None
+    return AdmissionController(env, **params)
+
+
+def _autoscaler(env, s_config, shard):
+    # Автоскейлер слотов шарда S из секции S.autoscaling (None — выключен)
+    params = dict(s_config.get("autoscaling") or {})
+    if not params.pop("enabled", False):
+        return None
+    return Autoscaler(env, shard, **params)
+
+
+def build_simulation(config, env=None):
+    """Создает сервисы по конфигу, не запуская симуляцию.
+
+    Возвращает словарь с окружением, сервисами и сборщиками метрик;
+    env можно передать свой (например, инструментированный в бенчмарках).
+    """
+    # Необязательный seed делает прогон воспроизводимым (используется репликациями)
+    seed = config.get("seed")
+    if seed is not None:
+        random.seed(seed)
+
+    # Логирование настраивается, только если в конфиге есть секция logging
+    if "logging" in config:
+        configure_logging(**config["logging"])
+
+    if env is None:
+        env = simpy.Environment()
+
+    # pregenerated — интервалы, выбор read/write и времена S берутся блоками
+    # из именованных подпотоков numpy.random.Generator
+    streams = None
+    randomness = config.get("randomness", {})
+    if randomness.get("mode", "python") == "pregenerated":
+        streams = RandomStreams(seed, block_size=randomness.get("block_size", 4096))
+
+    # Латентности по этапам: Q->T, Q->S, очередь S и обслуживание S
+    stages = StageStats()
 
     t_service = ServiceT(
         env,
         read_failure_probability=config["T"]["read_failure_probability"],
         write_failure_probability=config["T"]["write_failure_probability"],
+        capacity=config["T"].get("capacity"),
+        eviction_policy=config["T"].get("eviction_policy", "lru"),
+        ttl=config["T"].get("ttl"),
     )
 
-    s_service = ServiceS(
-        env,
-        read_failure_probability=config["S"]["read_failure_probability"],
-        write_failure_probability=config["S"]["write_failure_probability"],
-        max_write_time=config["S"]["max_write_time"],
-        max_read_time=config["S"]["max_read_time"],
-        concurrency_limit=config["S"]["concurrency_limit"],
-    )
+    # shards > 1 — несколько экземпляров S за консистентным хешированием
+    # (каждый со своим concurrency_limit), опционально с репликацией и кворумами
+    s_config = config["S"]
+    num_shards = s_config.get("shards", 1)
+    shards = [
+        ServiceS(
+            env,
+            read_failure_probability=s_config["read_failure_probability"],
+            write_failure_probability=s_config["write_failure_probability"],
+            max_write_time=s_config["max_write_time"],
+            max_read_time=s_config["max_read_time"],
+            concurrency_limit=s_config["concurrency_limit"],
+            stages=stages,
+            streams=streams,
+            name="S" if num_shards == 1 else f"S{i}",
+            group_commit=s_config.get("group_commit", False),
+            max_batch=s_config.get("max_batch", 16),
+            linger=s_config.get("linger", 0.01),
+            fixed_cost=s_config.get("fixed_cost"),
+            per_item_cost=s_config.get("per_item_cost", 0.0),
+            scheduler=s_config.get("scheduler", "fifo"),
+            class_priorities=s_config.get("class_priorities"),
+            class_weights=s_config.get("class_weights"),
+            expected_service_time=s_config.get("expected_service_time", 0.0),
+        )
+        for i in range(num_shards)
+    ]
+    # У каждого шарда свой автоскейлер: емкость меняется по его собственной загрузке
+    autoscalers = [
+        autoscaler
+        for autoscaler in (_autoscaler(env, s_config, shard) for shard in shards)
+        if autoscaler is not None
+    ]
+    if num_shards == 1:
+        s_service = shards[0]
+    else:
+        s_service = ServiceSCluster(
+            env,
+            shards,
+            virtual_nodes=s_config.get("virtual_nodes", 100),
+            replication_factor=s_config.get("replication_factor", 1),
+            read_quorum=s_config.get("read_quorum", 1),
+            write_quorum=s_config.get("write_quorum"),
+            hot_factor=s_config.get("hot_factor", 1.25),
+        )
 
-    q_service = ServiceQ(
-        env,
-        response_timeout=config["Q"]["response_timeout"],
-        service_t=t_service,
-        service_s=s_service,
-    )
+    # replicas > 1 — несколько реплик Q (общие T и S) за балансировщиком нагрузки
+    q_config = config["Q"]
+    num_q = q_config.get("replicas", 1)
+    q_names = ["Q"] if num_q == 1 else [f"Q{i}" for i in range(num_q)]
+    q_replicas = [
+        ServiceQ(
+            env,
+            response_timeout=q_config["response_timeout"],
+            service_t=t_service,
+            service_s=s_service,
+            stages=stages,
+            cancellable_timeouts=q_config.get("cancellable_timeouts", True),
+            read_through=q_config.get("read_through", False),
+            single_flight=q_config.get("single_flight", False),
+            write_policy=q_config.get("write_policy", "write_through"),
+            write_queue_size=q_config.get("write_queue_size", 1000),
+            flush_workers=q_config.get("flush_workers", 1),
+            concurrency_limit=q_config.get("concurrency_limit"),
+            hedge_reads=q_config.get("hedge_reads", False),
+            hedge_percentile=q_config.get("hedge_percentile", 0.95),
+            hedge_delay=q_config.get("hedge_delay"),
+            hedge_min_samples=q_config.get("hedge_min_samples", 20),
+            # У каждой реплики свои политики: бюджет повторов — на клиента
+            t_retry=_retry_policy(env, q_config, "T"),
+            s_retry=_retry_policy(env, q_config, "S"),
+            t_breaker=_circuit_breaker(env, q_config, "T", name),
+            s_breaker=_circuit_breaker(env, q_config, "S", name),
+            admission=_admission(env, q_config),
+            propagate_deadlines=q_config.get("propagate_deadlines", False),
+            name=name,
+        )
+        for name in q_names
+    ]
+    if num_q == 1:
+        q_service = q_replicas[0]
+    else:
+        q_service = LoadBalancer(
+            env, q_replicas, policy=q_config.get("balancer", "round_robin")
+        )
 
     # Читаем количество пользователей (экземпляров P), если нет — по умолчанию 1
     num_users = config["P"].get("num_users", 1)
 
+    # detailed — колоночный рекордер каждого запроса, streaming — онлайн-агрегатор с памятью O(1)
+    metrics_mode = config.get("metrics_mode", "detailed")
+    if metrics_mode == "streaming":
+        recorder = StreamingAggregator(window=config.get("throughput_window", 1.0))
+    elif metrics_mode == "detailed":
+        recorder = ResultRecorder(
+            capacity=min(
+                num_users * config["P"]["num_requests"], MAX_PREALLOCATED_RESULTS
+            )
+        )
+    else:
+        raise ValueError(f"Unknown metrics_mode: {metrics_mode}")
+
+    # P.max_written_ids — предел списка записанных id для чтений; в режиме streaming
+    # он задан всегда, чтобы память P не росла с num_requests
+    max_written_ids = config["P"].get("max_written_ids")
+    if max_written_ids is None and metrics_mode == "streaming":
+        max_written_ids = STREAMING_MAX_WRITTEN_IDS
+
+    # Секция keyspace — общее для всех пользователей пространство ключей
+    # с заданным распределением популярности; без нее у каждого P свои id
+    keyspace = None
+    if "keyspace" in config:
+        keyspace = KeySpace(streams=streams, **config["keyspace"])
+
+    # P.trace_path — вместо синтетического потока воспроизводится записанная трасса;
+    # ключи трассы делятся между num_users пользователями по хешу
+    trace_path = config["P"].get("trace_path")
     p_services = []
     for i in range(num_users):
+        if trace_path:
+            p_services.append(
+                TraceReplayP(
+                    env,
+                    q_service=q_service,
+                    path=trace_path,
+                    trace_format=config["P"].get("trace_format"),
+                    speedup=config["P"].get("trace_speedup", 1.0),
+                    user=i,
+                    num_users=num_users,
+                    max_in_flight=config["P"].get("max_in_flight"),
+                    recorder=recorder,
+                    name=f"P{i}",
+                )
+            )
+            continue
         p = ServiceP(
             env,
             q_service=q_service,
@@ -43,32 +242,137 @@ def run_simulation(config):
             mean_interarrival=config["P"]["mean_interarrival"],
             read_probability=config["P"]["read_probability"],
             num_requests=config["P"]["num_requests"],
+            recorder=recorder,
+            streams=streams,
+            name=f"P{i}",
+            open_loop=config["P"].get("open_loop", False),
+            max_in_flight=config["P"].get("max_in_flight"),
+            keyspace=keyspace,
+            max_written_ids=max_written_ids,
         )
         p_services.append(p)
 
-    # Запускаем симуляцию
-    env.run()
+    return {
+        "env": env,
+        "T": t_service,
+        "S": s_service,
+        "Q": q_service,
+        "q_replicas": q_replicas,
+        "autoscalers": autoscalers,
+        "P": p_services,
+        "recorder": recorder,
+        "stages": stages,
+        "metrics_mode": metrics_mode,
+    }
 
-    # Объединяем результаты всех P
-    all_results = []
-    for p in p_services:
-        all_results.extend(p.results)
 
-    successes = sum(
-        1 for r in all_results if r[2] == "OK" or (r[0] == "read" and "data" in r[2])
-    )
-    errors = len(all_results) - successes
-    times = [r[5] for r in all_results]  # duration в 6-м элементе кортежа (индекс 5)
-    avg_time = statistics.mean(times) if times else 0.0
-
-    summary = {
-        "successes": successes,
-        "errors": errors,
-        "avg_time": avg_time,
-        "times": times,
-        "details": all_results,
+def _open_loop_stats(p_services, p_config):
+    # Предложенная нагрузка против фактической и отставание отправок от расписания
+    send_delay = LatencySketch()
+    for p in p_services:
+        send_delay.merge(p.send_delay)
+    if p_config.get("trace_path"):
+        # Для трассы — фактическая интенсивность расписания воспроизведения
+        span = max(p.last_intended for p in p_services)
+        sent = sum(p.completed_requests for p in p_services)
+        offered_load = sent / span if span > 0 else 0.0
+    else:
+        offered_load = len(p_services) / p_config["mean_interarrival"]
+    return {
+        "offered_load": offered_load,
+        "delayed_sends": sum(p.delayed_sends for p in p_services),
+        "max_in_flight": max(p.max_observed_in_flight for p in p_services),
+        "send_delay_mean": send_delay.mean(),
+        "send_delay_p99": send_delay.quantile(0.99),
+        "send_delay_max": send_delay.max if send_delay.count else 0.0,
     }
 
+
+def run_simulation(config):
+    sim = build_simulation(config)
+    env = sim["env"]
+    recorder = sim["recorder"]
+
+    # Симуляция заканчивается, когда все P отправили свои запросы,
+    # а не когда опустеет куча событий SimPy
+    env.run(until=env.all_of([p.action for p in sim["P"]]))
+    clients_done = env.now
+    # В режиме write_behind дожидаемся, пока очередь записей в S опустеет
+    env.run(until=sim["Q"].drained())
+    flush_logging()
+
+    summary = recorder.summary()
+    summary["throughput"] = len(recorder) / clients_done if clients_done > 0 else 0.0
+    # Успешные ответы в единицу времени: отказы и ошибки в goodput не входят
+    summary["goodput"] = summary["successes"] / clients_done if clients_done > 0 else 0.0
+    summary["stages"] = sim["stages"].summary()
+    summary["T"] = sim["T"].stats()
+    if config["P"].get("open_loop", False) or config["P"].get("trace_path"):
+        summary["P"] = _open_loop_stats(sim["P"], config["P"])
+    summary["S"] = sim["S"].stats()
+    summary["Q"] = sim["Q"].stats()
+    # Скалярные копии для репликаций и свипов (они агрегируют только числа)
+    summary["s_fallback_reads"] = sim["Q"].s_fallback_reads
+    summary["s_utilization"] = summary["S"]["utilization"]
+    if "avg_batch_size" in summary["S"]:
+        summary["s_avg_batch_size"] = summary["S"]["avg_batch_size"]
+    if "imbalance" in summary["S"]:
+        summary["s_max_utilization"] = summary["S"]["max_utilization"]
+        summary["s_imbalance"] = summary["S"]["imbalance"]
+    # p99 чтения S глазами Q (с hedged-чтениями — до первого успешного ответа)
+    s_reads = summary["stages"].get(STAGE_Q_S, {}).get("read")
+    summary["s_read_p99"] = s_reads["p99"] if s_reads else 0.0
+    # Латентность S по классам операций (очередь + обслуживание) и отброшенные
+    # по дедлайну операции
+    for op, row in summary["S"]["classes"].items():
+        summary[f"s_{op}_latency_mean"] = row["mean"]
+        summary[f"s_{op}_latency_p99"] = row["p99"]
+    summary["s_expired"] = summary["S"]["expired"]
+    # Стоимость емкости S: слоты всех шардов, просуммированные по времени
+    summary["s_capacity_time"] = summary["S"]["capacity_time"]
+    if sim["autoscalers"]:
+        # По шардам: решения, средняя и пиковая емкость, timeline — [(время, слотов)]
+        summary["autoscaling"] = {
+            autoscaler.service.name: autoscaler.stats() for autoscaler in sim["autoscalers"]
+        }
+        for key in ("scale_ups", "scale_downs"):
+            summary[key] = sum(row[key] for row in summary["autoscaling"].values())
+        summary["s_avg_capacity"] = sum(
+            row["avg_capacity"] for row in summary["autoscaling"].values()
+        )
+    if "hedged_reads" in summary["Q"]:
+        # Дополнительная нагрузка на S: вторые чтения на одно чтение, ушедшее в S
+        primary_reads = summary["s_fallback_reads"] - summary["Q"]["coalesced_reads"]
+        summary["hedged_reads"] = summary["Q"]["hedged_reads"]
+        summary["hedge_extra_load"] = (
+            summary["hedged_reads"] / primary_reads if primary_reads else 0.0
+        )
+    if "s_retries" in summary["Q"] or "t_retries" in summary["Q"]:
+        summary["retries"] = sum(
+            summary["Q"].get(f"{hop}_retries", 0) for hop in ("t", "s")
+        )
+        summary["retry_budget_rejections"] = sum(
+            summary["Q"].get(f"{hop}_budget_rejections", 0) for hop in ("t", "s")
+        )
+    breakers = [
+        breaker
+        for q in sim["q_replicas"]
+        for breaker in (q.t_breaker, q.s_breaker)
+        if breaker is not None
+    ]
+    if breakers:
+        # Состояния автоматов по времени: {"Q.S": {"timeline": [(время, состояние)], ...}}
+        summary["breakers"] = {breaker.name: breaker.stats() for breaker in breakers}
+        summary["breaker_rejections"] = sum(breaker.rejected for breaker in breakers)
+        summary["breaker_open_time"] = sum(
+            row["open_time"] for row in summary["breakers"].values()
+        )
+    if sim["metrics_mode"] == "streaming":
+        summary["throughput_windows"] = recorder.throughput_windows()
+    else:
+        summary["times"] = recorder.duration
+        summary["details"] = recorder
+
     return summary
 
 
@@ -82,4 +386,73 @@ if __name__ == "__main__":
     print("Simulation summary:")
     print(f"Successes: {summary['successes']}")
     print(f"Errors: {summary['errors']}")
+    if summary["rejected"]:
+        print(f"Rejected: {summary['rejected']}")
     print(f"Avg Time: {summary['avg_time']:.4f}")
+    print(f"P99 Time: {summary['p99']:.4f}")
+    t_stats = summary["T"]
+    print(
+        f"T cache: hit ratio {t_stats['hit_ratio']:.3f} "
+        f"(hits {t_stats['hits']}, misses {t_stats['misses']}, "
+        f"evictions {t_stats['evictions']}, expirations {t_stats['expirations']}), "
+        f"S fallback reads: {summary['s_fallback_reads']}"
+    )
+    if "replicas" in summary["Q"]:
+        for name, row in summary["Q"]["replicas"].items():
+            print(
+                f"  {name}: requests {row['requests']}, errors {row['errors']}, "
+                f"rejected {row['rejected']}, "
+                f"avg {row['avg_time']:.4f}, p99 {row['p99']:.4f}, "
+                f"max outstanding {row['max_outstanding']}"
+            )
+    if "hot_shards" in summary["S"]:
+        print(
+            f"Shards: max utilization {summary['s_max_utilization']:.3f}, "
+            f"imbalance {summary['s_imbalance']:.2f}, "
+            f"hot: {', '.join(summary['S']['hot_shards']) or '-'}"
+        )
+    q_stats = summary["Q"]
+    if "hedged_reads" in q_stats:
+        print(
+            f"Hedged reads: {q_stats['hedged_reads']} "
+            f"(+{summary['hedge_extra_load']:.1%} S reads), "
+            f"hedge wins {q_stats['hedge_wins']}, "
+            f"S read p99 {summary['s_read_p99']:.4f}"
+        )
+    print(
+        f"S utilization: {summary['s_utilization']:.3f}, "
+        f"read-through fills: {q_stats['read_through_fills']}, "
+        f"coalesced reads: {q_stats['coalesced_reads']}"
+    )
+    for op, row in summary["S"]["classes"].items():
+        print(
+            f"S {op:<5}: n={row['count']}, mean {row['mean']:.4f}, "
+            f"p99 {row['p99']:.4f}, expired {row['expired']}"
+        )
+    for name, row in summary.get("autoscaling", {}).items():
+        changes = ", ".join(f"{time:.2f}: {capacity}" for time, capacity in row["timeline"][1:])
+        print(
+            f"Autoscaling {name}: {row['scale_ups']} up / {row['scale_downs']} down, "
+            f"avg capacity {row['avg_capacity']:.2f}, max {row['max_capacity']}, "
+            f"capacity-time {row['capacity_time']:.2f}"
+            + (f" ({changes})" if changes else "")
+        )
+    if "retries" in summary:
+        print(
+            f"Retries: {summary['retries']}, "
+            f"rejected by budget: {summary['retry_budget_rejections']}"
+        )
+    for name, row in summary.get("breakers", {}).items():
+        transitions = ", ".join(f"{time:.2f} {state}" for time, state in row["timeline"][1:])
+        print(
+            f"Breaker {name}: {row['state']}, opened {row['opened']} times, "
+            f"rejected {row['rejected']}, open {row['open_time']:.2f}"
+            + (f" ({transitions})" if transitions else "")
+        )
+    print("Stages (p50 / p90 / p99 / max):")
+    for stage, by_op in summary["stages"].items():
+        for op, row in by_op.items():
+            print(
+                f"  {stage:<10} {op:<6} n={row['count']:<6} "
+                f"{row['p50']:.4f} / {row['p90']:.4f} / {row['p99']:.4f} / {row['max']:.4f}"
+            )
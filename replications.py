@@ -0,0 +1,119 @@
+import copy
+import math
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from main import run_simulation
+
+# Метрики, которые по умолчанию агрегируются по репликациям
+DEFAULT_METRICS = ("successes", "errors", "avg_time")
+
+# Квантили t-распределения Стьюдента уровня 0.975 для df = 1..30
+_T_975 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+
+
+def replication_seeds(base_seed, n):
+    """Независимые детерминированные seed'ы для n репликаций (через SeedSequence.spawn)."""
+    children = np.random.SeedSequence(base_seed).spawn(n)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def _t_critical(df):
+    if df <= 0:
+        return float("nan")
+    if df <= len(_T_975):
+        return _T_975[df - 1]
+    return 1.96
+
+
+def simulate_metrics(config):
+    """run_simulation, от результата которого остаются только скалярные метрики.
+
+    Выполняется в дочерних процессах: детали каждого запроса не гоняются через pickle.
+    """
+    summary = run_simulation(config)
+    return {
+        key: value
+        for key, value in summary.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def merge_metric(values):
+    """Среднее, стандартное отклонение и 95% доверительный интервал по выборке."""
+    n = len(values)
+    mean = statistics.fmean(values) if n else 0.0
+    stddev = statistics.stdev(values) if n > 1 else 0.0
+    half_width = _t_critical(n - 1) * stddev / math.sqrt(n) if n > 1 else 0.0
+    return {
+        "mean": mean,
+        "stddev": stddev,
+        "ci95": (mean - half_width, mean + half_width),
+        "half_width": half_width,
+    }
+
+
+def run_replications(
+    config, n, workers=None, base_seed=None, metrics=DEFAULT_METRICS
+):
+    """Запускает n независимых репликаций run_simulation в пуле процессов.
+
+    Каждая репликация получает собственный seed, выведенный из base_seed
+    (по умолчанию — config["seed"]), поэтому результат не зависит от
+    числа воркеров и порядка выполнения.
+    """
+    if n < 1:
+        raise ValueError("n must be >= 1")
+    if base_seed is None:
+        base_seed = config.get("seed")
+
+    seeds = replication_seeds(base_seed, n)
+    configs = []
+    for seed in seeds:
+        cfg = copy.deepcopy(config)
+        cfg["seed"] = seed
+        configs.append(cfg)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, n))
+
+    if workers == 1:
+        replications = [simulate_metrics(cfg) for cfg in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            replications = list(pool.map(simulate_metrics, configs))
+
+    merged = {
+        name: merge_metric([rep[name] for rep in replications]) for name in metrics
+    }
+
+    return {
+        "n": n,
+        "seeds": seeds,
+        "replications": replications,
+        "metrics": merged,
+    }
+
+
+if __name__ == "__main__":
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+
+    result = run_replications(config, n=20)
+
+    print(f"Replications: {result['n']}")
+    for name, stats in result["metrics"].items():
+        lo, hi = stats["ci95"]
+        print(
+            f"{name}: mean={stats['mean']:.4f} stddev={stats['stddev']:.4f} "
+            f"95% CI=[{lo:.4f}, {hi:.4f}]"
+        )
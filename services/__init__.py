@@ -1,4 +1,22 @@
+import logging
+
 from .service_p import ServiceP
 from .service_q import ServiceQ
 from .service_s import ServiceS
 from .service_t import ServiceT
+from .s_cluster import ServiceSCluster
+from .hash_ring import HashRing
+from .load_balancer import LoadBalancer
+from .trace import TraceReplayP, read_trace, write_trace
+from .recorder import ResultRecorder
+from .metrics import LatencySketch, StageStats, StreamingAggregator
+from .randomness import RandomStreams
+from .keyspace import KeySpace
+from .retry import RetryBudget, RetryPolicy
+from .circuit_breaker import CircuitBreaker
+from .admission import AdmissionController
+from .autoscaler import Autoscaler
+from .errors import CircuitOpenError, DeadlineExceededError, NotFoundError, RejectedError
+
+# Библиотека не выводит логи сама: без configure_logging сообщения не печатаются
+logging.getLogger(__name__).addHandler(logging.NullHandler())
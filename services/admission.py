@@ -0,0 +1,128 @@
+from collections import deque
+
+from .errors import RejectedError
+
+ADMISSION_POLICIES = ("max_in_flight", "bounded_queue", "codel", "adaptive")
+
+
+class AdmissionController:
+    """Контроль допуска вызовов S из Q: лишняя нагрузка отсекается до очереди S.
+
+    Политики:
+      "max_in_flight" — не больше limit вызовов одновременно, остальные отклоняются сразу;
+      "bounded_queue" — сверх limit ждут в очереди до queue_size вызовов, при полной
+                        очереди — отказ;
+      "codel"         — как bounded_queue, но если задержка в очереди держится выше
+                        target_delay дольше interval, при выдаче места отклоняются все
+                        ожидавшие дольше target_delay, пока задержка не опустится ниже
+                        (упрощенный CoDel без нарастающей частоты сброса);
+      "adaptive"      — лимит одновременных вызовов подбирается AIMD: успешный вызов
+                        не дольше latency_target добавляет 1/limit, отказ или медленный
+                        вызов умножает лимит на backoff (в пределах min_limit..max_limit).
+    request() возвращает событие допуска (уже сработавшее, если место есть) или бросает
+    RejectedError; после вызова S место возвращается через release().
+    """
+
+    def __init__(
+        self,
+        env,
+        policy="max_in_flight",
+        limit=10,
+        queue_size=10,
+        target_delay=0.1,
+        interval=1.0,
+        latency_target=1.0,
+        min_limit=1,
+        max_limit=100,
+        backoff=0.9,
+    ):
+        if policy not in ADMISSION_POLICIES:
+            raise ValueError(f"Unknown admission policy: {policy}")
+        self.env = env
+        self.policy = policy
+        self.limit = float(limit)
+        self.queue_size = queue_size if policy in ("bounded_queue", "codel") else 0
+        self.target_delay = target_delay
+        self.interval = interval
+        self.latency_target = latency_target
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+
+        self.in_flight = 0
+        # Очередь ожидающих: (событие допуска, время постановки)
+        self._queue = deque()
+        # CoDel: момент, с которого задержка в очереди непрерывно выше target_delay
+        self._above_since = None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.max_queue = 0
+
+    def request(self):
+        if self.in_flight < int(self.limit) and not self._queue:
+            self.in_flight += 1
+            self.admitted += 1
+            return self.env.event().succeed()
+        if len(self._queue) >= self.queue_size:
+            self.rejected += 1
+            raise RejectedError("S overloaded")
+        event = self.env.event()
+        self._queue.append((event, self.env.now))
+        if len(self._queue) > self.max_queue:
+            self.max_queue = len(self._queue)
+        return event
+
+    def cancel(self, event):
+        """Ожидающий ушел по таймауту: убрать из очереди или вернуть уже выданное место."""
+        if event.triggered:
+            if event.ok:
+                self.release()
+            return
+        for index, (waiting, _) in enumerate(self._queue):
+            if waiting is event:
+                del self._queue[index]
+                return
+
+    def release(self, latency=None, ok=True):
+        """Вызов S завершился (latency=None — место возвращено без вызова)."""
+        self.in_flight -= 1
+        if self.policy == "adaptive" and latency is not None:
+            if ok and latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._queue and self.in_flight < int(self.limit):
+            event, enqueued = self._queue.popleft()
+            if self.policy == "codel" and self._should_drop(self.env.now - enqueued):
+                self.dropped += 1
+                event.fail(RejectedError("S queue delay above target"))
+                continue
+            self.in_flight += 1
+            self.admitted += 1
+            event.succeed()
+
+    def _should_drop(self, sojourn):
+        now = self.env.now
+        if sojourn < self.target_delay:
+            self._above_since = None
+            return False
+        if self._above_since is None:
+            self._above_since = now
+        return now - self._above_since >= self.interval
+
+    def stats(self):
+        """Допущенные, отклоненные сразу и сброшенные из очереди вызовы, пик очереди."""
+        stats = {
+            "admission_admitted": self.admitted,
+            "admission_rejected": self.rejected,
+            "admission_dropped": self.dropped,
+            "admission_max_queue": self.max_queue,
+        }
+        if self.policy == "adaptive":
+            stats["admission_limit"] = self.limit
+        return stats
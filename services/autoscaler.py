@@ -0,0 +1,132 @@
+import math
+from collections import deque
+
+SCALING_POLICIES = ("step", "target")
+
+
+class Autoscaler:
+    """Процесс симуляции, меняющий число слотов ServiceS по его загрузке.
+
+    Каждые interval единиц времени снимается отсчет: занятые слоты, длина очереди
+    и число слотов S. Решение принимается по отсчетам за последние window единиц
+    времени. Политики policy:
+      "step"   — загрузка (занятые / все слоты) >= scale_up_utilization или средняя
+                 очередь на слот >= queue_per_slot — добавить step слотов;
+                 загрузка <= scale_down_utilization при пустой очереди — убрать step;
+      "target" — слотов столько, чтобы спрос (занятые + ждущие в среднем за окно)
+                 загружал их на target_utilization (target tracking).
+    Добавленные слоты появляются через provisioning_delay, убранные исчезают сразу
+    (операции на них доживают до конца). Число слотов с учетом заказанных держится
+    в min_capacity..max_capacity.
+    После решения и после появления заказанных слотов следующее решение
+    принимается не раньше чем через cooldown. Изменения числа слотов — в
+    capacity_timeline службы, их стоимость — ServiceS.capacity_time().
+    """
+
+    def __init__(
+        self,
+        env,
+        service,
+        policy="step",
+        interval=1.0,
+        window=5.0,
+        scale_up_utilization=0.8,
+        scale_down_utilization=0.3,
+        queue_per_slot=1.0,
+        target_utilization=0.7,
+        step=1,
+        min_capacity=1,
+        max_capacity=10,
+        provisioning_delay=1.0,
+        cooldown=5.0,
+    ):
+        if policy not in SCALING_POLICIES:
+            raise ValueError(f"Unknown scaling policy: {policy}")
+        if not 1 <= min_capacity <= max_capacity:
+            raise ValueError("Autoscaler needs 1 <= min_capacity <= max_capacity")
+        if not min_capacity <= service.resource.capacity <= max_capacity:
+            raise ValueError("Initial S capacity is outside autoscaler bounds")
+        if interval <= 0 or window < interval:
+            raise ValueError("Autoscaler needs 0 < interval <= window")
+        self.env = env
+        self.service = service
+        self.policy = policy
+        self.interval = interval
+        self.scale_up_utilization = scale_up_utilization
+        self.scale_down_utilization = scale_down_utilization
+        self.queue_per_slot = queue_per_slot
+        self.target_utilization = target_utilization
+        self.step = step
+        self.min_capacity = min_capacity
+        self.max_capacity = max_capacity
+        self.provisioning_delay = provisioning_delay
+        self.cooldown = cooldown
+
+        # Отсчеты (занято, очередь, слотов) за последние window единиц времени
+        self._samples = deque(maxlen=max(1, round(window / interval)))
+        # Слоты, которые заказаны, но еще не появились
+        self.provisioning = 0
+        self._last_action = None
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self.process = env.process(self._run())
+
+    def _run(self):
+        while True:
+            yield self.env.timeout(self.interval)
+            resource = self.service.resource
+            self._samples.append((resource.count, len(resource.queue), resource.capacity))
+            if len(self._samples) < self._samples.maxlen:
+                continue
+            if self._last_action is not None and self.env.now - self._last_action < self.cooldown:
+                continue
+            self._decide(resource.capacity)
+
+    def _desired(self, capacity):
+        # Желаемое число слотов по отсчетам окна (до ограничения пределами)
+        count = len(self._samples)
+        busy = sum(sample[0] for sample in self._samples)
+        queued = sum(sample[1] for sample in self._samples) / count
+        if self.policy == "target":
+            return math.ceil((busy / count + queued) / self.target_utilization)
+        utilization = busy / sum(sample[2] for sample in self._samples)
+        if utilization >= self.scale_up_utilization or queued >= self.queue_per_slot * capacity:
+            return capacity + self.provisioning + self.step
+        if utilization <= self.scale_down_utilization and queued == 0:
+            return capacity - self.step
+        return capacity + self.provisioning
+
+    def _decide(self, capacity):
+        desired = self._desired(capacity)
+        desired = max(self.min_capacity, min(self.max_capacity, desired))
+        planned = capacity + self.provisioning
+        if desired > planned:
+            self.provisioning += desired - planned
+            self.scale_ups += 1
+            self._last_action = self.env.now
+            self.env.process(self._provision(desired - planned))
+        elif desired < capacity and not self.provisioning:
+            self.service.set_capacity(desired)
+            self.scale_downs += 1
+            self._last_action = self.env.now
+
+    def _provision(self, added):
+        yield self.env.timeout(self.provisioning_delay)
+        self.provisioning -= added
+        self.service.set_capacity(self.service.resource.capacity + added)
+        self._last_action = self.env.now
+
+    def stats(self):
+        """Решения автоскейлера, средняя и пиковая емкость, стоимость и история емкости."""
+        timeline = self.service.capacity_timeline
+        capacity_time = self.service.capacity_time()
+        elapsed = self.env.now - timeline[0][0]
+        return {
+            "capacity": self.service.resource.capacity,
+            "scale_ups": self.scale_ups,
+            "scale_downs": self.scale_downs,
+            "capacity_time": capacity_time,
+            "avg_capacity": capacity_time / elapsed if elapsed > 0 else 0.0,
+            "max_capacity": max(capacity for _, capacity in timeline),
+            "timeline": list(timeline),
+        }
@@ -0,0 +1,137 @@
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Автомат (circuit breaker) для вызовов одного нижестоящего сервиса.
+
+    closed    — вызовы проходят; исходы за последние window единиц симуляционного
+                времени копятся в скользящем окне. Если в окне не меньше min_calls
+                вызовов и доля отказов >= failure_threshold или доля медленных
+                (дольше slow_call_duration) >= slow_call_threshold — автомат размыкается;
+    open      — вызовы отклоняются сразу; через open_duration — half_open;
+    half_open — проходят не больше half_open_calls пробных вызовов одновременно;
+                half_open_calls успехов подряд замыкают автомат, любой отказ
+                или медленный вызов снова размыкает его.
+    Смены состояния пишутся в timeline как (время, состояние).
+    """
+
+    def __init__(
+        self,
+        env,
+        name,
+        window=10.0,
+        min_calls=10,
+        failure_threshold=0.5,
+        slow_call_duration=None,
+        slow_call_threshold=0.5,
+        open_duration=5.0,
+        half_open_calls=3,
+    ):
+        self.env = env
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_threshold = slow_call_threshold
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self.timeline = [(env.now, CLOSED)]
+        # Окно: (время, отказ, медленный) по порядку; счетчики — по содержимому окна
+        self._calls = deque()
+        self._failures = 0
+        self._slow = 0
+        self._opened_at = None
+        self._probes = 0
+        self._probe_successes = 0
+
+        self.rejected = 0
+        self.opened = 0
+        self.open_time = 0.0
+
+    def _transition(self, state):
+        now = self.env.now
+        if self.state == OPEN:
+            self.open_time += now - self._opened_at
+        self.state = state
+        self.timeline.append((now, state))
+        if state == OPEN:
+            self.opened += 1
+            self._opened_at = now
+        elif state == HALF_OPEN:
+            self._probes = 0
+            self._probe_successes = 0
+        else:
+            self._calls.clear()
+            self._failures = 0
+            self._slow = 0
+
+    def _evict(self, now):
+        calls = self._calls
+        horizon = now - self.window
+        while calls and calls[0][0] <= horizon:
+            _, failed, slow = calls.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def allow(self):
+        """Можно ли выполнить вызов; False — отклонить сразу (автомат разомкнут)."""
+        if self.state == OPEN:
+            if self.env.now - self._opened_at < self.open_duration:
+                self.rejected += 1
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self.rejected += 1
+                return False
+            self._probes += 1
+        return True
+
+    def record(self, ok, duration):
+        """Исход вызова, пропущенного allow(): ok — без отказа, duration — его длительность."""
+        slow = self.slow_call_duration is not None and duration > self.slow_call_duration
+        if self.state == HALF_OPEN:
+            # Вызов, начатый еще в closed, тоже считается пробным
+            self._probes = max(0, self._probes - 1)
+            if not ok or slow:
+                self._transition(OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            # Вызов начат до размыкания — на состояние уже не влияет
+            return
+
+        now = self.env.now
+        self._evict(now)
+        self._calls.append((now, not ok, slow))
+        self._failures += not ok
+        self._slow += slow
+        total = len(self._calls)
+        if total >= self.min_calls and (
+            self._failures >= self.failure_threshold * total
+            or self._slow >= self.slow_call_threshold * total
+        ):
+            self._transition(OPEN)
+
+    def stats(self):
+        """Текущее состояние, число размыканий, отклоненные вызовы, время в open и timeline."""
+        open_time = self.open_time
+        if self.state == OPEN:
+            open_time += self.env.now - self._opened_at
+        return {
+            "state": self.state,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "open_time": open_time,
+            "timeline": list(self.timeline),
+        }
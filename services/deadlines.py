@@ -0,0 +1,126 @@
+import heapq
+import itertools
+
+
+def _defuse(event):
+    if not event.ok:
+        event.defused = True
+
+
+def abandon(event):
+    """Отказ от ожидания события: его возможная ошибка больше не роняет симуляцию.
+
+    Нужно для операций, которые продолжают выполняться после таймаута
+    или отмены, но результат которых уже никто не ждет.
+    """
+    if event.callbacks is not None:
+        event.callbacks.append(_defuse)
+    elif event.triggered and not event.ok:
+        event.defused = True
+
+
+class Deadline:
+    __slots__ = ("when", "event", "cancelled", "_scheduler")
+
+    def __init__(self, scheduler, when, event):
+        self._scheduler = scheduler
+        self.when = when
+        self.event = event
+        self.cancelled = False
+
+    def cancel(self):
+        """Отменяет дедлайн; no-op, если он уже сработал или отменен."""
+        if not self.cancelled and not self.event.triggered:
+            self.cancelled = True
+            self._scheduler._on_cancel()
+
+
+class DeadlineScheduler:
+    """Отменяемые таймауты поверх одного сторожевого процесса.
+
+    env.timeout() нельзя убрать из очереди событий SimPy: таймаут на каждый
+    вызов висит в куче до срабатывания, даже если операция давно завершилась.
+    Здесь дедлайны хранятся в собственной куче с ленивым удалением, а сторож
+    ждет один таймер — до ближайшего дедлайна. Если появляется более ранний
+    дедлайн, сторож заводит новый таймер, а прежний остается в куче SimPy до
+    своего срабатывания; сторож переиспользует его, если к тому моменту он снова
+    нужен. Поэтому дедлайны с одинаковой задержкой (они приходят по возрастанию)
+    держат в куче SimPy один таймер, а короткие задержки вперемешку с длинными
+    оставляют устаревшие таймеры — для них лучше обычный env.timeout.
+    Событие deadline.event — обычный env.event(), он не попадает в кучу SimPy,
+    пока дедлайн не сработал.
+    """
+
+    # Порог, после которого куча пересобирается без отмененных дедлайнов
+    COMPACT_MIN_SIZE = 64
+
+    def __init__(self, env):
+        self.env = env
+        self._heap = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._target = None
+        # Таймер, которого ждет сторож, и момент его срабатывания
+        self._timer = None
+        self._timer_when = None
+        self._wakeup = env.event()
+        self.fired = 0
+        self.process = env.process(self._run())
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def schedule(self, delay):
+        deadline = Deadline(self, self.env.now + delay, self.env.event())
+        heapq.heappush(self._heap, (deadline.when, next(self._counter), deadline))
+        # Будим сторожа, только если он спит дольше, чем нужно новому дедлайну.
+        # При одинаковом delay дедлайны приходят по возрастанию, и будить не нужно.
+        if (self._target is None or deadline.when < self._target) and not (
+            self._wakeup.triggered
+        ):
+            self._wakeup.succeed()
+        return deadline
+
+    def _on_cancel(self):
+        self._cancelled += 1
+        if (
+            len(self._heap) >= self.COMPACT_MIN_SIZE
+            and self._cancelled * 2 > len(self._heap)
+        ):
+            self._heap = [item for item in self._heap if not item[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _pop_cancelled(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+    def _run(self):
+        while True:
+            self._pop_cancelled()
+            if not self._heap:
+                # Живых дедлайнов нет — ждем без таймера в куче SimPy
+                self._target = None
+                yield self._wakeup
+                self._wakeup = self.env.event()
+                continue
+
+            when = self._heap[0][0]
+            if when > self.env.now:
+                if self._timer is None or when < self._timer_when:
+                    self._timer = self.env.timeout(when - self.env.now)
+                    self._timer_when = when
+                self._target = self._timer_when
+                # Таймер может сработать раньше ближайшего дедлайна, если более
+                # ранние отменены, — тогда сторож просто проверит кучу еще раз
+                yield self._timer | self._wakeup
+                if self._timer.processed:
+                    self._timer = None
+                if self._wakeup.triggered:
+                    self._wakeup = self.env.event()
+                continue
+
+            _, _, deadline = heapq.heappop(self._heap)
+            self.fired += 1
+            deadline.event.succeed()
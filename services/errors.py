@@ -0,0 +1,15 @@
+class NotFoundError(RuntimeError):
+    """Ключа нет в хранилище. Это ответ, а не сбой: повтор запроса его не изменит."""
+
+
+class CircuitOpenError(RuntimeError):
+    """Автомат (circuit breaker) направления разомкнут: вызов отклонен без обращения."""
+
+
+class DeadlineExceededError(RuntimeError):
+    """S не стал выполнять операцию: ее дедлайн уже наступил. Повтор с новым дедлайном
+    вернул бы в S ту самую нагрузку, которую сбросили."""
+
+
+class RejectedError(RuntimeError):
+    """Контроль допуска Q отказал запросу, чтобы не перегружать S (отдельный исход REJECTED)."""
@@ -0,0 +1,218 @@
+import random
+from collections import OrderedDict
+
+# Названия политик вытеснения для ServiceT(eviction_policy=...)
+EVICTION_POLICIES = ("lru", "lfu", "ttl", "random")
+
+
+class UnboundedCache:
+    """Хранилище без ограничения размера — прежнее поведение ServiceT.storage.
+
+    Все кеши имеют общий интерфейс: lookup(key, now) возвращает значение или
+    бросает KeyError, insert(key, value, now) кладет значение и возвращает число
+    вытесненных ключей. get / in / len не меняют состояние кеша.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def lookup(self, key, now):
+        return self.data[key]
+
+    def insert(self, key, value, now):
+        self.data[key] = value
+        return 0
+
+
+class LRUCache(UnboundedCache):
+    """Вытесняет ключ, к которому дольше всего не обращались.
+
+    OrderedDict хранит ключи в порядке последнего обращения:
+    move_to_end и popitem(last=False) — O(1).
+    """
+
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+        self.data = OrderedDict()
+
+    def lookup(self, key, now):
+        value = self.data[key]
+        self.data.move_to_end(key)
+        return value
+
+    def insert(self, key, value, now):
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.data[key] = value
+            return 0
+        evicted = 0
+        if len(self.data) >= self.capacity:
+            self.data.popitem(last=False)
+            evicted = 1
+        self.data[key] = value
+        return evicted
+
+
+class LFUCache(UnboundedCache):
+    """Вытесняет самый редко читаемый ключ (среди равных — самый давний).
+
+    Ключи разложены по корзинам частот {частота: OrderedDict}, и отдельно
+    хранится минимальная частота, поэтому и обращение, и вытеснение — O(1).
+    """
+
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+        self._freq = {}
+        self._buckets = {}
+        self._min_freq = 0
+
+    def _touch(self, key):
+        freq = self._freq[key]
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def lookup(self, key, now):
+        value = self.data[key]
+        self._touch(key)
+        return value
+
+    def insert(self, key, value, now):
+        if key in self.data:
+            self.data[key] = value
+            self._touch(key)
+            return 0
+        evicted = 0
+        if len(self.data) >= self.capacity:
+            bucket = self._buckets[self._min_freq]
+            victim, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self._buckets[self._min_freq]
+            del self.data[victim]
+            del self._freq[victim]
+            evicted = 1
+        self.data[key] = value
+        self._freq[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_freq = 1
+        return evicted
+
+
+class TTLCache(UnboundedCache):
+    """Значение живет ttl единиц симуляционного времени с момента записи.
+
+    TTL одинаковый для всех ключей, поэтому порядок записи совпадает с порядком
+    истечения: просроченные ключи снимаются с головы OrderedDict за O(1)
+    (амортизированно), а при переполнении вытесняется ключ, который истечет первым.
+    capacity=None — ограничение только по времени.
+    """
+
+    def __init__(self, ttl, capacity=None):
+        super().__init__()
+        self.ttl = ttl
+        self.capacity = capacity
+        # key -> (value, момент истечения)
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self.data.get(key)
+        return default if item is None else item[0]
+
+    def _expire(self, now):
+        while self.data:
+            key, (_, expires) = next(iter(self.data.items()))
+            if expires > now:
+                break
+            del self.data[key]
+            self.expirations += 1
+
+    def lookup(self, key, now):
+        value, expires = self.data[key]
+        if expires <= now:
+            self._expire(now)
+            raise KeyError(key)
+        return value
+
+    def insert(self, key, value, now):
+        self._expire(now)
+        if key in self.data:
+            del self.data[key]
+        evicted = 0
+        if self.capacity is not None and len(self.data) >= self.capacity:
+            self.data.popitem(last=False)
+            evicted = 1
+        self.data[key] = (value, now + self.ttl)
+        return evicted
+
+
+class RandomCache(UnboundedCache):
+    """Вытесняет случайный ключ.
+
+    Ключи дополнительно лежат в списке, а позиции — в словаре: случайный
+    ключ меняется местами с последним и снимается pop() за O(1).
+    """
+
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+        self._keys = []
+        self._index = {}
+
+    def insert(self, key, value, now):
+        if key in self.data:
+            self.data[key] = value
+            return 0
+        evicted = 0
+        if len(self.data) >= self.capacity:
+            pos = random.randrange(len(self._keys))
+            victim = self._keys[pos]
+            last = self._keys.pop()
+            if pos < len(self._keys):
+                self._keys[pos] = last
+                self._index[last] = pos
+            del self._index[victim]
+            del self.data[victim]
+            evicted = 1
+        self._index[key] = len(self._keys)
+        self._keys.append(key)
+        self.data[key] = value
+        return evicted
+
+
+def make_cache(capacity=None, eviction_policy="lru", ttl=None):
+    """Создает хранилище ServiceT по имени политики вытеснения.
+
+    capacity=None без TTL — неограниченный словарь (поведение по умолчанию).
+    """
+    if eviction_policy not in EVICTION_POLICIES:
+        raise ValueError(f"Unknown eviction policy: {eviction_policy}")
+    if capacity is not None and capacity < 1:
+        raise ValueError("Cache capacity must be positive")
+    if eviction_policy == "ttl":
+        if ttl is None or ttl <= 0:
+            raise ValueError("TTL eviction policy requires positive ttl")
+        return TTLCache(ttl, capacity)
+    if capacity is None:
+        return UnboundedCache()
+    if eviction_policy == "lru":
+        return LRUCache(capacity)
+    if eviction_policy == "lfu":
+        return LFUCache(capacity)
+    return RandomCache(capacity)
@@ -0,0 +1,60 @@
+import bisect
+import hashlib
+
+
+def _hash(value):
+    # 64-битный хеш строкового представления; стабилен между запусками, в отличие от hash()
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    """Консистентное хеширование с виртуальными узлами.
+
+    Каждый узел занимает virtual_nodes точек на кольце; ключ принадлежит первой
+    точке по часовой стрелке. При добавлении или удалении узла переезжает только
+    доля ключей ~1/N. Для репликации берутся следующие различные узлы по кольцу;
+    списки для каждой точки считаются заранее, поэтому поиск — один bisect.
+    """
+
+    def __init__(self, nodes, virtual_nodes=100, replicas=1):
+        self.nodes = list(nodes)
+        if not self.nodes:
+            raise ValueError("Hash ring needs at least one node")
+        if not 1 <= replicas <= len(self.nodes):
+            raise ValueError("Replication factor must be between 1 and number of nodes")
+        self.virtual_nodes = virtual_nodes
+        self.replicas = replicas
+
+        points = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(virtual_nodes)
+        )
+        self._positions = [position for position, _ in points]
+        owners = [node for _, node in points]
+
+        # Для каждой точки — replicas различных узлов, начиная с нее
+        self._preference = []
+        size = len(owners)
+        for start in range(size):
+            chosen = []
+            offset = 0
+            while len(chosen) < replicas:
+                node = owners[(start + offset) % size]
+                if node not in chosen:
+                    chosen.append(node)
+                offset += 1
+            self._preference.append(tuple(chosen))
+
+    def _index(self, key):
+        index = bisect.bisect_right(self._positions, _hash(key))
+        return index if index < len(self._positions) else 0
+
+    def node_for(self, key):
+        """Узел-владелец ключа."""
+        return self._preference[self._index(key)][0]
+
+    def nodes_for(self, key):
+        """replicas различных узлов, хранящих ключ (первый — владелец)."""
+        return self._preference[self._index(key)]
@@ -0,0 +1,119 @@
+import math
+import random
+from array import array
+
+import numpy as np
+
+KEY_DISTRIBUTIONS = ("uniform", "zipf", "hotspot", "latest")
+
+
+class KeySpace:
+    """Общее для всех пользователей P пространство ключей с заданной популярностью.
+
+    Ключи выдаются по возрастанию (new_key) и становятся доступными для чтения
+    после успешной записи (commit); записанные ключи лежат в компактном массиве
+    array("q") в порядке записи (8 байт на ключ). Распределения ключей для чтения:
+      "uniform" — равномерно по записанным ключам;
+      "zipf"    — Zipf(s) по рангу, ранг 1 — самый ранний ключ;
+      "hotspot" — с вероятностью hot_probability из первых hot_fraction ключей,
+                  иначе из остальных;
+      "latest"  — Zipf(s) по «возрасту»: чаще всего читаются последние записи.
+    uniform и hotspot выбирают ключ за O(1); zipf и latest — за O(log n) бинарным
+    поиском по накопленным весам рангов (массив весов растет вместе с ключами,
+    поэтому таблицу не нужно перестраивать, как таблицу псевдонимов).
+    num_keys ограничивает пространство: когда все ключи выданы, записи обновляют
+    существующие ключи, выбранные по тому же распределению.
+    """
+
+    def __init__(
+        self,
+        distribution="uniform",
+        zipf_s=1.0,
+        hot_fraction=0.2,
+        hot_probability=0.8,
+        num_keys=None,
+        streams=None,
+    ):
+        if distribution not in KEY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown key distribution: {distribution}")
+        if not 0 < hot_fraction < 1:
+            raise ValueError("hot_fraction must be between 0 and 1")
+        self.distribution = distribution
+        self.zipf_s = zipf_s
+        self.hot_fraction = hot_fraction
+        self.hot_probability = hot_probability
+        self.num_keys = num_keys
+
+        self._keys = array("q")
+        # Признак «ключ уже записан» по номеру ключа: повторная запись не дублирует его
+        self._committed = bytearray()
+        self._issued = 0
+        # Накопленные веса рангов r^-s для zipf и latest
+        self._cum_weights = np.empty(0, dtype=np.float64)
+
+        # Равномерные числа из своего подпотока RandomStreams или из random
+        if streams is not None:
+            self._uniform = streams.uniform("keys", 0.0, 1.0).next
+        else:
+            self._uniform = random.random
+
+    def __len__(self):
+        return len(self._keys)
+
+    def new_key(self):
+        """Ключ для записи: новый, пока не исчерпан num_keys, иначе существующий."""
+        if self.num_keys is None or self._issued < self.num_keys:
+            key = self._issued
+            self._issued += 1
+            self._committed.append(0)
+            return key
+        if not self._keys:
+            # Все ключи выданы, но ни одна запись еще не завершилась
+            return int(self._uniform() * self.num_keys)
+        return self.sample()
+
+    def commit(self, key):
+        """Отмечает успешную запись ключа: он становится доступен для чтения."""
+        if self._committed[key]:
+            return
+        self._committed[key] = 1
+        self._keys.append(key)
+
+    def _ensure_weights(self, n):
+        have = len(self._cum_weights)
+        if have >= n:
+            return
+        # Веса досчитываются блоками с запасом, чтобы не пересчитывать на каждый ключ
+        size = max(n, 2 * have, 1024)
+        ranks = np.arange(have + 1, size + 1, dtype=np.float64)
+        tail = np.cumsum(ranks**-self.zipf_s)
+        if have:
+            tail += self._cum_weights[-1]
+        self._cum_weights = np.concatenate([self._cum_weights, tail])
+
+    def _zipf_rank(self, n):
+        # Индекс ранга 0..n-1: бинарный поиск по накопленным весам. Веса возрастают,
+        # а target <= cum[n - 1], поэтому искать можно по всему массиву без среза
+        self._ensure_weights(n)
+        cum_weights = self._cum_weights
+        target = self._uniform() * float(cum_weights[n - 1])
+        return min(int(cum_weights.searchsorted(target, side="right")), n - 1)
+
+    def sample(self):
+        """Ключ для чтения из записанных ключей по заданному распределению."""
+        n = len(self._keys)
+        if not n:
+            raise ValueError("No committed keys to sample")
+        if self.distribution == "uniform":
+            index = int(self._uniform() * n)
+        elif self.distribution == "zipf":
+            index = self._zipf_rank(n)
+        elif self.distribution == "latest":
+            index = n - 1 - self._zipf_rank(n)
+        else:
+            hot = max(1, math.ceil(self.hot_fraction * n))
+            if hot == n or self._uniform() < self.hot_probability:
+                index = int(self._uniform() * hot)
+            else:
+                index = hot + int(self._uniform() * (n - hot))
+        return self._keys[min(index, n - 1)]
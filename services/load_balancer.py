@@ -0,0 +1,116 @@
+import random
+
+from .metrics import LatencySketch
+from .recorder import OUTCOME_ERROR, OUTCOME_REJECTED, outcome_of
+from .write_behind import write_behind_stats
+
+BALANCING_POLICIES = ("round_robin", "least_outstanding", "p2c")
+
+
+class LoadBalancer:
+    """Распределяет запросы P между несколькими репликами ServiceQ.
+
+    Имеет тот же интерфейс process_request, что и ServiceQ, поэтому P работает
+    с балансировщиком без изменений. Политики:
+      "round_robin"       — реплики по кругу;
+      "least_outstanding" — реплика с наименьшим числом незавершенных запросов
+                            (при равенстве — следующая по кругу);
+      "p2c"               — из двух случайных реплик та, у которой меньше
+                            незавершенных запросов (power of two choices).
+    Незавершенные запросы считает сам балансировщик: весь трафик реплик идет через него.
+    """
+
+    def __init__(self, env, replicas, policy="round_robin", relative_accuracy=0.01):
+        if policy not in BALANCING_POLICIES:
+            raise ValueError(f"Unknown balancing policy: {policy}")
+        self.env = env
+        self.replicas = list(replicas)
+        self.policy = policy
+        self.outstanding = [0] * len(self.replicas)
+        self.max_outstanding = [0] * len(self.replicas)
+        self.requests = [0] * len(self.replicas)
+        self.errors = [0] * len(self.replicas)
+        self.rejected = [0] * len(self.replicas)
+        self.latency = [LatencySketch(relative_accuracy) for _ in self.replicas]
+        self._next = 0
+
+    def _pick(self):
+        count = len(self.replicas)
+        if self.policy == "round_robin":
+            index = self._next
+            self._next = (index + 1) % count
+            return index
+        if self.policy == "least_outstanding":
+            start = self._next
+            self._next = (start + 1) % count
+            best = start
+            for offset in range(1, count):
+                index = (start + offset) % count
+                if self.outstanding[index] < self.outstanding[best]:
+                    best = index
+            return best
+        if count == 1:
+            return 0
+        first, second = random.sample(range(count), 2)
+        if self.outstanding[second] < self.outstanding[first]:
+            return second
+        return first
+
+    def process_request(self, req_type, req_id, data=None):
+        index = self._pick()
+        self.requests[index] += 1
+        self.outstanding[index] += 1
+        if self.outstanding[index] > self.max_outstanding[index]:
+            self.max_outstanding[index] = self.outstanding[index]
+        started = self.env.now
+        try:
+            result = yield from self.replicas[index].process_request(
+                req_type, req_id, data
+            )
+        finally:
+            self.outstanding[index] -= 1
+        self.latency[index].add(self.env.now - started)
+        outcome = outcome_of(result)
+        if outcome == OUTCOME_ERROR:
+            self.errors[index] += 1
+        elif outcome == OUTCOME_REJECTED:
+            self.rejected[index] += 1
+        return result
+
+    @property
+    def s_fallback_reads(self):
+        return sum(replica.s_fallback_reads for replica in self.replicas)
+
+    def drained(self):
+        """Событие: фоновые записи всех реплик обработаны."""
+        return self.env.all_of([replica.drained() for replica in self.replicas])
+
+    def stats(self):
+        """Суммарные счетчики реплик Q и метрики каждой реплики отдельно.
+
+        Вложенная сводка write_behind объединяется по всем репликам (write_behind_stats).
+        """
+        replicas = {}
+        totals = {}
+        for index, replica in enumerate(self.replicas):
+            row = replica.stats()
+            for key, value in row.items():
+                if isinstance(value, (int, float)):
+                    totals[key] = totals.get(key, 0) + value
+            sketch = self.latency[index]
+            row.update(
+                requests=self.requests[index],
+                errors=self.errors[index],
+                rejected=self.rejected[index],
+                max_outstanding=self.max_outstanding[index],
+                avg_time=sketch.mean(),
+                p99=sketch.quantile(0.99),
+                max_time=sketch.max if sketch.count else 0.0,
+            )
+            replicas[replica.name] = row
+        queues = [replica.write_behind for replica in self.replicas]
+        if all(queue is not None for queue in queues):
+            totals["write_behind"] = write_behind_stats(queues)
+        totals["policy"] = self.policy
+        totals["replicas"] = replicas
+        return totals
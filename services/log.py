@@ -0,0 +1,67 @@
+import logging
+import logging.handlers
+import queue
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# Обработчик (и фоновый listener для режима queued), установленные configure_logging
+_installed_handler = None
+_listener = None
+
+
+def configure_logging(level="WARNING", handler="stream", buffer_size=10000):
+    """Настраивает логгер пакета services.
+
+    level — уровень логгера ("DEBUG", "INFO", "WARNING", ...).
+    handler — куда писать:
+      "stream"   — StreamHandler в stderr, запись синхронно на каждое сообщение;
+      "buffered" — MemoryHandler: сообщения копятся и сбрасываются пачками по buffer_size
+                   (и сразу при ERROR);
+      "queued"   — QueueHandler: форматирование и вывод выполняются в фоновом потоке.
+    Повторный вызов заменяет ранее установленный обработчик.
+    """
+    global _installed_handler, _listener
+
+    logger = logging.getLogger("services")
+    if _installed_handler is not None:
+        logger.removeHandler(_installed_handler)
+        _installed_handler.close()
+        _installed_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    logger.setLevel(level)
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATEFMT))
+
+    if handler == "stream":
+        installed = stream
+    elif handler == "buffered":
+        installed = logging.handlers.MemoryHandler(
+            buffer_size, flushLevel=logging.ERROR, target=stream
+        )
+    elif handler == "queued":
+        log_queue = queue.SimpleQueue()
+        installed = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream)
+        _listener.start()
+    else:
+        raise ValueError(f"Unknown log handler: {handler}")
+
+    logger.addHandler(installed)
+    _installed_handler = installed
+    return logger
+
+
+def flush_logging():
+    """Сбрасывает буферизованные сообщения (режимы buffered и queued)."""
+    global _listener
+    if _installed_handler is not None:
+        _installed_handler.flush()
+    if _listener is not None:
+        # stop() дожидается, пока фоновый поток выведет всю очередь
+        _listener.stop()
+        _listener.start()
@@ -0,0 +1,213 @@
+import math
+from collections import deque
+
+from .recorder import (
+    OP_CODES,
+    OP_NAMES,
+    OUTCOME_ERROR,
+    OUTCOME_NAMES,
+    OUTCOME_REJECTED,
+    SUMMARY_QUANTILES,
+    outcome_of,
+)
+
+
+class LatencySketch:
+    """Мергируемый скетч латентности с относительной точностью (в духе DDSketch).
+
+    Значение v > 0 попадает в корзину ceil(log_gamma(v)), где
+    gamma = (1 + a) / (1 - a); оценка квантиля отличается от истинного
+    значения не более чем на долю a. Число корзин ограничено диапазоном
+    значений, а не числом наблюдений. Нули (мгновенные ответы T) считаются отдельно.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0.0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                value = 2.0 * self._gamma**index / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class StreamingAggregator:
+    """Онлайн-агрегатор результатов с памятью O(1) по числу запросов.
+
+    Имеет тот же интерфейс record(...), что и ResultRecorder, но хранит
+    только счетчики, скетч латентности и пропускную способность по окнам
+    симуляционного времени (последние max_windows окон).
+    """
+
+    def __init__(self, window=1.0, max_windows=1000, relative_accuracy=0.01):
+        self.window = window
+        # counts[op][outcome]
+        self.counts = [[0] * len(OUTCOME_NAMES) for _ in OP_NAMES]
+        self.latency = LatencySketch(relative_accuracy)
+        self.latency_by_op = {name: LatencySketch(relative_accuracy) for name in OP_NAMES}
+        self.windows = deque(maxlen=max_windows)
+        self._window_index = None
+        self._window_count = 0
+        self.first_start = math.inf
+        self.last_end = -math.inf
+
+    def __len__(self):
+        return self.latency.count
+
+    def record(self, req_type, req_id, result, start_time, end_time):
+        self.counts[OP_CODES[req_type]][outcome_of(result)] += 1
+
+        duration = end_time - start_time
+        self.latency.add(duration)
+        self.latency_by_op[req_type].add(duration)
+
+        if start_time < self.first_start:
+            self.first_start = start_time
+        if end_time > self.last_end:
+            self.last_end = end_time
+
+        index = int(end_time // self.window)
+        if index != self._window_index:
+            self._close_window()
+            self._window_index = index
+        self._window_count += 1
+
+    def _close_window(self):
+        if self._window_index is not None:
+            self.windows.append((self._window_index * self.window, self._window_count))
+        self._window_count = 0
+
+    def throughput_windows(self):
+        """[(начало окна, запросов в единицу времени), ...] для последних окон."""
+        windows = list(self.windows)
+        if self._window_index is not None:
+            windows.append((self._window_index * self.window, self._window_count))
+        return [(start, count / self.window) for start, count in windows]
+
+    def merge(self, other):
+        for op_counts, other_counts in zip(self.counts, other.counts):
+            for outcome, count in enumerate(other_counts):
+                op_counts[outcome] += count
+        self.latency.merge(other.latency)
+        for name, sketch in other.latency_by_op.items():
+            self.latency_by_op[name].merge(sketch)
+        self.first_start = min(self.first_start, other.first_start)
+        self.last_end = max(self.last_end, other.last_end)
+        return self
+
+    def summary(self):
+        errors = sum(op_counts[OUTCOME_ERROR] for op_counts in self.counts)
+        rejected = sum(op_counts[OUTCOME_REJECTED] for op_counts in self.counts)
+        summary = {
+            "successes": self.latency.count - errors - rejected,
+            "errors": errors,
+            "rejected": rejected,
+            "avg_time": self.latency.mean(),
+        }
+        for name, q in SUMMARY_QUANTILES:
+            summary[name] = self.latency.quantile(q)
+        summary["max_time"] = self.latency.max if self.latency.count else 0.0
+        return summary
+
+
+# Этапы запроса, для которых собираются латентности
+STAGE_Q_QUEUE = "Q.queue"
+STAGE_Q_T = "Q->T"
+STAGE_Q_S = "Q->S"
+STAGE_S_QUEUE = "S.queue"
+STAGE_S_SERVICE = "S.service"
+
+
+class StageStats:
+    """Латентности отдельных этапов запроса (очередь Q, Q->T, Q->S, очередь S, обслуживание S).
+
+    Для каждой пары (этап, тип операции) хранится свой LatencySketch,
+    поэтому память не зависит от числа запросов.
+    """
+
+    QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.sketches = {}
+
+    def record(self, stage, op, duration):
+        key = (stage, op)
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = LatencySketch(self.relative_accuracy)
+        sketch.add(duration)
+
+    def merge(self, other):
+        for (stage, op), sketch in other.sketches.items():
+            key = (stage, op)
+            if key not in self.sketches:
+                self.sketches[key] = LatencySketch(self.relative_accuracy)
+            self.sketches[key].merge(sketch)
+        return self
+
+    @classmethod
+    def _describe(cls, sketch):
+        row = {"count": sketch.count, "mean": sketch.mean()}
+        for name, q in cls.QUANTILES:
+            row[name] = sketch.quantile(q)
+        row["max"] = sketch.max if sketch.count else 0.0
+        return row
+
+    def summary(self):
+        """{этап: {тип операции или "all": {count, mean, p50, p90, p99, max}}}."""
+        by_stage = {}
+        for (stage, op), sketch in sorted(self.sketches.items()):
+            by_stage.setdefault(stage, {})[op] = sketch
+        summary = {}
+        for stage, by_op in by_stage.items():
+            combined = LatencySketch(self.relative_accuracy)
+            for sketch in by_op.values():
+                combined.merge(sketch)
+            summary[stage] = {op: self._describe(s) for op, s in by_op.items()}
+            summary[stage]["all"] = self._describe(combined)
+        return summary
@@ -0,0 +1,54 @@
+import itertools
+import zlib
+
+import numpy as np
+
+
+class BufferedStream:
+    """Поток случайных величин, которые генерируются блоками NumPy.
+
+    draw(generator, n) возвращает массив из n значений; следующий блок
+    генерируется лениво, когда текущий исчерпан. next — это __next__
+    итератора по блокам (уровень C), поэтому одно значение стоит одного вызова
+    без Python-кода на каждое событие.
+    """
+
+    def __init__(self, generator, draw, block_size=4096):
+        self._generator = generator
+        self._draw = draw
+        self.block_size = block_size
+        self.next = itertools.chain.from_iterable(self._blocks()).__next__
+
+    def _blocks(self):
+        while True:
+            yield self._draw(self._generator, self.block_size).tolist()
+
+
+class RandomStreams:
+    """Именованные независимые подпотоки numpy.random.Generator от одного seed.
+
+    Подпоток определяется только seed и своим именем (например, "P3.interarrival"),
+    поэтому его значения не зависят от того, сколько чисел взяли другие потоки.
+    """
+
+    def __init__(self, seed=None, block_size=4096):
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.block_size = block_size
+
+    def generator(self, name):
+        sequence = np.random.SeedSequence(
+            self.entropy, spawn_key=(zlib.crc32(name.encode("utf-8")),)
+        )
+        return np.random.Generator(np.random.PCG64(sequence))
+
+    def stream(self, name, draw):
+        return BufferedStream(self.generator(name), draw, self.block_size)
+
+    def exponential(self, name, mean):
+        return self.stream(name, lambda g, n: g.exponential(mean, n))
+
+    def uniform(self, name, low, high):
+        return self.stream(name, lambda g, n: g.uniform(low, high, n))
+
+    def bernoulli(self, name, p):
+        return self.stream(name, lambda g, n: g.random(n) < p)
@@ -0,0 +1,158 @@
+import numpy as np
+
+# Коды типов операций и исходов в колонках рекордера
+OP_NAMES = ("read", "write")
+OP_CODES = {name: code for code, name in enumerate(OP_NAMES)}
+
+OUTCOME_OK = 0
+OUTCOME_ERROR = 1
+OUTCOME_REJECTED = 2
+OUTCOME_NAMES = ("ok", "error", "rejected")
+
+NO_REASON = -1
+
+# Квантили, которые попадают в сводку run_simulation
+SUMMARY_QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("p999", 0.999))
+
+
+def outcome_of(result):
+    """Исход по ответу Q: "ERROR: ..." — ошибка, "REJECTED: ..." — отказ контроля допуска."""
+    if isinstance(result, str):
+        if result.startswith("ERROR"):
+            return OUTCOME_ERROR
+        if result.startswith("REJECTED"):
+            return OUTCOME_REJECTED
+    return OUTCOME_OK
+
+
+class ResultRecorder:
+    """Колоночное хранилище результатов запросов на массивах NumPy.
+
+    Вместо кортежа на каждый запрос хранит предвыделенные и растущие
+    (удвоением) колонки: float64 для времён, int8 для типа операции и исхода,
+    int32-индекс в таблице интернированных текстов ошибок.
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(1, int(capacity))
+        self._size = 0
+        self._op = np.empty(capacity, dtype=np.int8)
+        self._outcome = np.empty(capacity, dtype=np.int8)
+        self._reason = np.empty(capacity, dtype=np.int32)
+        self._req_id = np.empty(capacity, dtype=np.int64)
+        self._start = np.empty(capacity, dtype=np.float64)
+        self._end = np.empty(capacity, dtype=np.float64)
+        # Таблица интернированных причин ошибок: код -> текст
+        self.reasons = []
+        self._reason_codes = {}
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = 2 * len(self._op)
+        for name in ("_op", "_outcome", "_reason", "_req_id", "_start", "_end"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def intern_reason(self, reason):
+        code = self._reason_codes.get(reason)
+        if code is None:
+            code = len(self.reasons)
+            self._reason_codes[reason] = code
+            self.reasons.append(reason)
+        return code
+
+    def record(self, req_type, req_id, result, start_time, end_time):
+        i = self._size
+        if i == len(self._op):
+            self._grow()
+
+        self._op[i] = OP_CODES[req_type]
+        self._req_id[i] = req_id
+        self._start[i] = start_time
+        self._end[i] = end_time
+        outcome = outcome_of(result)
+        self._outcome[i] = outcome
+        if outcome == OUTCOME_OK:
+            self._reason[i] = NO_REASON
+        else:
+            self._reason[i] = self.intern_reason(result)
+        self._size = i + 1
+
+    # Колонки (представления без копирования, кроме duration)
+    @property
+    def op(self):
+        return self._op[: self._size]
+
+    @property
+    def outcome(self):
+        return self._outcome[: self._size]
+
+    @property
+    def reason(self):
+        return self._reason[: self._size]
+
+    @property
+    def req_id(self):
+        return self._req_id[: self._size]
+
+    @property
+    def start_time(self):
+        return self._start[: self._size]
+
+    @property
+    def end_time(self):
+        return self._end[: self._size]
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    def outcome_counts(self):
+        """Матрица количеств [тип операции, исход]."""
+        flat = self.op.astype(np.int64) * len(OUTCOME_NAMES) + self.outcome
+        counts = np.bincount(flat, minlength=len(OP_NAMES) * len(OUTCOME_NAMES))
+        return counts.reshape(len(OP_NAMES), len(OUTCOME_NAMES))
+
+    def cumulative_errors(self):
+        """(время завершения, накопленное число ошибок), упорядоченные по времени."""
+        order = np.argsort(self.end_time, kind="stable")
+        errors = np.cumsum(self.outcome[order] == OUTCOME_ERROR)
+        return self.end_time[order], errors
+
+    def summary(self):
+        errors = int(np.count_nonzero(self.outcome == OUTCOME_ERROR))
+        rejected = int(np.count_nonzero(self.outcome == OUTCOME_REJECTED))
+        durations = self.duration
+        summary = {
+            "successes": self._size - errors - rejected,
+            "errors": errors,
+            "rejected": rejected,
+            "avg_time": float(durations.mean()) if self._size else 0.0,
+        }
+        quantiles = [q for _, q in SUMMARY_QUANTILES]
+        values = np.quantile(durations, quantiles) if self._size else [0.0] * len(quantiles)
+        for (name, _), value in zip(SUMMARY_QUANTILES, values):
+            summary[name] = float(value)
+        summary["max_time"] = float(durations.max()) if self._size else 0.0
+        return summary
+
+    def __iter__(self):
+        # Совместимость со старым форматом details:
+        # (req_type, req_id, result, start_time, end_time, duration).
+        # Для успешных запросов прочитанное значение не хранится, result = "OK".
+        for i in range(self._size):
+            reason = self._reason[i]
+            result = self.reasons[reason] if reason != NO_REASON else "OK"
+            start, end = float(self._start[i]), float(self._end[i])
+            yield (
+                OP_NAMES[self._op[i]],
+                int(self._req_id[i]),
+                result,
+                start,
+                end,
+                end - start,
+            )
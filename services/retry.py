@@ -0,0 +1,97 @@
+import random
+
+JITTER_MODES = ("none", "full", "decorrelated")
+
+
+class RetryBudget:
+    """Бюджет повторов — ведро токенов.
+
+    Каждый первый вызов кладет ratio токена, каждый повтор забирает один, поэтому
+    повторов не больше ratio от числа запросов и при перегрузке они не умножают
+    нагрузку. min_rate токенов в единицу времени пополняется всегда, чтобы при
+    редких запросах повторы оставались возможны; capacity — размер ведра.
+    """
+
+    def __init__(self, env, ratio=0.1, min_rate=0.0, capacity=10.0):
+        self.env = env
+        self.ratio = ratio
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = env.now
+
+    def _refill(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def _refill_time(self):
+        now = self.env.now
+        if self.min_rate and now > self._updated:
+            self._refill(self.min_rate * (now - self._updated))
+        self._updated = now
+
+    def deposit(self):
+        self._refill_time()
+        self._refill(self.ratio)
+
+    def withdraw(self):
+        """Забирает токен на повтор; False — бюджет исчерпан, повторять нельзя."""
+        self._refill_time()
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class RetryPolicy:
+    """Политика повторов для одного направления (Q->T или Q->S).
+
+    max_attempts — всего попыток, включая первую. Задержка перед повтором n:
+      "none"         — base_delay * 2^(n-1);
+      "full"         — U(0, base_delay * 2^(n-1)) (full jitter);
+      "decorrelated" — U(base_delay, 3 * предыдущая задержка) (decorrelated jitter);
+    во всех режимах не больше max_delay. budget_ratio включает RetryBudget.
+    """
+
+    def __init__(
+        self,
+        env,
+        max_attempts=3,
+        base_delay=0.01,
+        max_delay=1.0,
+        jitter="full",
+        budget_ratio=None,
+        budget_min_rate=0.0,
+        budget_capacity=10.0,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if jitter not in JITTER_MODES:
+            raise ValueError(f"Unknown jitter mode: {jitter}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget = None
+        if budget_ratio is not None:
+            self.budget = RetryBudget(env, budget_ratio, budget_min_rate, budget_capacity)
+        # Повторы, отказы после последней попытки и повторы, не пропущенные бюджетом
+        self.retries = 0
+        self.exhausted = 0
+        self.budget_rejections = 0
+
+    def backoff(self, attempt, previous):
+        """Задержка перед повтором после неудачной попытки attempt (с 1)."""
+        if self.jitter == "decorrelated":
+            delay = random.uniform(self.base_delay, 3 * max(previous, self.base_delay))
+        else:
+            delay = self.base_delay * 2 ** (attempt - 1)
+            if self.jitter == "full":
+                delay = random.uniform(0, delay)
+        return min(delay, self.max_delay)
+
+    def stats(self, prefix):
+        return {
+            f"{prefix}_retries": self.retries,
+            f"{prefix}_retries_exhausted": self.exhausted,
+            f"{prefix}_budget_rejections": self.budget_rejections,
+        }
@@ -0,0 +1,166 @@
+import simpy
+
+from .deadlines import abandon
+from .errors import DeadlineExceededError, NotFoundError
+from .hash_ring import HashRing
+from .metrics import LatencySketch
+from .service_s import S_CLASSES, class_stats
+
+
+class ServiceSCluster:
+    """Несколько экземпляров ServiceS за консистентным хешированием.
+
+    Интерфейс тот же, что у ServiceS (генераторы read и write), поэтому ServiceQ
+    работает с кластером без изменений. Ключ хранится на replication_factor
+    шардах; запись подтверждается после write_quorum успешных записей реплик,
+    чтение — после read_quorum успешных чтений. Чтение идет сразу на read_quorum
+    реплик, начиная с очередной по кругу (нагрузка распределяется между
+    репликами), и при отказе одной из них добирается следующей репликой.
+    Оставшиеся операции реплик продолжаются в фоне, их результат не ждут.
+    """
+
+    def __init__(
+        self,
+        env,
+        shards,
+        virtual_nodes=100,
+        replication_factor=1,
+        read_quorum=1,
+        write_quorum=None,
+        hot_factor=1.25,
+    ):
+        self.env = env
+        self.shards = {shard.name: shard for shard in shards}
+        if write_quorum is None:
+            write_quorum = replication_factor // 2 + 1
+        if not 1 <= read_quorum <= replication_factor:
+            raise ValueError("read_quorum must be between 1 and replication_factor")
+        if not 1 <= write_quorum <= replication_factor:
+            raise ValueError("write_quorum must be between 1 and replication_factor")
+        self.ring = HashRing(self.shards, virtual_nodes, replication_factor)
+        self.replication_factor = replication_factor
+        self.read_quorum = read_quorum
+        self.write_quorum = write_quorum
+        # Шард считается горячим, если его загрузка выше средней в hot_factor раз
+        self.hot_factor = hot_factor
+        self._rotation = 0
+
+    def _attempt(self, operation):
+        # Ошибка реплики — результат, а не исключение: процесс реплики никогда не падает
+        try:
+            return True, (yield from operation)
+        except RuntimeError as e:
+            return False, e
+
+    def _collect(self, pending, needed, spare):
+        # Ждет needed успехов; spare — генераторы запасных операций на случай отказов.
+        # Возвращает значение первого успеха или бросает последнюю ошибку; если
+        # все отказы реплик — отсутствие ключа (или истекший дедлайн), это
+        # NotFoundError (DeadlineExceededError), а не сбой
+        successes = 0
+        value = None
+        error = None
+        failures = 0
+        not_found = 0
+        expired = 0
+        while pending:
+            waiting = self.env.any_of(pending)
+            try:
+                yield waiting
+            except simpy.Interrupt:
+                # Операцию отменили (проигравшее hedged-чтение) — отменяем и реплики.
+                # Условие тоже откажет от прерванной реплики, но его уже никто не ждет
+                abandon(waiting)
+                for process in pending:
+                    abandon(process)
+                    process.interrupt()
+                raise
+            for process in [p for p in pending if p.triggered]:
+                pending.remove(process)
+                ok, result = process.value
+                if ok:
+                    if not successes:
+                        value = result
+                    successes += 1
+                    if successes >= needed:
+                        return value
+                else:
+                    error = result
+                    failures += 1
+                    if isinstance(result, NotFoundError):
+                        not_found += 1
+                    elif isinstance(result, DeadlineExceededError):
+                        expired += 1
+                    if spare:
+                        pending.append(self.env.process(self._attempt(spare.pop(0))))
+            if successes + len(pending) < needed:
+                break
+        if failures and not_found == failures:
+            raise NotFoundError(f"quorum not reached: {error}")
+        if failures and expired == failures:
+            raise DeadlineExceededError(f"quorum not reached: {error}")
+        raise RuntimeError(f"quorum not reached: {error}")
+
+    def read(self, req_id, deadline=None):
+        replicas = self.ring.nodes_for(req_id)
+        if self.replication_factor == 1:
+            # Без репликации шард отвечает напрямую, без процессов-посредников
+            return (yield from self.shards[replicas[0]].read(req_id, deadline))
+        start = self._rotation % len(replicas)
+        self._rotation += 1
+        order = replicas[start:] + replicas[:start]
+        pending = [
+            self.env.process(self._attempt(self.shards[name].read(req_id, deadline)))
+            for name in order[: self.read_quorum]
+        ]
+        spare = [
+            self.shards[name].read(req_id, deadline) for name in order[self.read_quorum :]
+        ]
+        return (yield from self._collect(pending, self.read_quorum, spare))
+
+    def write(self, req_id, data, deadline=None):
+        replicas = self.ring.nodes_for(req_id)
+        if self.replication_factor == 1:
+            return (yield from self.shards[replicas[0]].write(req_id, data, deadline))
+        pending = [
+            self.env.process(self._attempt(self.shards[name].write(req_id, data, deadline)))
+            for name in replicas
+        ]
+        return (yield from self._collect(pending, self.write_quorum, []))
+
+    def stats(self):
+        """Загрузка и число операций по шардам, суммарная загрузка и горячие шарды."""
+        shards = {name: shard.stats() for name, shard in self.shards.items()}
+        utilizations = [row["utilization"] for row in shards.values()]
+        mean = sum(utilizations) / len(utilizations)
+        stats = {
+            "reads": sum(row["reads"] for row in shards.values()),
+            "writes": sum(row["writes"] for row in shards.values()),
+            "busy_time": sum(row["busy_time"] for row in shards.values()),
+            "capacity_time": sum(row["capacity_time"] for row in shards.values()),
+            "utilization": mean,
+            "max_utilization": max(utilizations),
+            # Отношение самой высокой загрузки к средней: 1.0 — идеальный баланс
+            "imbalance": max(utilizations) / mean if mean > 0 else 1.0,
+            "hot_shards": [
+                name
+                for name, row in shards.items()
+                if mean > 0 and row["utilization"] > self.hot_factor * mean
+            ],
+            "shards": shards,
+        }
+        latency = {op: LatencySketch() for op in S_CLASSES}
+        expired = {op: 0 for op in S_CLASSES}
+        for shard in self.shards.values():
+            for op in S_CLASSES:
+                latency[op].merge(shard.class_latency[op])
+                expired[op] += shard.expired[op]
+        stats["expired"] = sum(expired.values())
+        stats["classes"] = class_stats(latency, expired)
+        batches = [row["batches"] for row in shards.values() if "batches" in row]
+        if batches:
+            stats["batches"] = sum(batches)
+            stats["avg_batch_size"] = (
+                stats["writes"] / stats["batches"] if stats["batches"] else 0.0
+            )
+        return stats
@@ -1,15 +1,12 @@
 import logging
 import random
 
-# Настроим корневой логгер на INFO (можно потом менять уровень извне)
+from .metrics import LatencySketch
+from .recorder import OUTCOME_OK, ResultRecorder, outcome_of
+
+# Обработчики и уровень настраиваются извне (services.log.configure_logging),
+# при импорте модуль ничего не устанавливает
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Установим DEBUG для более подробного вывода
-handler = logging.StreamHandler()
-formatter = logging.Formatter(
-    fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
 
 
 class ServiceP:
@@ -21,6 +18,13 @@ class ServiceP:
         mean_interarrival=0.2,
         read_probability=0.5,
         num_requests=50,
+        recorder=None,
+        streams=None,
+        name="P",
+        open_loop=False,
+        max_in_flight=None,
+        keyspace=None,
+        max_written_ids=None,
     ):
         self.env = env
         self.q_service = q_service
@@ -31,112 +35,225 @@ class ServiceP:
 
         self.completed_requests = 0
         self.written_ids = []  # Список успешно записанных id, чтобы было что читать.
-        # results будет: (req_type, req_id, result, start_time, end_time, duration)
-        self.results = []
+        # max_written_ids ограничивает written_ids: сверх предела список — равномерная
+        # выборка (reservoir sampling) из всех записанных id, память O(max_written_ids)
+        self.max_written_ids = max_written_ids
+        self.written_count = 0
+        # Необязательный общий KeySpace: ключи записей и чтений берутся из него
+        # (с заданным распределением популярности) вместо собственного written_ids
+        self.keyspace = keyspace
+        # Колоночный рекордер результатов; несколько P могут писать в общий
+        self.results = recorder if recorder is not None else ResultRecorder()
+
+        # open_loop — запросы отправляются по расписанию, не дожидаясь ответов на
+        # предыдущие; max_in_flight ограничивает число незавершенных запросов пользователя
+        self.open_loop = open_loop
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.max_observed_in_flight = 0
+        self.delayed_sends = 0
+        self.last_intended = 0.0
+        # Отставание фактической отправки от запланированной (из-за max_in_flight)
+        self.send_delay = LatencySketch()
+        self._slot_freed = None
+
+        # Необязательный RandomStreams: интервалы и выбор read/write берутся
+        # из заранее сгенерированных блоков собственных подпотоков
+        self._interarrivals = None
+        self._read_flags = None
+        if streams is not None:
+            if arrival_process == "poisson":
+                self._interarrivals = streams.exponential(
+                    f"{name}.interarrival", mean_interarrival
+                )
+            self._read_flags = streams.bernoulli(f"{name}.read", read_probability)
 
         # Логируем начальную конфигурацию
         logger.info(
-            f"ServiceP initialized with: arrival_process={arrival_process}, "
-            f"mean_interarrival={mean_interarrival}, read_probability={read_probability}, "
-            f"num_requests={num_requests}"
+            "ServiceP initialized with: arrival_process=%s, mean_interarrival=%s, "
+            "read_probability=%s, num_requests=%s",
+            arrival_process,
+            mean_interarrival,
+            read_probability,
+            num_requests,
         )
 
         self.action = env.process(self.run())
 
     def run(self):
         logger.info("ServiceP starting request generation...")
-        req_id_counter = 0
+        self._req_id_counter = 0
+
+        # Уровни проверяются один раз: выключенное логирование в цикле ничего не стоит
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        self._info = logger.isEnabledFor(logging.INFO)
+        self._warning = logger.isEnabledFor(logging.WARNING)
+
+        if self.open_loop:
+            yield from self._run_open_loop()
+        else:
+            yield from self._run_closed_loop()
 
+        logger.info("ServiceP finished generating requests.")
+
+    def _run_closed_loop(self):
+        # Следующий запрос планируется только после ответа на предыдущий
         while self.completed_requests < self.num_requests:
             interarrival = self.get_interarrival()
             yield self.env.timeout(interarrival)
 
-            # Определяем тип запроса
-            if self.written_ids and random.random() < self.read_probability:
-                req_type = "read"
-            else:
-                req_type = "write"
-
-            if req_type == "write":
-                req_id_counter += 1
-                current_req_id = req_id_counter
-                data = f"data_{current_req_id}"
-            else:
-                # Если читаем, но нет данных - делаем запись
-                if not self.written_ids:
-                    logger.debug(
-                        "No data available for reading, forcing a WRITE request."
-                    )
-                    req_type = "write"
-                    req_id_counter += 1
-                    current_req_id = req_id_counter
-                    data = f"data_{current_req_id}"
-                    logger.debug(
-                        f"Forced WRITE request for id={current_req_id} at time={self.env.now:.4f}."
-                    )
-                else:
-                    current_req_id = random.choice(self.written_ids)
-                    data = None
-                    logger.debug(
-                        f"Generated READ request for id={current_req_id} at time={self.env.now:.4f}."
-                    )
-
+            req_type, req_id, data = self._make_request()
             start_time = self.env.now
+            self._log_send(req_type, req_id, start_time)
+            result = yield from self.q_service.process_request(req_type, req_id, data)
+            self._complete(req_type, req_id, result, start_time)
+
+    def _run_open_loop(self):
+        # Моменты отправки — накопленная сумма интервалов, не зависящая от ответов.
+        # Если достигнут max_in_flight, отправка откладывается, но латентность
+        # все равно считается от запланированного момента (без coordinated omission)
+        for intended in self._schedule():
+            self.last_intended = intended
+            if intended > self.env.now:
+                yield self.env.timeout(intended - self.env.now)
+            while self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                self._slot_freed = self.env.event()
+                yield self._slot_freed
+            delay = self.env.now - intended
+            if delay > 0:
+                self.delayed_sends += 1
+            self.send_delay.add(delay)
+
+            req_type, req_id, data = self._make_request()
+            self._log_send(req_type, req_id, self.env.now)
+            self.in_flight += 1
+            if self.in_flight > self.max_observed_in_flight:
+                self.max_observed_in_flight = self.in_flight
+            self.env.process(self._send(req_type, req_id, data, intended))
+
+        # Генерация закончена, когда ответили на все отправленные запросы
+        while self.in_flight:
+            self._slot_freed = self.env.event()
+            yield self._slot_freed
+
+    def _schedule(self):
+        # Запланированные моменты отправки открытого цикла
+        intended = self.env.now
+        for _ in range(self.num_requests):
+            intended += self.get_interarrival()
+            yield intended
+
+    def _send(self, req_type, req_id, data, intended):
+        try:
+            result = yield from self.q_service.process_request(req_type, req_id, data)
+            self._complete(req_type, req_id, result, intended)
+        finally:
+            self.in_flight -= 1
+            if self._slot_freed is not None and not self._slot_freed.triggered:
+                self._slot_freed.succeed()
+
+    def _make_request(self):
+        if self.keyspace is not None:
+            if len(self.keyspace) and self._draw_read():
+                return "read", self.keyspace.sample(), None
+            req_id = self.keyspace.new_key()
+            return "write", req_id, f"data_{req_id}"
+
+        # Тип запроса и id: чтение случайного ранее записанного id или новая запись
+        if self.written_ids and self._draw_read():
+            req_id = random.choice(self.written_ids)
+            if self._debug:
+                logger.debug(
+                    "Generated READ request for id=%s at time=%.4f.",
+                    req_id,
+                    self.env.now,
+                )
+            return "read", req_id, None
+
+        # Иначе (в том числе, пока читать нечего) — запись нового id
+        self._req_id_counter += 1
+        req_id = self._req_id_counter
+        return "write", req_id, f"data_{req_id}"
+
+    def _log_send(self, req_type, req_id, start_time):
+        if self._debug:
             logger.debug(
-                f"Sending {req_type.upper()} request (id={current_req_id}) to Q at time={start_time:.4f}..."
+                "Sending %s request (id=%s) to Q at time=%.4f...",
+                req_type.upper(),
+                req_id,
+                start_time,
             )
 
-            result = yield self.env.process(
-                self.q_service.process_request(req_type, current_req_id, data)
-            )
+    def _complete(self, req_type, req_id, result, start_time):
+        end_time = self.env.now
 
-            end_time = self.env.now
-            duration = end_time - start_time
-
-            # Логируем результат запроса
-            if req_type == "write":
-                if result == "OK":
-                    logger.info(
-                        f"WRITE request (id={current_req_id}) succeeded at time={end_time:.4f}, "
-                        f"duration={duration:.4f}. Data stored."
-                    )
-                else:
-                    logger.warning(
-                        f"WRITE request (id={current_req_id}) FAILED at time={end_time:.4f}, "
-                        f"duration={duration:.4f}, result={result}"
-                    )
-            else:
-                if result.startswith("ERROR"):
-                    logger.warning(
-                        f"READ request (id={current_req_id}) FAILED at time={end_time:.4f}, "
-                        f"duration={duration:.4f}, result={result}"
-                    )
-                else:
-                    logger.info(
-                        f"READ request (id={current_req_id}) succeeded at time={end_time:.4f}, "
-                        f"duration={duration:.4f}, returned data."
-                    )
-
-            # Сохраняем результат
-            self.results.append(
-                (req_type, current_req_id, result, start_time, end_time, duration)
+        # Логируем результат запроса
+        failed = outcome_of(result) != OUTCOME_OK
+        if failed and self._warning:
+            logger.warning(
+                "%s request (id=%s) FAILED at time=%.4f, duration=%.4f, result=%s",
+                req_type.upper(),
+                req_id,
+                end_time,
+                end_time - start_time,
+                result,
+            )
+        elif not failed and self._info:
+            logger.info(
+                "%s request (id=%s) succeeded at time=%.4f, duration=%.4f.",
+                req_type.upper(),
+                req_id,
+                end_time,
+                end_time - start_time,
             )
 
-            # Если успешная запись - добавим id
-            if req_type == "write" and result == "OK":
-                self.written_ids.append(current_req_id)
+        # Сохраняем результат
+        self.results.record(req_type, req_id, result, start_time, end_time)
+
+        # Если успешная запись - добавим id
+        if req_type == "write" and result == "OK":
+            self._on_written(req_id)
 
-            self.completed_requests += 1
+        self.completed_requests += 1
+        if self._debug:
             logger.debug(
-                f"Completed {self.completed_requests}/{self.num_requests} requests so far."
+                "Completed %s/%s requests so far.",
+                self.completed_requests,
+                self.num_requests,
             )
 
-        logger.info("ServiceP finished generating requests.")
+    def _on_written(self, req_id):
+        if self.keyspace is not None:
+            self.keyspace.commit(req_id)
+            return
+        self.written_count += 1
+        if self.max_written_ids is None or len(self.written_ids) < self.max_written_ids:
+            self.written_ids.append(req_id)
+            return
+        # Алгоритм R: i-й записанный id попадает в выборку с вероятностью k / i
+        slot = random.randrange(self.written_count)
+        if slot < self.max_written_ids:
+            self.written_ids[slot] = req_id
+
+    def stats(self):
+        """Статистика открытого цикла: отложенные отправки и их задержка."""
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_observed_in_flight,
+            "delayed_sends": self.delayed_sends,
+            "send_delay_mean": self.send_delay.mean(),
+            "send_delay_max": self.send_delay.max if self.send_delay.count else 0.0,
+        }
+
+    def _draw_read(self):
+        if self._read_flags is not None:
+            return self._read_flags.next()
+        return random.random() < self.read_probability
 
     def get_interarrival(self):
         if self.arrival_process == "poisson":
-            val = random.expovariate(1.0 / self.mean_interarrival)
-            logger.debug(f"Poisson arrival chosen, interval={val:.4f}")
-            return val
+            if self._interarrivals is not None:
+                return self._interarrivals.next()
+            return random.expovariate(1.0 / self.mean_interarrival)
         else:
             return self.mean_interarrival
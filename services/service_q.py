@@ -1,97 +1,552 @@
 import simpy
 
+from .deadlines import DeadlineScheduler, abandon
+from .errors import CircuitOpenError, DeadlineExceededError, NotFoundError, RejectedError
+from .metrics import STAGE_Q_QUEUE, STAGE_Q_S, STAGE_Q_T, LatencySketch
+from .write_behind import WriteBehindQueue
+
+WRITE_POLICIES = ("write_through", "write_behind")
+
+
+def _failure(hop, error):
+    # Ошибка с префиксом направления; отсутствие ключа и истекший дедлайн сохраняют тип
+    cls = RuntimeError
+    for kind in (NotFoundError, DeadlineExceededError):
+        if isinstance(error, kind):
+            cls = kind
+    return cls(f"{hop} failed: {str(error)}")
+
 
 class ServiceQ:
-    def __init__(self, env, response_timeout, service_t, service_s):
+    def __init__(
+        self,
+        env,
+        response_timeout,
+        service_t,
+        service_s,
+        stages=None,
+        cancellable_timeouts=True,
+        read_through=False,
+        single_flight=False,
+        write_policy="write_through",
+        write_queue_size=1000,
+        flush_workers=1,
+        concurrency_limit=None,
+        hedge_reads=False,
+        hedge_percentile=0.95,
+        hedge_delay=None,
+        hedge_min_samples=20,
+        t_retry=None,
+        s_retry=None,
+        t_breaker=None,
+        s_breaker=None,
+        admission=None,
+        propagate_deadlines=False,
+        name="Q",
+    ):
         self.env = env
+        self.name = name
         self.response_timeout = response_timeout
         self.service_t = service_t
         self.service_s = service_s
+        # Необязательный StageStats: латентности каждого обращения к T и S
+        self.stages = stages
+        # Отменяемые таймауты: после завершения операции ее таймер не остается
+        # в куче SimPy. False — прежний env.timeout() на каждый вызов.
+        self.deadlines = DeadlineScheduler(env) if cancellable_timeouts else None
+        # read_through — значение, прочитанное из S после промаха T, записывается в T.
+        # single_flight — одновременные промахи по одному ключу ждут одно чтение S.
+        self.read_through = read_through
+        self.single_flight = single_flight
+        self._inflight = {}
+        # Чтения, ушедшие в S из-за промаха или отказа T
+        self.s_fallback_reads = 0
+        # Чтения, присоединившиеся к уже идущему чтению S того же ключа
+        self.coalesced_reads = 0
+        # Значения из S, записанные обратно в T, и неудачные попытки записи
+        self.read_through_fills = 0
+        self.read_through_failures = 0
+        # Заполнения T, пропущенные, чтобы не затереть более свежее значение: ключ уже
+        # есть в T или пока шло чтение S, ключ записали
+        self.read_through_skips = 0
+        # Ключи с идущими чтениями read-through: {req_id: [чтений, записей за это время]}
+        self._fill_versions = {}
+        # write_through — клиент ждет записи в T и S; write_behind — подтверждение
+        # после T, запись в S через фоновую очередь (см. WriteBehindQueue)
+        if write_policy not in WRITE_POLICIES:
+            raise ValueError(f"Unknown write policy: {write_policy}")
+        self.write_policy = write_policy
+        self.write_behind = None
+        if write_policy == "write_behind":
+            self.write_behind = WriteBehindQueue(
+                env, service_s, capacity=write_queue_size, flush_workers=flush_workers
+            )
+        # Чтения из S, не нашедшие ключ, запись которого еще в очереди write-behind
+        self.unflushed_reads = 0
+        # Пул обработчиков: одновременно выполняется не больше concurrency_limit
+        # запросов, остальные ждут в очереди (None — без ограничения)
+        self.workers = None
+        if concurrency_limit is not None:
+            self.workers = simpy.Resource(env, capacity=concurrency_limit)
+        # Hedged-чтения из S: если первое чтение не ответило за hedge_delay, идет
+        # второе, и берется первый успешный ответ. hedge_delay=None — задержка равна
+        # hedge_percentile латентности успешных чтений S (после hedge_min_samples чтений)
+        self.hedge_reads = hedge_reads
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.s_read_latency = LatencySketch()
+        # Отправленные вторые чтения, победы второго чтения и прерванные проигравшие
+        self.hedged_reads = 0
+        self.hedge_wins = 0
+        self.cancelled_reads = 0
+        # Необязательные RetryPolicy для обращений к T и S (None — без повторов)
+        self.t_retry = t_retry
+        self.s_retry = s_retry
+        # Необязательные CircuitBreaker для T и S: пока автомат S разомкнут, чтения
+        # обслуживаются только из T, а промахи и записи сразу получают ошибку;
+        # при разомкнутом автомате T чтения идут сразу в S
+        self.t_breaker = t_breaker
+        self.s_breaker = s_breaker
+        # Необязательный AdmissionController: вызовы S сверх его лимита отклоняются
+        # (ответ "REJECTED: ..."), а не копятся в очереди S
+        self.admission = admission
+        # Передавать S абсолютный дедлайн вызова (момент вызова + response_timeout):
+        # по нему работает планировщик edf, и S не выполняет операции, которые
+        # уже не успеют до таймаута Q
+        self.propagate_deadlines = propagate_deadlines
+
+    def _record_stage(self, stage, op, started):
+        if self.stages is not None:
+            self.stages.record(stage, op, self.env.now - started)
+
+    def _timer(self, delay):
+        # Отменяемый таймер DeadlineScheduler (или env.timeout); возвращает (deadline, event)
+        if self.deadlines is not None:
+            deadline = self.deadlines.schedule(delay)
+            return deadline, deadline.event
+        return None, self.env.timeout(delay)
+
+    def _guarded(self, event):
+        # Ждем событие не дольше response_timeout; возвращает (timed_out, value)
+        deadline, timeout_event = self._timer(self.response_timeout)
+        try:
+            res = yield event | timeout_event
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+        if timeout_event in res:
+            # Операция продолжает выполняться, но ее результат больше не нужен
+            abandon(event)
+            return True, None
+        return False, res[event]
 
     def process_request(self, req_type, req_id, data=None):
+        if self.workers is None:
+            return (yield from self._handle(req_type, req_id, data))
+        requested = self.env.now
+        with self.workers.request() as req:
+            yield req
+            self._record_stage(STAGE_Q_QUEUE, req_type, requested)
+            return (yield from self._handle(req_type, req_id, data))
+
+    def _handle(self, req_type, req_id, data):
+        # Обращения к T и S выполняются внутри этого же процесса через yield from:
+        # отдельный процесс SimPy создается только для самой операции S
         try:
             if req_type == "write":
+                self._note_write(req_id)
                 # Сначала пишем в T
-                yield self.env.process(self.wrap_t_write(req_id, data))
-                # Если успешно, пишем в S
-                yield self.env.process(self.wrap_s_write(req_id, data))
+                if self.t_retry is None:
+                    self.wrap_t_write(req_id, data)
+                else:
+                    yield from self._retrying(
+                        self.t_retry, self._instant, self.wrap_t_write, req_id, data
+                    )
+                # Если успешно, пишем в S (или ставим запись в очередь)
+                if self.write_behind is not None:
+                    yield from self._enqueue_s_write(req_id, data)
+                else:
+                    yield from self.wrap_s_write(req_id, data)
                 return "OK"
             elif req_type == "read":
                 # Пробуем читать из T
                 try:
-                    res_t = yield self.env.process(self.wrap_t_read(req_id))
-                    return res_t
+                    if self.t_retry is None:
+                        return self.wrap_t_read(req_id)
+                    return (
+                        yield from self._retrying(
+                            self.t_retry, self._instant, self.wrap_t_read, req_id
+                        )
+                    )
                 except RuntimeError:
                     # Пробуем читать из S
-                    res_s = yield self.env.process(self.wrap_s_read(req_id))
+                    self.s_fallback_reads += 1
+                    try:
+                        if self.single_flight:
+                            res_s = yield from self._coalesced_s_read(req_id)
+                        else:
+                            res_s = yield from self.wrap_s_read(req_id)
+                    except RuntimeError:
+                        if (
+                            self.write_behind is not None
+                            and req_id in self.write_behind.unflushed
+                        ):
+                            self.unflushed_reads += 1
+                        raise
                     return res_s
+        except RejectedError as e:
+            return f"REJECTED: {str(e)}"
         except RuntimeError as e:
             return f"ERROR: {str(e)}"
 
-    def wrap_t_read(self, req_id):
-        # Чтение из T с таймаутом
-        timeout_event = self.env.timeout(self.response_timeout)
-        read_proc = self.env.process(self._safe_t_read(req_id))
-        res = yield read_proc | timeout_event
-        if timeout_event in res:
-            raise RuntimeError("T read timeout")
-        return list(res.values())[0]
+    def stats(self):
+        stats = {
+            "s_fallback_reads": self.s_fallback_reads,
+            "coalesced_reads": self.coalesced_reads,
+            "read_through_fills": self.read_through_fills,
+            "read_through_failures": self.read_through_failures,
+            "read_through_skips": self.read_through_skips,
+        }
+        for prefix, policy in (("t", self.t_retry), ("s", self.s_retry)):
+            if policy is not None:
+                stats.update(policy.stats(prefix))
+        for prefix, breaker in (("t", self.t_breaker), ("s", self.s_breaker)):
+            if breaker is not None:
+                stats[f"{prefix}_breaker_opened"] = breaker.opened
+                stats[f"{prefix}_breaker_rejections"] = breaker.rejected
+        if self.admission is not None:
+            stats.update(self.admission.stats())
+        if self.hedge_reads:
+            stats["hedged_reads"] = self.hedged_reads
+            stats["hedge_wins"] = self.hedge_wins
+            stats["cancelled_reads"] = self.cancelled_reads
+        if self.write_behind is not None:
+            stats["unflushed_reads"] = self.unflushed_reads
+            stats["write_behind"] = self.write_behind.stats()
+        return stats
 
-    def wrap_t_write(self, req_id, data):
-        # Запись в T с таймаутом
-        timeout_event = self.env.timeout(self.response_timeout)
-        write_proc = self.env.process(self._safe_t_write(req_id, data))
-        res = yield write_proc | timeout_event
-        if timeout_event in res:
-            raise RuntimeError("T write timeout")
-        return True
+    def drained(self):
+        """Событие: все записи write-behind обработаны (сразу, если очереди нет)."""
+        if self.write_behind is None:
+            return self.env.event().succeed()
+        return self.write_behind.drained()
 
-    def wrap_s_read(self, req_id):
-        # Чтение из S с таймаутом
-        timeout_event = self.env.timeout(self.response_timeout)
-        read_proc = self.env.process(self._safe_s_read(req_id))
-        res = yield read_proc | timeout_event
-        if timeout_event in res:
-            raise RuntimeError("S read timeout")
-        return list(res.values())[0]
+    def _enqueue_s_write(self, req_id, data):
+        # Ждем места в очереди не дольше response_timeout
+        put = self.write_behind.enqueue(req_id, data)
+        if put.triggered:
+            return True
+        started = self.env.now
+        try:
+            timed_out, _ = yield from self._guarded(put)
+            if timed_out:
+                self.write_behind.cancel(put, req_id)
+                raise RuntimeError("write-behind queue full")
+            return True
+        finally:
+            self._record_stage(STAGE_Q_S, "write", started)
 
-    def wrap_s_write(self, req_id, data):
-        # Запись в S с таймаутом
-        timeout_event = self.env.timeout(self.response_timeout)
-        write_proc = self.env.process(self._safe_s_write(req_id, data))
-        res = yield write_proc | timeout_event
-        if timeout_event in res:
-            raise RuntimeError("write timeout")
-        return True
+    def _note_write(self, req_id):
+        # Запись ключа делает устаревшими значения идущих чтений read-through
+        versions = self._fill_versions.get(req_id)
+        if versions is not None:
+            versions[1] += 1
+
+    def _fill_t(self, req_id, value, version):
+        # Ошибка записи в T не влияет на ответ: значение уже получено из S.
+        # Значение в T не старше прочитанного (записи идут сначала в T), а запись,
+        # начавшаяся во время чтения S, могла не дойти до T — в обоих случаях
+        # устаревшее значение в T не кладем
+        if self._fill_versions[req_id][1] != version or req_id in self.service_t.storage:
+            self.read_through_skips += 1
+            return
+        try:
+            self.service_t.write(req_id, value)
+        except RuntimeError:
+            self.read_through_failures += 1
+        else:
+            self.read_through_fills += 1
+
+    def _coalesced_s_read(self, req_id):
+        pending = self._inflight.get(req_id)
+        if pending is not None:
+            # Ключ уже читается из S: ждем тот же результат (со своим таймаутом)
+            self.coalesced_reads += 1
+            started = self.env.now
+            try:
+                timed_out, value = yield from self._guarded(pending)
+                if timed_out:
+                    raise RuntimeError("S read timeout")
+                return value
+            finally:
+                self._record_stage(STAGE_Q_S, "read", started)
+
+        pending = self._inflight[req_id] = self.env.event()
+        try:
+            value = yield from self.wrap_s_read(req_id)
+        except RuntimeError as e:
+            pending.fail(e)
+            # Ждущих может не быть — ошибка не должна ронять симуляцию
+            pending.defused = True
+            raise
+        else:
+            pending.succeed(value)
+            return value
+        finally:
+            del self._inflight[req_id]
+
+    def _check_breaker(self, breaker, hop):
+        # Разомкнутый автомат отклоняет вызов сразу, без обращения к сервису
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"{hop} circuit open")
+        return self.env.now
 
-    def _safe_t_read(self, req_id):
-        # Безопасное чтение T: перехватываем RuntimeError и поднимаем с понятным сообщением
+    def wrap_t_read(self, req_id):
+        # T отвечает мгновенно, поэтому таймаут ему не нужен и процесс не создается
+        started = self._check_breaker(self.t_breaker, "T")
+        ok = False
         try:
-            val = self.service_t.read(req_id)
-            yield self.env.timeout(0)
-            return val
+            value = self.service_t.read(req_id)
+            ok = True
+            return value
+        except NotFoundError as e:
+            # Промах — исправный ответ T
+            ok = True
+            raise _failure("T", e) from e
         except RuntimeError as e:
-            # Перехватываем и меняем сообщение, если нужно
-            raise RuntimeError(f"T failed: {str(e)}") from e
+            raise _failure("T", e) from e
+        finally:
+            if self.t_breaker is not None:
+                self.t_breaker.record(ok, 0.0)
+            self._record_stage(STAGE_Q_T, "read", started)
 
-    def _safe_t_write(self, req_id, data):
+    def wrap_t_write(self, req_id, data):
+        started = self._check_breaker(self.t_breaker, "T")
+        ok = False
         try:
             self.service_t.write(req_id, data)
-            yield self.env.timeout(0)
+            ok = True
             return True
         except RuntimeError as e:
-            raise RuntimeError(f"T failed: {str(e)}") from e
+            raise _failure("T", e) from e
+        finally:
+            if self.t_breaker is not None:
+                self.t_breaker.record(ok, 0.0)
+            self._record_stage(STAGE_Q_T, "write", started)
 
-    def _safe_s_read(self, req_id):
+    def _call_s(self, operation):
+        # Один процесс на операцию S и одно условие «операция | дедлайн»;
+        # возвращает (timed_out, value), ошибки S получают префикс "S failed"
         try:
-            val = yield self.env.process(self.service_s.read(req_id))
-            return val
+            return (yield from self._guarded(self.env.process(operation)))
         except RuntimeError as e:
-            raise RuntimeError(f"S failed: {str(e)}") from e
+            raise _failure("S", e) from e
+
+    def _s_read(self, req_id, expires):
+        # Генераторы операций S; expires передается S, только если включено propagate_deadlines
+        if self.propagate_deadlines:
+            return self.service_s.read(req_id, deadline=expires)
+        return self.service_s.read(req_id)
+
+    def _s_write(self, req_id, data, expires):
+        if self.propagate_deadlines:
+            return self.service_s.write(req_id, data, deadline=expires)
+        return self.service_s.write(req_id, data)
+
+    def _instant(self, operation, *args):
+        # Мгновенная операция T как попытка для _retrying
+        return operation(*args)
+        yield  # недостижимый yield делает метод генератором
+
+    def _retrying(self, policy, attempt, *args):
+        # Повторяет attempt(*args) по policy; отсутствие ключа, отказ автомата и
+        # истекший дедлайн S не повторяются
+        attempt_number = 1
+        delay = 0.0
+        if policy.budget is not None:
+            policy.budget.deposit()
+        while True:
+            try:
+                return (yield from attempt(*args))
+            except (NotFoundError, CircuitOpenError, DeadlineExceededError):
+                raise
+            except RuntimeError:
+                if attempt_number >= policy.max_attempts:
+                    if policy.max_attempts > 1:
+                        policy.exhausted += 1
+                    raise
+                if policy.budget is not None and not policy.budget.withdraw():
+                    policy.budget_rejections += 1
+                    raise
+            policy.retries += 1
+            delay = policy.backoff(attempt_number, delay)
+            attempt_number += 1
+            yield self.env.timeout(delay)
+
+    def current_hedge_delay(self):
+        """Задержка перед вторым чтением; None — статистики еще мало, чтение одно."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if self.s_read_latency.count < self.hedge_min_samples:
+            return None
+        return self.s_read_latency.quantile(self.hedge_percentile)
+
+    def _hedged_s_read(self, req_id):
+        # Возвращает (timed_out, value), как _guarded. Попытки — отдельные процессы;
+        # abandon сразу, чтобы ошибка или прерывание попытки не роняли симуляцию
+        attempts = []
+        # Второе чтение получает дедлайн первого: таймаут у них общий
+        expires = self.env.now + self.response_timeout
+
+        def start_attempt():
+            process = self.env.process(self._s_read(req_id, expires))
+            abandon(process)
+            attempts.append((process, self.env.now))
+
+        start_attempt()
+        delay = self.current_hedge_delay()
+        deadline, timeout_event = self._timer(self.response_timeout)
+        # Короткая задержка второго чтения — обычный env.timeout: он скоро сработает
+        # сам, а более ранний дедлайн заставил бы сторожа DeadlineScheduler завести
+        # новый таймер, оставив прежний в куче SimPy
+        hedge_event = None
+        if delay is not None and delay < self.response_timeout:
+            hedge_event = self.env.timeout(delay)
+        error = None
+        try:
+            while True:
+                waiting = [process for process, _ in attempts if not process.triggered]
+                if not waiting:
+                    # Все отправленные чтения отказали; второе после отказа не шлем
+                    raise error
+                events = waiting + [timeout_event]
+                if hedge_event is not None:
+                    events.append(hedge_event)
+                try:
+                    yield self.env.any_of(events)
+                except RuntimeError as e:
+                    error = e
+                for process, started in attempts:
+                    if process.triggered and process.ok:
+                        self.s_read_latency.add(self.env.now - started)
+                        if process is not attempts[0][0]:
+                            self.hedge_wins += 1
+                        # Проигравшее чтение прерывается и освобождает слот S
+                        for other, _ in attempts:
+                            if other.is_alive:
+                                other.interrupt("hedged read lost")
+                                self.cancelled_reads += 1
+                        return False, process.value
+                # processed, а не triggered: env.timeout считается triggered сразу
+                if timeout_event.processed:
+                    return True, None
+                if hedge_event is not None and hedge_event.processed:
+                    hedge_event = None
+                    self.hedged_reads += 1
+                    start_attempt()
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+
+    def _s_read_attempt(self, req_id):
+        # Одна попытка чтения из S с таймаутом (и hedged-чтением, если оно включено);
+        # исход попытки, включая таймаут и длительность, учитывает автомат S
+        started = self._check_breaker(self.s_breaker, "S")
+        ok = False
+        try:
+            if self.hedge_reads:
+                try:
+                    timed_out, value = yield from self._hedged_s_read(req_id)
+                except RuntimeError as e:
+                    raise _failure("S", e) from e
+            else:
+                timed_out, value = yield from self._call_s(
+                    self._s_read(req_id, self.env.now + self.response_timeout)
+                )
+            if timed_out:
+                raise RuntimeError("S read timeout")
+            ok = True
+            return value
+        except (NotFoundError, DeadlineExceededError):
+            # Ответ исправного S: ключа нет или S сбросил операцию по дедлайну
+            ok = True
+            raise
+        finally:
+            if self.s_breaker is not None:
+                self.s_breaker.record(ok, self.env.now - started)
 
-    def _safe_s_write(self, req_id, data):
+    def _s_write_attempt(self, req_id, data):
+        started = self._check_breaker(self.s_breaker, "S")
+        ok = False
         try:
-            yield self.env.process(self.service_s.write(req_id, data))
+            timed_out, _ = yield from self._call_s(
+                self._s_write(req_id, data, self.env.now + self.response_timeout)
+            )
+            if timed_out:
+                raise RuntimeError("write timeout")
+            ok = True
             return True
-        except RuntimeError as e:
-            raise RuntimeError(f"S failed: {str(e)}") from e
+        except DeadlineExceededError:
+            ok = True
+            raise
+        finally:
+            if self.s_breaker is not None:
+                self.s_breaker.record(ok, self.env.now - started)
+
+    def _admitted(self, operation):
+        # Вызов S через контроль допуска; место держится на все попытки вызова
+        event = self.admission.request()
+        if not event.triggered:
+            timed_out, _ = yield from self._guarded(event)
+            if timed_out:
+                self.admission.cancel(event)
+                raise RuntimeError("admission queue timeout")
+        started = self.env.now
+        ok = False
+        try:
+            value = yield from operation
+            ok = True
+            return value
+        except NotFoundError:
+            ok = True
+            raise
+        finally:
+            self.admission.release(self.env.now - started, ok)
+
+    def wrap_s_read(self, req_id):
+        started = self.env.now
+        if self.read_through:
+            versions = self._fill_versions.setdefault(req_id, [0, 0])
+            versions[0] += 1
+            version = versions[1]
+        try:
+            if self.s_retry is None:
+                operation = self._s_read_attempt(req_id)
+            else:
+                operation = self._retrying(self.s_retry, self._s_read_attempt, req_id)
+            if self.admission is not None:
+                operation = self._admitted(operation)
+            value = yield from operation
+            if self.read_through:
+                self._fill_t(req_id, value, version)
+            return value
+        finally:
+            if self.read_through:
+                versions[0] -= 1
+                if not versions[0]:
+                    del self._fill_versions[req_id]
+            self._record_stage(STAGE_Q_S, "read", started)
+
+    def wrap_s_write(self, req_id, data):
+        started = self.env.now
+        try:
+            if self.s_retry is None:
+                operation = self._s_write_attempt(req_id, data)
+            else:
+                operation = self._retrying(self.s_retry, self._s_write_attempt, req_id, data)
+            if self.admission is not None:
+                operation = self._admitted(operation)
+            return (yield from operation)
+        finally:
+            self._record_stage(STAGE_Q_S, "write", started)
@@ -1,7 +1,28 @@
+import math
 import random
 
 import simpy
 
+from .errors import DeadlineExceededError, NotFoundError
+from .metrics import STAGE_S_QUEUE, STAGE_S_SERVICE, LatencySketch
+
+S_SCHEDULERS = ("fifo", "priority", "wfq", "edf")
+S_CLASSES = ("read", "write")
+
+
+def class_stats(latency, expired):
+    """Латентность S (очередь + обслуживание) и отброшенные операции по классам."""
+    return {
+        op: {
+            "count": sketch.count,
+            "mean": sketch.mean(),
+            "p99": sketch.quantile(0.99),
+            "max": sketch.max if sketch.count else 0.0,
+            "expired": expired[op],
+        }
+        for op, sketch in latency.items()
+    }
+
 
 class ServiceS:
     def __init__(
@@ -12,36 +33,305 @@ class ServiceS:
         max_write_time,
         max_read_time,
         concurrency_limit,
+        stages=None,
+        streams=None,
+        name="S",
+        group_commit=False,
+        max_batch=16,
+        linger=0.01,
+        fixed_cost=None,
+        per_item_cost=0.0,
+        scheduler="fifo",
+        class_priorities=None,
+        class_weights=None,
+        expected_service_time=0.0,
     ):
         self.env = env
+        self.name = name
         self.read_failure_probability = read_failure_probability
         self.write_failure_probability = write_failure_probability
         self.max_write_time = max_write_time
         self.max_read_time = max_read_time
-        self.resource = simpy.Resource(env, capacity=concurrency_limit)
+        # Планировщик слотов S:
+        #   "fifo"     — общая очередь в порядке поступления;
+        #   "priority" — строгий приоритет классов (меньше class_priorities — раньше);
+        #   "wfq"      — взвешенное справедливое обслуживание классов (self-clocked
+        #                fair queuing): время слотов делится между классами
+        #                пропорционально class_weights;
+        #   "edf"      — раньше обслуживается операция с более ранним дедлайном.
+        # Операция с дедлайном (см. ServiceQ propagate_deadlines) при любом планировщике
+        # не выполняется, если к моменту получения слота до дедлайна осталось меньше
+        # expected_service_time — заранее известной оценки времени обслуживания
+        # (фактическое время операции S до ее выполнения не знает)
+        if scheduler not in S_SCHEDULERS:
+            raise ValueError(f"Unknown S scheduler: {scheduler}")
+        self.scheduler = scheduler
+        self.class_priorities = {"read": 0, "write": 1, **(class_priorities or {})}
+        self.class_weights = {"read": 1.0, "write": 1.0, **(class_weights or {})}
+        self.expected_service_time = expected_service_time
+        if scheduler == "fifo":
+            self.resource = simpy.Resource(env, capacity=concurrency_limit)
+        else:
+            self.resource = simpy.PriorityResource(env, capacity=concurrency_limit)
+        # Число слотов по времени: (момент, слотов) при каждом изменении (set_capacity)
+        # и интеграл числа слотов по времени — стоимость емкости S
+        self.capacity_timeline = [(env.now, concurrency_limit)]
+        self._capacity_area = 0.0
+        self._capacity_changed = env.now
+        # Виртуальное время wfq — метка последней получившей слот операции
+        self._virtual_time = 0.0
+        self._last_finish = {op: 0.0 for op in S_CLASSES}
+        # Время от запроса слота до конца обслуживания и отброшенные по дедлайну операции
+        self.class_latency = {op: LatencySketch() for op in S_CLASSES}
+        self.expired = {op: 0 for op in S_CLASSES}
         self.storage = {}
+        # Суммарное время, в течение которого слоты S были заняты обслуживанием
+        self.busy_time = 0.0
+        self.reads = 0
+        self.writes = 0
+        # Чтения, прерванные во время обслуживания (проигравшие hedged-чтения)
+        self.cancelled_reads = 0
+        # Необязательный StageStats: ожидание слота и время обслуживания отдельно
+        self.stages = stages
+        # Необязательный RandomStreams: времена операций берутся из заранее
+        # сгенерированных блоков собственных подпотоков вместо random.uniform
+        self._read_times = None
+        self._write_times = None
+        if streams is not None:
+            self._read_times = streams.uniform(f"{name}.read_time", 0, max_read_time)
+            self._write_times = streams.uniform(f"{name}.write_time", 0, max_write_time)
+        # Групповая запись: записи копятся до max_batch штук или linger единиц времени
+        # и фиксируются одной операцией, занимающей один слот. Стоимость операции —
+        # fixed_cost + per_item_cost * n (fixed_cost=None — как у одиночной записи).
+        self.group_commit = group_commit
+        self.max_batch = max_batch
+        self.linger = linger
+        self.fixed_cost = fixed_cost
+        self.per_item_cost = per_item_cost
+        self.batches = 0
+        self.max_batch_size = 0
+        self._pending = []
+        self._wakeup = None
+        self._batch_full = None
+        if group_commit:
+            env.process(self._batcher())
+
+    def set_capacity(self, capacity):
+        """Меняет число слотов во время прогона.
+
+        Новые слоты сразу достаются ждущим операциям; при уменьшении операции
+        на лишних слотах доживают до конца, новые ждут, пока занятых не станет меньше.
+        """
+        if capacity < 1:
+            raise ValueError("S capacity must be at least 1")
+        self._capacity_area = self.capacity_time()
+        self._capacity_changed = self.env.now
+        # У simpy.Resource нет публичного изменения емкости: меняем ее напрямую
+        # и повторяем выдачу слотов ожидающим запросам (_trigger_put выдает один слот)
+        resource = self.resource
+        resource._capacity = capacity
+        while resource.queue and resource.count < capacity:
+            resource._trigger_put(None)
+        self.capacity_timeline.append((self.env.now, capacity))
+
+    def capacity_time(self):
+        """Сумма слотов по времени с начала прогона (слот-единицы времени)."""
+        elapsed = self.env.now - self._capacity_changed
+        return self._capacity_area + self.resource.capacity * elapsed
+
+    def _record_stage(self, stage, op, duration):
+        if self.stages is not None:
+            self.stages.record(stage, op, duration)
+
+    def _request(self, op, cost, deadline):
+        # Запрос слота с приоритетом по планировщику (меньше — раньше)
+        if self.scheduler == "fifo":
+            return self.resource.request()
+        if self.scheduler == "priority":
+            priority = self.class_priorities[op]
+        elif self.scheduler == "edf":
+            priority = math.inf if deadline is None else deadline
+        else:
+            # Метка окончания: max(виртуальное время, метка предыдущей операции
+            # класса) + стоимость / вес класса
+            start = max(self._virtual_time, self._last_finish[op])
+            priority = start + cost / self.class_weights[op]
+            self._last_finish[op] = priority
+        return self.resource.request(priority=priority)
+
+    def _granted(self, req):
+        if self.scheduler == "wfq":
+            self._virtual_time = max(self._virtual_time, req.priority)
+
+    def _expire(self, op, deadline):
+        # Операция, которая по оценке не успеет завершиться к дедлайну, не выполняется
+        if deadline is None or self.env.now + self.expected_service_time < deadline:
+            return
+        self.expired[op] += 1
+        raise DeadlineExceededError("S deadline expired")
 
-    def read(self, req_id):
-        with self.resource.request() as req:
+    def _draw_read_time(self):
+        if self._read_times is not None:
+            return self._read_times.next()
+        return random.uniform(0, self.max_read_time)
+
+    def read(self, req_id, deadline=None):
+        requested = self.env.now
+        # wfq нужна стоимость операции до постановки в очередь
+        read_time = self._draw_read_time() if self.scheduler == "wfq" else None
+        with self._request("read", read_time, deadline) as req:
             yield req
-            read_time = random.uniform(0, self.max_read_time)
-            yield self.env.timeout(read_time)
+            self._granted(req)
+            self._record_stage(STAGE_S_QUEUE, "read", self.env.now - requested)
+            if read_time is None:
+                read_time = self._draw_read_time()
+            self._expire("read", deadline)
+            started = self.env.now
+            try:
+                yield self.env.timeout(read_time)
+            except simpy.Interrupt:
+                # Отмененное чтение сразу освобождает слот (выход из with)
+                self.busy_time += self.env.now - started
+                self.cancelled_reads += 1
+                raise
+            self.busy_time += read_time
+            self.reads += 1
+            self._record_stage(STAGE_S_SERVICE, "read", read_time)
+            self.class_latency["read"].add(self.env.now - requested)
 
             if random.random() < self.read_failure_probability:
                 raise RuntimeError("S failed")
 
             if req_id not in self.storage:
-                raise RuntimeError("S: data not found")
+                raise NotFoundError("S: data not found")
 
             return self.storage[req_id]
 
-    def write(self, req_id, data):
-        with self.resource.request() as req:
+    def _draw_write_time(self):
+        if self._write_times is not None:
+            return self._write_times.next()
+        return random.uniform(0, self.max_write_time)
+
+    def write(self, req_id, data, deadline=None):
+        if self.group_commit:
+            return (yield from self._write_batched(req_id, data, deadline))
+        requested = self.env.now
+        write_time = self._draw_write_time() if self.scheduler == "wfq" else None
+        with self._request("write", write_time, deadline) as req:
             yield req
-            write_time = random.uniform(0, self.max_write_time)
+            self._granted(req)
+            self._record_stage(STAGE_S_QUEUE, "write", self.env.now - requested)
+            if write_time is None:
+                write_time = self._draw_write_time()
+            self._expire("write", deadline)
             yield self.env.timeout(write_time)
+            self.busy_time += write_time
+            self.writes += 1
+            self._record_stage(STAGE_S_SERVICE, "write", write_time)
+            self.class_latency["write"].add(self.env.now - requested)
 
             if random.random() < self.write_failure_probability:
                 raise RuntimeError("S failed")
 
             self.storage[req_id] = data
+
+    def _write_batched(self, req_id, data, deadline):
+        # Запись ждет фиксации своей группы; ошибка группы достается всем ее записям.
+        # Дедлайн группой не проверяется: группа фиксируется целиком
+        done = self.env.event()
+        self._pending.append((req_id, data, done, self.env.now, deadline))
+        if self._wakeup is not None and not self._wakeup.triggered:
+            self._wakeup.succeed()
+        if len(self._pending) >= self.max_batch:
+            if self._batch_full is not None and not self._batch_full.triggered:
+                self._batch_full.succeed()
+        return (yield done)
+
+    def _batcher(self):
+        # Первая запись открывает окно linger, заполнение до max_batch закрывает его
+        # досрочно. Группа берется из очереди только после получения слота: пока
+        # все слоты заняты, записи продолжают копиться и группы растут с нагрузкой.
+        # Фиксация идет в отдельном процессе, и следующая группа уже ждет свой слот.
+        while True:
+            if not self._pending:
+                self._wakeup = self.env.event()
+                yield self._wakeup
+                self._wakeup = None
+            if len(self._pending) < self.max_batch and self.linger > 0:
+                self._batch_full = self.env.event()
+                yield self.env.timeout(self.linger) | self._batch_full
+                self._batch_full = None
+            # Группа — операция класса write; для wfq ее стоимость — средняя
+            # одиночная запись, для edf — самый ранний дедлайн ждущих записей
+            deadlines = [item[4] for item in self._pending if item[4] is not None]
+            req = self._request(
+                "write", self._mean_batch_cost(), min(deadlines) if deadlines else None
+            )
+            yield req
+            self._granted(req)
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            self.env.process(self._commit(req, batch))
+
+    def _mean_batch_cost(self):
+        if self.fixed_cost is None:
+            cost = self.max_write_time / 2
+        else:
+            cost = self.fixed_cost
+        return cost + self.per_item_cost * min(len(self._pending), self.max_batch)
+
+    def _commit(self, req, batch):
+        try:
+            started = self.env.now
+            for _, _, _, queued, _ in batch:
+                self._record_stage(STAGE_S_QUEUE, "write", started - queued)
+            if self.fixed_cost is None:
+                cost = self._draw_write_time()
+            else:
+                cost = self.fixed_cost
+            cost += self.per_item_cost * len(batch)
+            yield self.env.timeout(cost)
+            self.busy_time += cost
+            self.writes += len(batch)
+            self.batches += 1
+            if len(batch) > self.max_batch_size:
+                self.max_batch_size = len(batch)
+            for _, _, _, queued, _ in batch:
+                self._record_stage(STAGE_S_SERVICE, "write", cost)
+                self.class_latency["write"].add(self.env.now - queued)
+
+            failed = random.random() < self.write_failure_probability
+            for req_id, data, done, _, _ in batch:
+                if failed:
+                    done.fail(RuntimeError("S failed"))
+                    # Запись могли бросить по таймауту Q — ошибка не должна ронять симуляцию
+                    done.defused = True
+                else:
+                    self.storage[req_id] = data
+                    done.succeed(True)
+        finally:
+            self.resource.release(req)
+
+    def stats(self):
+        """Число операций, загрузка S и латентность по классам операций.
+
+        Загрузка — занятое время / capacity_time (при постоянном числе слотов —
+        / (concurrency_limit * now)).
+        """
+        capacity_time = self.capacity_time()
+        stats = {
+            "reads": self.reads,
+            "writes": self.writes,
+            "busy_time": self.busy_time,
+            "capacity_time": capacity_time,
+            "utilization": self.busy_time / capacity_time if capacity_time > 0 else 0.0,
+            "expired": sum(self.expired.values()),
+            "classes": class_stats(self.class_latency, self.expired),
+        }
+        if self.cancelled_reads:
+            stats["cancelled_reads"] = self.cancelled_reads
+        if self.group_commit:
+            stats["batches"] = self.batches
+            stats["avg_batch_size"] = self.writes / self.batches if self.batches else 0.0
+            stats["max_batch_size"] = self.max_batch_size
+        return stats
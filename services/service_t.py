@@ -1,23 +1,55 @@
 import random
 
+from .errors import NotFoundError
+from .eviction import make_cache
+
 
 class ServiceT:
-    def __init__(self, env, read_failure_probability, write_failure_probability):
+    def __init__(
+        self,
+        env,
+        read_failure_probability,
+        write_failure_probability,
+        capacity=None,
+        eviction_policy="lru",
+        ttl=None,
+    ):
         self.env = env
         self.read_failure_probability = read_failure_probability
         self.write_failure_probability = write_failure_probability
-        self.storage = {}
+        # capacity=None — неограниченный кеш; иначе при переполнении ключ
+        # вытесняется по eviction_policy ("lru", "lfu", "ttl", "random")
+        self.storage = make_cache(capacity, eviction_policy, ttl)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def read(self, req_id):
         # Операция мгновенная, но есть вероятность отказа
         if random.random() < self.read_failure_probability:
             raise RuntimeError("T failed")
-        if req_id not in self.storage:
-            raise RuntimeError("T: data not found")
-        return self.storage[req_id]
+        try:
+            value = self.storage.lookup(req_id, self.env.now)
+        except KeyError:
+            self.misses += 1
+            raise NotFoundError("T: data not found") from None
+        self.hits += 1
+        return value
 
     def write(self, req_id, data):
         # Аналогично, мгновенно, но с вероятностью отказа
         if random.random() < self.write_failure_probability:
             raise RuntimeError("T failed")
-        self.storage[req_id] = data
+        self.evictions += self.storage.insert(req_id, data, self.env.now)
+
+    def stats(self):
+        """Попадания, промахи, вытеснения и истечения TTL кеша T."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.storage.expirations,
+            "size": len(self.storage),
+        }
@@ -0,0 +1,138 @@
+import json
+import struct
+import zlib
+
+from .recorder import OP_CODES, OP_NAMES
+from .service_p import ServiceP
+
+# Запись бинарной трассы: timestamp (double), op (код из OP_CODES), key (int64), size (uint32)
+BINARY_RECORD = struct.Struct("<dBqI")
+# Сколько записей бинарной трассы читается с диска за раз
+READ_CHUNK_RECORDS = 4096
+
+
+def _trace_format(path, trace_format):
+    if trace_format is None:
+        return "jsonl" if str(path).endswith((".jsonl", ".json")) else "binary"
+    if trace_format not in ("jsonl", "binary"):
+        raise ValueError(f"Unknown trace format: {trace_format}")
+    return trace_format
+
+
+def read_trace(path, trace_format=None):
+    """Лениво читает трассу и выдает кортежи (timestamp, op, key, size).
+
+    JSONL — по строке {"timestamp": ..., "op": "read"|"write", "key": ..., "size": ...};
+    binary — записи BINARY_RECORD подряд. Формат по умолчанию определяется по расширению.
+    В памяти одновременно находится не больше одного блока файла.
+    Целые ключи JSONL остаются как есть; остальные (строки вроде "user:0")
+    получают отрицательные целые id -1, -2, ... по порядку первого появления,
+    потому что рекордер и бинарный формат хранят ключ как int64. Таблица таких
+    ключей — единственное, что растет вместе с трассой.
+    """
+    if _trace_format(path, trace_format) == "jsonl":
+        key_ids = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = record["key"]
+                if not isinstance(key, int) or isinstance(key, bool):
+                    key = key_ids.setdefault(json.dumps(key), -1 - len(key_ids))
+                yield (
+                    float(record["timestamp"]),
+                    record["op"],
+                    key,
+                    int(record.get("size", 0)),
+                )
+        return
+
+    chunk_size = BINARY_RECORD.size * READ_CHUNK_RECORDS
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if len(chunk) % BINARY_RECORD.size:
+                raise ValueError(f"Truncated binary trace: {path}")
+            for timestamp, op, key, size in BINARY_RECORD.iter_unpack(chunk):
+                yield timestamp, OP_NAMES[op], key, size
+
+
+def write_trace(path, records, trace_format=None):
+    """Записывает итерируемое (timestamp, op, key, size) в трассу JSONL или binary."""
+    if _trace_format(path, trace_format) == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for timestamp, op, key, size in records:
+                record = {"timestamp": timestamp, "op": op, "key": key, "size": size}
+                f.write(json.dumps(record) + "\n")
+        return
+
+    with open(path, "wb") as f:
+        for timestamp, op, key, size in records:
+            f.write(BINARY_RECORD.pack(timestamp, OP_CODES[op], key, size))
+
+
+def trace_user(key, num_users):
+    """Пользователь, которому достается ключ: все запросы ключа идут от одного пользователя."""
+    return zlib.crc32(str(key).encode("utf-8")) % num_users
+
+
+class TraceReplayP(ServiceP):
+    """Источник запросов, воспроизводящий записанную трассу.
+
+    Запросы отправляются в моменты (timestamp - timestamp первой записи) / speedup
+    в режиме открытого цикла ServiceP (max_in_flight работает так же). При
+    num_users > 1 каждый пользователь воспроизводит только ключи, для которых
+    trace_user(key) == user; каждый читает файл сам, поэтому память не зависит
+    от длины трассы. Запись кладет в T и S размер значения вместо самих данных.
+    """
+
+    def __init__(
+        self,
+        env,
+        q_service,
+        path,
+        trace_format=None,
+        speedup=1.0,
+        user=0,
+        num_users=1,
+        max_in_flight=None,
+        recorder=None,
+        name="P",
+    ):
+        self.path = path
+        self.trace_format = trace_format
+        self.speedup = speedup
+        self.user = user
+        self.num_users = num_users
+        self._record = None
+        super().__init__(
+            env,
+            q_service,
+            num_requests=None,
+            recorder=recorder,
+            name=name,
+            open_loop=True,
+            max_in_flight=max_in_flight,
+        )
+
+    def _schedule(self):
+        start = self.env.now
+        first = None
+        for timestamp, op, key, size in read_trace(self.path, self.trace_format):
+            if first is None:
+                first = timestamp
+            if self.num_users > 1 and trace_user(key, self.num_users) != self.user:
+                continue
+            self._record = (op, key, size)
+            yield start + (timestamp - first) / self.speedup
+
+    def _make_request(self):
+        op, key, size = self._record
+        return op, key, size if op == "write" else None
+
+    def _on_written(self, req_id):
+        # Ключи чтений берутся из трассы — список записанных id не нужен
+        pass
@@ -0,0 +1,124 @@
+import simpy
+
+from .metrics import LatencySketch
+
+
+class WriteBehindQueue:
+    """Асинхронная запись в S через ограниченную очередь (режим write_behind).
+
+    Q подтверждает запись сразу после T и кладет (req_id, data) в simpy.Store
+    емкостью capacity; flush_workers фоновых процессов забирают записи и пишут
+    их в S. Если очередь полна, запись ждет места (обратное давление).
+    Запись, на которой S отказал, теряется — такие записи считаются в lost.
+    """
+
+    def __init__(self, env, service_s, capacity=1000, flush_workers=1):
+        self.env = env
+        self.service_s = service_s
+        self.queue = simpy.Store(env, capacity=capacity)
+        # Ключи, поставленные в очередь, но еще не записанные в S: {req_id: число записей}
+        self.unflushed = {}
+        self.enqueued = 0
+        self.flushed = 0
+        self.lost = 0
+        self.max_depth = 0
+        # Время от подтверждения клиенту до записи в S
+        self.durability_lag = LatencySketch()
+        # Интеграл глубины очереди по времени — для средней глубины
+        self._depth_area = 0.0
+        self._depth_changed = env.now
+        self._in_flight = 0
+        self._drained = []
+        self.workers = [env.process(self._flush()) for _ in range(flush_workers)]
+
+    def __len__(self):
+        """Записи, еще не сохраненные в S (в очереди и в процессе записи)."""
+        return len(self.queue.items) + self._in_flight
+
+    def _track_depth(self):
+        now = self.env.now
+        self._depth_area += len(self.queue.items) * (now - self._depth_changed)
+        self._depth_changed = now
+
+    def enqueue(self, req_id, data):
+        """Ставит запись в очередь; возвращает событие put (сработавшее, если было место)."""
+        self._track_depth()
+        put = self.queue.put((req_id, data, self.env.now))
+        self.unflushed[req_id] = self.unflushed.get(req_id, 0) + 1
+        self.enqueued += 1
+        if len(self.queue.items) > self.max_depth:
+            self.max_depth = len(self.queue.items)
+        return put
+
+    def cancel(self, put, req_id):
+        """Отзывает запись, которая так и не попала в очередь."""
+        put.cancel()
+        self.enqueued -= 1
+        self._forget(req_id)
+
+    def _forget(self, req_id):
+        count = self.unflushed[req_id] - 1
+        if count:
+            self.unflushed[req_id] = count
+        else:
+            del self.unflushed[req_id]
+
+    def _flush(self):
+        while True:
+            self._track_depth()
+            req_id, data, enqueued_at = yield self.queue.get()
+            self._track_depth()
+            self._in_flight += 1
+            try:
+                yield self.env.process(self.service_s.write(req_id, data))
+            except RuntimeError:
+                self.lost += 1
+            else:
+                self.flushed += 1
+                self.durability_lag.add(self.env.now - enqueued_at)
+            self._in_flight -= 1
+            self._forget(req_id)
+            if not len(self):
+                for event in self._drained:
+                    event.succeed()
+                self._drained = []
+
+    def drained(self):
+        """Событие, которое срабатывает, когда все поставленные записи обработаны."""
+        event = self.env.event()
+        if len(self):
+            self._drained.append(event)
+        else:
+            event.succeed()
+        return event
+
+    def stats(self):
+        return write_behind_stats([self])
+
+
+def write_behind_stats(queues):
+    """Сводка по одной или нескольким очередям write-behind (например, реплик Q).
+
+    Счетчики и средняя глубина складываются, max_depth — наибольшая глубина одной
+    очереди, задержка сохранности — по объединенному скетчу всех очередей.
+    """
+    lag = LatencySketch()
+    stats = {"enqueued": 0, "flushed": 0, "lost": 0, "pending": 0, "max_depth": 0}
+    avg_depth = 0.0
+    for queue in queues:
+        queue._track_depth()
+        now = queue.env.now
+        stats["enqueued"] += queue.enqueued
+        stats["flushed"] += queue.flushed
+        stats["lost"] += queue.lost
+        stats["pending"] += len(queue)
+        stats["max_depth"] = max(stats["max_depth"], queue.max_depth)
+        avg_depth += queue._depth_area / now if now > 0 else 0.0
+        lag.merge(queue.durability_lag)
+    stats.update(
+        avg_depth=avg_depth,
+        lag_mean=lag.mean(),
+        lag_p99=lag.quantile(0.99),
+        lag_max=lag.max if lag.count else 0.0,
+    )
+    return stats
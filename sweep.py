@@ -0,0 +1,234 @@
+import copy
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from replications import simulate_metrics
+
+# Меняется при несовместимых изменениях формата кеша
+CACHE_VERSION = 3
+DEFAULT_CACHE_DIR = ".sweep_cache"
+# Исходники модели: их хеш входит в ключ кеша, поэтому после изменения кода
+# (другое поведение сервисов, новые ключи сводки) старые результаты не переиспользуются
+MODEL_SOURCES = ("main.py", "replications.py", "services")
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_code_digest = None
+
+
+def get_path(config, key):
+    """Значение по ключу вида "S.concurrency_limit"."""
+    node = config
+    for part in key.split("."):
+        node = node[part]
+    return node
+
+
+def set_path(config, key, value):
+    """Устанавливает значение по ключу вида "S.concurrency_limit" (промежуточные секции создаются)."""
+    parts = key.split(".")
+    node = config
+    for part in parts[:-1]:
+        node = node.setdefault(part, {})
+    node[parts[-1]] = value
+
+
+def flatten_config(config, prefix=""):
+    """Все листовые ключи конфига в виде {"P.num_users": 5, ...}."""
+    flat = {}
+    for key, value in config.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_config(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+def apply_point(config, point):
+    cfg = copy.deepcopy(config)
+    for key, value in point.items():
+        set_path(cfg, key, value)
+    return cfg
+
+
+def config_hash(config):
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "config": config}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cast(value, low, high):
+    # Целочисленные границы означают целочисленный параметр (num_users, concurrency_limit, ...)
+    if isinstance(low, int) and isinstance(high, int):
+        return int(round(value))
+    return float(value)
+
+
+def grid_design(space):
+    """Полный перебор. space: {ключ: [значения, ...]}."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*space.values())]
+
+
+def linspace_levels(low, high, levels):
+    """Равномерные уровни для grid_design с сохранением целочисленности."""
+    return [_cast(v, low, high) for v in np.linspace(low, high, levels)]
+
+
+def lhs_design(space, n, seed=None):
+    """Латинский гиперкуб. space: {ключ: (low, high)}."""
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(n)]
+    for key, (low, high) in space.items():
+        # По одной точке в каждом из n равных интервалов, интервалы перемешаны
+        u = (rng.permutation(n) + rng.random(n)) / n
+        for point, value in zip(points, low + u * (high - low)):
+            point[key] = _cast(value, low, high)
+    return points
+
+
+def random_design(space, n, seed=None):
+    """Случайный дизайн. space: {ключ: (low, high)} или {ключ: [варианты]}."""
+    rng = random.Random(seed)
+    points = []
+    for _ in range(n):
+        point = {}
+        for key, domain in space.items():
+            if isinstance(domain, list):
+                point[key] = rng.choice(domain)
+            else:
+                low, high = domain
+                point[key] = _cast(rng.uniform(low, high), low, high)
+        points.append(point)
+    return points
+
+
+def code_hash():
+    """SHA-256 исходников модели (MODEL_SOURCES), считается один раз на процесс."""
+    global _code_digest
+    if _code_digest is None:
+        paths = []
+        for source in MODEL_SOURCES:
+            path = os.path.join(_ROOT, source)
+            if os.path.isdir(path):
+                paths.extend(
+                    os.path.join(path, name)
+                    for name in sorted(os.listdir(path))
+                    if name.endswith(".py")
+                )
+            else:
+                paths.append(path)
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(os.path.relpath(path, _ROOT).encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _code_digest = digest.hexdigest()
+    return _code_digest
+
+
+def cache_key(digest):
+    """Ключ результата в кеше: хеш конфига точки вместе с хешем кода модели."""
+    return hashlib.sha256(f"{digest}:{code_hash()}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def _load_cached(cache_dir, digest):
+    try:
+        with open(_cache_path(cache_dir, digest), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached(cache_dir, digest, metrics):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, digest)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(metrics, f)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(base_config, points, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Прогоняет run_simulation для каждой точки дизайна и возвращает «плоскую» таблицу.
+
+    Результат каждой точки кешируется на диске под хешем итогового конфига и кода
+    модели, поэтому при повторном запуске пересчитываются только изменившиеся точки,
+    а после изменения кода — все.
+    Если в конфиге нет seed, он выводится из хеша, чтобы точка была детерминированной.
+    """
+    configs = []
+    digests = []
+    for point in points:
+        cfg = apply_point(base_config, point)
+        digest = config_hash(cfg)
+        if cfg.get("seed") is None:
+            cfg["seed"] = int(digest[:8], 16)
+        configs.append(cfg)
+        digests.append(digest)
+
+    results = {}
+    pending = {}
+    for cfg, digest in zip(configs, digests):
+        if digest in results or digest in pending:
+            continue
+        cached = _load_cached(cache_dir, cache_key(digest)) if cache_dir else None
+        if cached is not None:
+            results[digest] = cached
+        else:
+            pending[digest] = cfg
+
+    if pending:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, len(pending)))
+        if workers == 1:
+            computed = [simulate_metrics(cfg) for cfg in pending.values()]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                computed = list(pool.map(simulate_metrics, pending.values()))
+        for digest, metrics in zip(pending, computed):
+            results[digest] = metrics
+            if cache_dir:
+                _store_cached(cache_dir, cache_key(digest), metrics)
+
+    rows = []
+    for point, digest in zip(points, digests):
+        row = dict(point)
+        row.update(results[digest])
+        row["config_hash"] = digest
+        row["cached"] = digest not in pending
+        rows.append(row)
+    return rows
+
+
+def table_to_csv(rows):
+    """Таблица результатов свипа в виде CSV-строки (одна строка на точку)."""
+    fieldnames = []
+    for row in rows:
+        for key in row:
+            if key not in fieldnames:
+                fieldnames.append(key)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def export_table(rows, path):
+    """Сохраняет таблицу результатов свипа в CSV-файл."""
+    with open(path, "w", newline="") as f:
+        f.write(table_to_csv(rows))
@@ -6,3 +6,26 @@ import simpy
 @pytest.fixture
 def env():
     return simpy.Environment()
+
+
+@pytest.fixture
+def sim_config():
+    # Небольшая конфигурация для быстрых прогонов run_simulation в тестах
+    return {
+        "P": {
+            "arrival_process": "poisson",
+            "mean_interarrival": 0.2,
+            "read_probability": 0.5,
+            "num_requests": 20,
+            "num_users": 3,
+        },
+        "Q": {"response_timeout": 100.0},
+        "T": {"read_failure_probability": 0.1, "write_failure_probability": 0.1},
+        "S": {
+            "read_failure_probability": 0.1,
+            "write_failure_probability": 0.1,
+            "max_write_time": 1.0,
+            "max_read_time": 0.5,
+            "concurrency_limit": 3,
+        },
+    }
@@ -0,0 +1,111 @@
+import pytest
+
+from services import AdmissionController, RejectedError, ServiceQ, ServiceS, ServiceT
+
+
+def test_unknown_policy(env):
+    with pytest.raises(ValueError):
+        AdmissionController(env, "lifo")
+
+
+def test_max_in_flight_rejects_over_limit(env):
+    admission = AdmissionController(env, "max_in_flight", limit=2)
+    assert admission.request().triggered
+    assert admission.request().triggered
+    with pytest.raises(RejectedError):
+        admission.request()
+    admission.release(0.1)
+    assert admission.request().triggered
+    assert admission.stats()["admission_rejected"] == 1
+
+
+def test_bounded_queue_hands_over_slots(env):
+    admission = AdmissionController(env, "bounded_queue", limit=1, queue_size=1)
+    admission.request()
+    waiting = admission.request()
+    assert not waiting.triggered
+    with pytest.raises(RejectedError):
+        admission.request()
+    admission.release(0.1)
+    assert waiting.triggered and waiting.ok
+    assert admission.in_flight == 1
+
+
+def test_cancel_removes_waiter(env):
+    admission = AdmissionController(env, "bounded_queue", limit=1, queue_size=2)
+    admission.request()
+    first = admission.request()
+    second = admission.request()
+    admission.cancel(first)
+    admission.release(0.1)
+    assert not first.triggered
+    assert second.triggered
+
+
+def test_codel_drops_after_persistent_delay(env):
+    admission = AdmissionController(
+        env, "codel", limit=1, queue_size=10, target_delay=0.5, interval=1.0
+    )
+    admission.request()
+    waiters = [admission.request() for _ in range(3)]
+    for waiter in waiters:
+        waiter.defused = True
+
+    env.run(until=1.0)
+    admission.release(1.0)
+    # Задержка выше цели впервые — место выдается
+    assert waiters[0].ok
+    env.run(until=2.0)
+    admission.release(1.0)
+    # Задержка выше цели держится interval — все застоявшиеся ожидающие сбрасываются
+    assert not waiters[1].ok and not waiters[2].ok
+    assert isinstance(waiters[1].value, RejectedError)
+    assert admission.dropped == 2
+    assert admission.request().triggered
+
+
+def test_adaptive_limit_aimd(env):
+    admission = AdmissionController(
+        env, "adaptive", limit=4, latency_target=1.0, backoff=0.5, min_limit=1
+    )
+    admission.request()
+    admission.release(2.0)
+    assert admission.limit == 2.0
+    admission.request()
+    admission.release(0.5)
+    assert admission.limit == pytest.approx(2.5)
+    for _ in range(5):
+        admission.request()
+        admission.release(5.0, ok=False)
+    assert admission.limit == 1
+
+
+def test_q_returns_rejected(env):
+    """Вызов S сверх лимита получает REJECTED и не доходит до S."""
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 10)
+    q = ServiceQ(
+        env,
+        5.0,
+        ServiceT(env, 0.0, 0.0),
+        s_service,
+        admission=AdmissionController(env, "max_in_flight", limit=1),
+    )
+    first = env.process(q.process_request("write", 1, "data"))
+    second = env.process(q.process_request("write", 2, "data"))
+    env.run(until=env.all_of([first, second]))
+
+    assert first.value == "OK"
+    assert second.value == "REJECTED: S overloaded"
+    assert 2 not in s_service.storage
+    assert q.admission.in_flight == 0
+
+
+def test_run_simulation_counts_rejections(sim_config):
+    from main import run_simulation
+
+    sim_config["P"].update(open_loop=True, num_users=10, read_probability=0.0)
+    sim_config["Q"]["admission"] = {"policy": "max_in_flight", "limit": 1}
+    summary = run_simulation(sim_config)
+    assert summary["rejected"] > 0
+    assert summary["rejected"] == summary["Q"]["admission_rejected"]
+    assert summary["successes"] + summary["errors"] + summary["rejected"] == 200
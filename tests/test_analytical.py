@@ -0,0 +1,81 @@
+import copy
+import os
+
+import pytest
+import yaml
+
+from analytical import finite_source_wait, run_analytical, validate_analytical
+
+
+def test_finite_source_wait_no_queue_when_servers_cover_sources():
+    """Если серверов не меньше, чем остальных источников, ждать некому."""
+    prob_wait, cond_mean, cond_var = finite_source_wait(3, 1.0, 1.0, 3)
+    assert (prob_wait, cond_mean, cond_var) == (0.0, 0.0, 0.0)
+
+
+def test_finite_source_wait_single_server():
+    # N = 3, c = 1, lambda * E[X] = 1: входящий видит систему из 2 источников,
+    # p_0 : p_1 : p_2 = 1 : 2 : 2, ожидание при n = 1 и n = 2 — 1 и 2 обслуживания
+    prob_wait, cond_mean, cond_var = finite_source_wait(3, 1.0, 1.0, 1)
+    assert prob_wait == pytest.approx(4 / 5)
+    assert cond_mean == pytest.approx(1.5)
+    assert cond_var == pytest.approx(1.5 + 0.25)
+
+
+def test_no_s_traffic(sim_config):
+    """Без обращений к S латентность нулевая, ошибки — только отказы T."""
+    config = copy.deepcopy(sim_config)
+    config["P"]["read_probability"] = 1.0
+    config["T"]["read_failure_probability"] = 0.0
+
+    estimate = run_analytical(config)
+    assert estimate["avg_time"] == 0.0
+    assert estimate["p99"] == 0.0
+    assert estimate["error_rate"] == 0.0
+    assert estimate["throughput"] == pytest.approx(3 / 0.2)
+
+
+def test_default_config_has_no_timeout_errors():
+    """В конфиге по умолчанию S всегда укладывается в таймаут Q и не отказывает — ошибок нет."""
+    with open(os.path.join(os.path.dirname(__file__), "..", "config.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+
+    assert run_analytical(config)["error_rate"] == 0.0
+
+
+def test_latency_grows_with_users(sim_config):
+    estimates = []
+    for users in (1, 5, 20, 50):
+        config = copy.deepcopy(sim_config)
+        config["P"]["num_users"] = users
+        estimates.append(run_analytical(config))
+
+    for lighter, heavier in zip(estimates, estimates[1:]):
+        assert heavier["avg_time"] >= lighter["avg_time"]
+        assert heavier["p99"] >= lighter["p99"]
+        assert heavier["utilization"] >= lighter["utilization"]
+    # При насыщении пропускная способность упирается в c / (f_s * E[X])
+    assert estimates[-1]["utilization"] == pytest.approx(1.0)
+
+
+def test_timeout_caps_latency(sim_config):
+    config = copy.deepcopy(sim_config)
+    config["P"]["num_users"] = 30
+    config["Q"]["response_timeout"] = 0.5
+
+    estimate = run_analytical(config)
+    assert estimate["p99"] <= 0.5
+    assert estimate["error_rate"] > run_analytical(sim_config)["error_rate"]
+
+
+def test_validate_analytical_low_load(sim_config):
+    """При малой загрузке приближение согласуется с симуляцией."""
+    config = copy.deepcopy(sim_config)
+    config["P"]["num_users"] = 2
+    config["P"]["mean_interarrival"] = 0.5
+    config["P"]["num_requests"] = 300
+    config["seed"] = 1
+
+    (row,) = validate_analytical([config], replications=2, workers=1, tolerance=0.25)
+    assert set(row["relative_error"]) == {"throughput", "avg_time", "p99", "error_rate"}
+    assert row["ok"], row["relative_error"]
@@ -0,0 +1,127 @@
+from unittest.mock import patch
+
+import pytest
+
+from services import Autoscaler, ServiceS
+
+
+def make_s(env, capacity):
+    return ServiceS(env, 0.0, 0.0, 1.0, 1.0, capacity)
+
+
+def flood(env, s_service, period=0.2):
+    """Записи каждые period единиц времени — больше, чем успевает один слот."""
+    req_id = 0
+    while True:
+        env.process(s_service.write(req_id, "d"))
+        req_id += 1
+        yield env.timeout(period)
+
+
+def test_set_capacity_grants_waiting_and_tracks_cost(env):
+    s_service = make_s(env, 1)
+    finished = []
+
+    def writer(req_id):
+        yield env.process(s_service.write(req_id, "d"))
+        finished.append(env.now)
+
+    def resize():
+        yield env.timeout(0.5)
+        s_service.set_capacity(3)
+
+    for req_id in range(3):
+        env.process(writer(req_id))
+    env.process(resize())
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    # Ждавшие записи получили новые слоты сразу после увеличения
+    assert finished == [1.0, 1.5, 1.5]
+    assert s_service.capacity_timeline == [(0, 1), (0.5, 3)]
+    stats = s_service.stats()
+    # 1 слот * 0.5 + 3 слота * 1.0
+    assert stats["capacity_time"] == 3.5
+    assert stats["utilization"] == pytest.approx(3.0 / 3.5)
+
+
+def test_step_policy_scales_up_after_provisioning_delay(env):
+    s_service = make_s(env, 1)
+    autoscaler = Autoscaler(
+        env,
+        s_service,
+        interval=1.0,
+        window=2.0,
+        max_capacity=3,
+        provisioning_delay=1.0,
+        cooldown=0.0,
+    )
+    env.process(flood(env, s_service))
+    with patch("random.uniform", return_value=1.0):
+        env.run(until=10)
+
+    # Первое решение — когда окно заполнено (2.0), слот появляется через 1.0;
+    # дальше рост упирается в max_capacity
+    assert s_service.capacity_timeline == [(0, 1), (3.0, 2), (4.0, 3)]
+    stats = autoscaler.stats()
+    assert stats["scale_ups"] == 2
+    assert stats["scale_downs"] == 0
+    assert stats["max_capacity"] == 3
+    assert stats["capacity_time"] == pytest.approx(1 * 3 + 2 * 1 + 3 * 6)
+
+
+def test_step_policy_scales_down_idle_service_with_cooldown(env):
+    s_service = make_s(env, 4)
+    autoscaler = Autoscaler(
+        env, s_service, interval=1.0, window=1.0, min_capacity=2, cooldown=2.0
+    )
+    env.run(until=10)
+
+    assert s_service.capacity_timeline == [(0, 4), (1.0, 3), (3.0, 2)]
+    assert autoscaler.stats()["scale_downs"] == 2
+    assert autoscaler.stats()["avg_capacity"] == pytest.approx((4 + 3 * 2 + 2 * 7) / 10)
+
+
+def test_target_policy_sizes_capacity_to_demand(env):
+    """Один занятый слот и пять ждущих при целевой загрузке 0.5 — 12 слотов, но не больше max."""
+    s_service = make_s(env, 1)
+    Autoscaler(
+        env,
+        s_service,
+        policy="target",
+        interval=1.0,
+        window=1.0,
+        target_utilization=0.5,
+        max_capacity=8,
+        provisioning_delay=0.0,
+    )
+    with patch("random.uniform", return_value=100.0):
+        for req_id in range(6):
+            env.process(s_service.write(req_id, "d"))
+        env.run(until=2)
+
+    assert s_service.capacity_timeline == [(0, 1), (1.0, 8)]
+    assert s_service.resource.count == 6
+    assert not s_service.resource.queue
+
+
+def test_autoscaler_validates_bounds(env):
+    with pytest.raises(ValueError):
+        Autoscaler(env, make_s(env, 5), min_capacity=1, max_capacity=4)
+    with pytest.raises(ValueError):
+        Autoscaler(env, make_s(env, 1), min_capacity=3, max_capacity=2)
+    with pytest.raises(ValueError):
+        Autoscaler(env, make_s(env, 1), policy="predictive")
+
+
+def test_run_simulation_reports_autoscaling(sim_config):
+    from main import run_simulation
+
+    sim_config["S"]["autoscaling"] = {"enabled": True, "interval": 0.5, "window": 1.0}
+    summary = run_simulation(sim_config)
+
+    row = summary["autoscaling"]["S"]
+    assert row["timeline"][0] == (0, 3)
+    assert summary["s_capacity_time"] == pytest.approx(row["capacity_time"])
+    assert summary["scale_ups"] == row["scale_ups"]
+    assert summary["s_avg_capacity"] == pytest.approx(row["avg_capacity"])
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+from services import CircuitBreaker, RetryPolicy, ServiceQ, ServiceS, ServiceT
+
+
+def make_breaker(env, **kwargs):
+    params = dict(window=10.0, min_calls=4, failure_threshold=0.5, open_duration=5.0)
+    params.update(kwargs)
+    return CircuitBreaker(env, "S", **params)
+
+
+def advance(env, until):
+    env.run(until=until)
+
+
+def test_opens_on_failure_rate(env):
+    breaker = make_breaker(env)
+    for ok in (True, False, True):
+        assert breaker.allow()
+        breaker.record(ok, 0.1)
+    assert breaker.state == "closed"
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_window_forgets_old_calls(env):
+    breaker = make_breaker(env)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    advance(env, 11.0)
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    # Старые отказы выпали из окна: 1 отказ из 4
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_open_breaker(env):
+    breaker = make_breaker(env, slow_call_duration=1.0, slow_call_threshold=0.5)
+    for duration in (0.1, 2.0, 0.1, 2.0):
+        breaker.record(True, duration)
+    assert breaker.state == "open"
+
+
+def test_half_open_closes_after_successful_probes(env):
+    breaker = make_breaker(env, half_open_calls=2)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    advance(env, 5.0)
+    assert breaker.allow() and breaker.allow()
+    assert breaker.state == "half_open"
+    # Пробных вызовов не больше half_open_calls одновременно
+    assert not breaker.allow()
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert [state for _, state in breaker.timeline] == ["closed", "open", "half_open", "closed"]
+    assert breaker.stats()["open_time"] == 5.0
+
+
+def test_half_open_failure_reopens(env):
+    breaker = make_breaker(env)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    advance(env, 6.0)
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+
+
+def test_q_serves_from_t_when_s_open(env):
+    """При разомкнутом автомате S чтения из T проходят, промахи сразу получают ошибку."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    t_service.write(1, "t_data")
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.1, 2)
+    breaker = make_breaker(env)
+    retry = RetryPolicy(env, max_attempts=3)
+    q = ServiceQ(env, 1.0, t_service, s_service, s_retry=retry, s_breaker=breaker)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+
+    hit = env.process(q.process_request("read", 1))
+    miss = env.process(q.process_request("read", 2))
+    write = env.process(q.process_request("write", 3, "data"))
+    env.run(until=env.all_of([hit, miss, write]))
+
+    assert hit.value == "t_data"
+    assert miss.value == "ERROR: S circuit open"
+    assert write.value == "ERROR: S circuit open"
+    assert env.now == 0.0
+    assert s_service.reads == s_service.writes == 0
+    # Отказ автомата не повторяется
+    assert retry.retries == 0
+    assert q.stats()["s_breaker_rejections"] == 2
+
+
+def test_q_timeouts_open_breaker(env):
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 10.0, 10.0, 10)
+    breaker = make_breaker(env, min_calls=2)
+    q = ServiceQ(env, 0.01, t_service, s_service, s_breaker=breaker)
+
+    with patch("services.service_s.random.uniform", return_value=5.0):
+        for key in range(2):
+            process = env.process(q.process_request("write", key, "data"))
+            env.run(until=process)
+            assert process.value == "ERROR: write timeout"
+    assert breaker.state == "open"
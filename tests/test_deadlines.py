@@ -0,0 +1,94 @@
+import pytest
+
+from services import ServiceQ, ServiceS, ServiceT
+from services.deadlines import DeadlineScheduler, abandon
+
+
+def test_deadline_fires(env):
+    scheduler = DeadlineScheduler(env)
+    fired = []
+
+    def waiter():
+        deadline = scheduler.schedule(5.0)
+        yield deadline.event
+        fired.append(env.now)
+
+    env.process(waiter())
+    env.run(until=20)
+    assert fired == [5.0]
+    assert scheduler.fired == 1
+
+
+def test_earlier_deadline_reuses_pending_timer(env):
+    """Прежний таймер сторожа остается в куче SimPy и переиспользуется, а не дублируется."""
+    scheduler = DeadlineScheduler(env)
+    late = scheduler.schedule(10.0)
+    early = scheduler.schedule(5.0)
+    env.run(until=6.0)
+
+    assert early.event.triggered and not late.event.triggered
+    # Только таймер на 10.0, заведенный для первого дедлайна
+    assert len(env._queue) == 1
+    env.run(until=11.0)
+    assert late.event.triggered
+    assert scheduler.fired == 2
+
+
+def test_cancelled_deadlines_leave_no_timers(env):
+    """Отмененные дедлайны не срабатывают и не оставляют таймеров в куче SimPy."""
+    scheduler = DeadlineScheduler(env)
+
+    def worker():
+        for _ in range(1000):
+            deadline = scheduler.schedule(100.0)
+            yield env.timeout(0.01)
+            deadline.cancel()
+
+    proc = env.process(worker())
+    env.run(until=proc)
+    # В куче не больше одного таймера сторожа, а не по таймеру на вызов
+    assert len(env._queue) <= 1
+    assert len(scheduler) == 0
+    env.run()
+    assert scheduler.fired == 0
+    assert env.now == pytest.approx(100.0)
+
+
+def test_earlier_deadline_wakes_scheduler(env):
+    scheduler = DeadlineScheduler(env)
+    order = []
+
+    def waiter(delay):
+        deadline = scheduler.schedule(delay)
+        yield deadline.event
+        order.append((delay, env.now))
+
+    env.process(waiter(10.0))
+    env.process(waiter(2.0))
+    env.run(until=20)
+    assert order == [(2.0, 2.0), (10.0, 10.0)]
+
+
+def test_abandon_defuses_late_failure(env):
+    def failing():
+        yield env.timeout(1)
+        raise RuntimeError("late failure")
+
+    abandon(env.process(failing()))
+    env.run()
+
+
+def test_q_timeout_with_late_s_failure(env):
+    """Таймаут Q на записи в S; поздний отказ S не роняет симуляцию."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(
+        env, 0.0, 1.0, max_write_time=2.0, max_read_time=0.1, concurrency_limit=1
+    )
+    q = ServiceQ(env, response_timeout=0.0001, service_t=t_service, service_s=s_service)
+
+    def scenario():
+        res = yield env.process(q.process_request("write", 50, "timeout_data"))
+        assert res == "ERROR: write timeout"
+
+    env.process(scenario())
+    env.run()
@@ -0,0 +1,85 @@
+import pytest
+
+from services.eviction import (
+    LFUCache,
+    LRUCache,
+    RandomCache,
+    TTLCache,
+    UnboundedCache,
+    make_cache,
+)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.insert(1, "a", 0)
+    cache.insert(2, "b", 0)
+    cache.lookup(1, 0)  # 2 становится самым давним
+    assert cache.insert(3, "c", 0) == 1
+    assert 2 not in cache
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+
+
+def test_lfu_evicts_least_frequently_used():
+    cache = LFUCache(2)
+    cache.insert(1, "a", 0)
+    cache.insert(2, "b", 0)
+    cache.lookup(1, 0)
+    cache.lookup(1, 0)
+    cache.lookup(2, 0)
+    assert cache.insert(3, "c", 0) == 1
+    assert 2 not in cache
+    # Новый ключ имеет частоту 1 и вытесняется следующим
+    cache.insert(4, "d", 0)
+    assert 3 not in cache
+    assert set(cache.data) == {1, 4}
+
+
+def test_lfu_ties_broken_by_age():
+    cache = LFUCache(3)
+    for key in (1, 2, 3):
+        cache.insert(key, key, 0)
+    cache.insert(4, 4, 0)
+    assert 1 not in cache
+
+
+def test_ttl_expires_by_sim_time():
+    cache = TTLCache(ttl=5.0)
+    cache.insert(1, "a", 0.0)
+    cache.insert(2, "b", 3.0)
+    assert cache.lookup(1, 4.9) == "a"
+    with pytest.raises(KeyError):
+        cache.lookup(1, 5.0)
+    assert cache.expirations == 1
+    assert cache.lookup(2, 7.0) == "b"
+    # Перезапись продлевает жизнь значения
+    cache.insert(2, "b2", 7.5)
+    assert cache.lookup(2, 12.0) == "b2"
+
+
+def test_ttl_capacity_evicts_oldest():
+    cache = TTLCache(ttl=100.0, capacity=2)
+    for key in (1, 2, 3):
+        cache.insert(key, key, float(key))
+    assert set(cache.data) == {2, 3}
+
+
+def test_random_cache_keeps_index_consistent():
+    cache = RandomCache(10)
+    evicted = sum(cache.insert(key, key, 0) for key in range(1000))
+    assert evicted == 990
+    assert len(cache) == 10
+    assert sorted(cache._keys) == sorted(cache.data)
+    assert all(cache._keys[pos] == key for key, pos in cache._index.items())
+
+
+def test_make_cache():
+    assert type(make_cache()) is UnboundedCache
+    assert isinstance(make_cache(10, "lru"), LRUCache)
+    assert isinstance(make_cache(10, "lfu"), LFUCache)
+    assert isinstance(make_cache(10, "random"), RandomCache)
+    assert isinstance(make_cache(None, "ttl", ttl=1.0), TTLCache)
+    with pytest.raises(ValueError):
+        make_cache(10, "fifo")
+    with pytest.raises(ValueError):
+        make_cache(10, "ttl")
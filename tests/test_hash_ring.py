@@ -0,0 +1,33 @@
+from collections import Counter
+
+import pytest
+
+from services import HashRing
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = HashRing(["S0", "S1", "S2", "S3"], virtual_nodes=200)
+    owners = Counter(ring.node_for(key) for key in range(20000))
+    assert owners.keys() == {"S0", "S1", "S2", "S3"}
+    # С 200 виртуальными узлами доля каждого шарда близка к 1/4
+    assert max(owners.values()) / min(owners.values()) < 1.3
+    assert HashRing(["S0", "S1", "S2", "S3"], 200).node_for(12345) == ring.node_for(12345)
+
+
+def test_adding_node_moves_few_keys():
+    """Новый узел забирает ~1/N ключей, остальные остаются на месте."""
+    before = HashRing(["S0", "S1", "S2", "S3"], virtual_nodes=100)
+    after = HashRing(["S0", "S1", "S2", "S3", "S4"], virtual_nodes=100)
+    moved = [key for key in range(10000) if before.node_for(key) != after.node_for(key)]
+    assert all(after.node_for(key) == "S4" for key in moved)
+    assert 0.1 < len(moved) / 10000 < 0.3
+
+
+def test_replicas_are_distinct():
+    ring = HashRing(["S0", "S1", "S2"], virtual_nodes=50, replicas=3)
+    for key in range(100):
+        nodes = ring.nodes_for(key)
+        assert len(set(nodes)) == 3
+        assert nodes[0] == ring.node_for(key)
+    with pytest.raises(ValueError):
+        HashRing(["S0"], replicas=2)
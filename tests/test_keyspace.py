@@ -0,0 +1,76 @@
+from collections import Counter
+
+import pytest
+
+from services import KeySpace, RandomStreams
+
+
+def _filled(distribution, count=1000, **kwargs):
+    keyspace = KeySpace(distribution, **kwargs)
+    for _ in range(count):
+        keyspace.commit(keyspace.new_key())
+    return keyspace
+
+
+def test_unknown_distribution():
+    with pytest.raises(ValueError):
+        KeySpace("pareto")
+
+
+def test_sample_requires_committed_keys():
+    keyspace = KeySpace()
+    keyspace.new_key()
+    with pytest.raises(ValueError):
+        keyspace.sample()
+
+
+def test_commit_is_idempotent():
+    keyspace = KeySpace()
+    key = keyspace.new_key()
+    keyspace.commit(key)
+    keyspace.commit(key)
+    assert len(keyspace) == 1
+
+
+def test_zipf_favours_first_keys():
+    keyspace = _filled("zipf", zipf_s=1.2, streams=RandomStreams(1))
+    counts = Counter(keyspace.sample() for _ in range(20000))
+    assert counts.most_common(1)[0][0] == 0
+    # Ранг 1 при s=1.2 и 1000 ключах получает около 22% выборок
+    assert 0.18 < counts[0] / 20000 < 0.26
+
+
+def test_latest_favours_recent_keys():
+    keyspace = _filled("latest", streams=RandomStreams(2))
+    counts = Counter(keyspace.sample() for _ in range(20000))
+    assert counts.most_common(1)[0][0] == 999
+
+
+def test_hotspot_share():
+    keyspace = _filled("hotspot", hot_fraction=0.1, hot_probability=0.9)
+    samples = [keyspace.sample() for _ in range(20000)]
+    hot_share = sum(key < 100 for key in samples) / len(samples)
+    assert 0.88 < hot_share < 0.92
+
+
+def test_num_keys_bounds_key_space():
+    """После выдачи num_keys ключей записи обновляют существующие ключи."""
+    keyspace = _filled("uniform", count=500, num_keys=50)
+    assert len(keyspace) == 50
+    assert all(0 <= keyspace.new_key() < 50 for _ in range(100))
+
+
+def test_shared_keyspace_in_simulation(sim_config):
+    """Общее пространство ключей с перекосом поднимает hit ratio ограниченного T."""
+    from main import run_simulation
+
+    sim_config["seed"] = 1
+    sim_config["P"]["num_requests"] = 300
+    sim_config["T"]["capacity"] = 20
+    # Промахи заполняют T, иначе горячие ключи вытесняются новыми записями
+    sim_config["Q"]["read_through"] = True
+    hit_ratios = {}
+    for distribution in ("uniform", "zipf"):
+        sim_config["keyspace"] = {"distribution": distribution, "zipf_s": 1.2}
+        hit_ratios[distribution] = run_simulation(sim_config)["T"]["hit_ratio"]
+    assert hit_ratios["zipf"] > hit_ratios["uniform"]
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+
+from main import run_simulation
+from services import LoadBalancer, ServiceQ, ServiceS, ServiceT
+
+
+class FakeReplica:
+    """Реплика Q, отвечающая через заданное время."""
+
+    def __init__(self, env, name, delay=1.0, result="OK"):
+        self.env = env
+        self.name = name
+        self.delay = delay
+        self.result = result
+        self.s_fallback_reads = 0
+        self.write_behind = None
+
+    def process_request(self, req_type, req_id, data=None):
+        yield self.env.timeout(self.delay)
+        return self.result
+
+    def stats(self):
+        return {"s_fallback_reads": 0}
+
+    def drained(self):
+        return self.env.event().succeed()
+
+
+def send(env, balancer, count):
+    for req_id in range(count):
+        env.process(balancer.process_request("write", req_id, "d"))
+
+
+def test_round_robin(env):
+    balancer = LoadBalancer(env, [FakeReplica(env, f"Q{i}") for i in range(3)])
+    send(env, balancer, 7)
+    env.run()
+    assert balancer.requests == [3, 2, 2]
+    assert balancer.max_outstanding == [3, 2, 2]
+
+
+def test_least_outstanding_avoids_slow_replica(env):
+    slow = FakeReplica(env, "Q0", delay=10.0)
+    fast = FakeReplica(env, "Q1", delay=0.1)
+    balancer = LoadBalancer(env, [slow, fast], policy="least_outstanding")
+
+    def client():
+        for req_id in range(20):
+            yield env.process(balancer.process_request("write", req_id, "d"))
+            yield env.timeout(0.5)
+
+    env.process(client())
+    env.process(client())
+    env.run()
+    # Медленная реплика занята почти все время и получает мало запросов
+    assert balancer.requests[0] < balancer.requests[1] / 3
+
+
+def test_p2c_prefers_less_loaded(env):
+    random.seed(0)
+    replicas = [FakeReplica(env, f"Q{i}") for i in range(4)]
+    balancer = LoadBalancer(env, replicas, policy="p2c")
+    send(env, balancer, 400)
+    env.run()
+    assert sum(balancer.requests) == 400
+    # Две случайные реплики и выбор менее загруженной выравнивают нагрузку
+    assert max(balancer.max_outstanding) - min(balancer.max_outstanding) <= 5
+
+
+def test_balancer_counts_errors_and_rejections_separately(env):
+    replicas = [
+        FakeReplica(env, "Q0", result="ERROR: S failed"),
+        FakeReplica(env, "Q1", result="REJECTED: S overloaded"),
+    ]
+    balancer = LoadBalancer(env, replicas)
+    send(env, balancer, 4)
+    env.run()
+
+    assert balancer.errors == [2, 0]
+    assert balancer.rejected == [0, 2]
+    rows = balancer.stats()["replicas"]
+    assert (rows["Q0"]["errors"], rows["Q0"]["rejected"]) == (2, 0)
+    assert (rows["Q1"]["errors"], rows["Q1"]["rejected"]) == (0, 2)
+
+
+def test_unknown_policy(env):
+    with pytest.raises(ValueError):
+        LoadBalancer(env, [], policy="random")
+
+
+def test_q_concurrency_limit_queues_requests(env):
+    """Реплика Q с concurrency_limit=1 обрабатывает запросы по одному."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 10)
+    q = ServiceQ(env, 100.0, t_service, s_service, concurrency_limit=1)
+    finished = []
+
+    def writer(req_id):
+        yield env.process(q.process_request("write", req_id, "d"))
+        finished.append(env.now)
+
+    for req_id in range(3):
+        env.process(writer(req_id))
+    env.run()
+
+    assert finished == sorted(finished)
+    assert finished[1] > finished[0] and finished[2] > finished[1]
+
+
+def test_run_simulation_with_q_replicas(sim_config):
+    sim_config["Q"].update(replicas=3, concurrency_limit=2, balancer="least_outstanding")
+    summary = run_simulation(sim_config)
+
+    replicas = summary["Q"]["replicas"]
+    assert set(replicas) == {"Q0", "Q1", "Q2"}
+    total = sim_config["P"]["num_requests"] * sim_config["P"]["num_users"]
+    assert sum(row["requests"] for row in replicas.values()) == total
+    assert summary["Q"]["policy"] == "least_outstanding"
+    assert "Q.queue" in summary["stages"]
+
+
+def test_run_simulation_merges_write_behind_of_q_replicas(sim_config):
+    """Сводка write_behind по репликам Q не теряется: счетчики всех очередей складываются."""
+    sim_config["Q"].update(replicas=2, write_policy="write_behind")
+    sim_config["S"]["write_failure_probability"] = 0.0
+    summary = run_simulation(sim_config)
+
+    stats = summary["Q"]["write_behind"]
+    assert stats["pending"] == 0
+    assert stats["enqueued"] > 0
+    assert stats["flushed"] == stats["enqueued"]
+    # Все записи в S пришли из очередей обеих реплик
+    assert stats["flushed"] == summary["S"]["writes"]
+    assert stats["lag_max"] >= stats["lag_mean"] > 0
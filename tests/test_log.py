@@ -0,0 +1,56 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from services import ServiceP, ServiceQ, ServiceS, ServiceT, log, service_p
+from services.log import configure_logging, flush_logging
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """Возвращает логгеру services обработчики и уровень, которые были до теста."""
+    logger = logging.getLogger("services")
+    handlers = list(logger.handlers)
+    level = logger.level
+    yield
+    if log._listener is not None:
+        log._listener.stop()
+    for handler in logger.handlers:
+        if handler not in handlers:
+            handler.close()
+    logger.handlers[:] = handlers
+    logger.setLevel(level)
+    log._installed_handler = None
+    log._listener = None
+
+
+def test_no_handler_installed_at_import():
+    assert service_p.logger.handlers == []
+
+
+def test_disabled_levels_are_not_called(env):
+    """При уровне WARNING цикл P не вызывает debug/info на каждый запрос."""
+    configure_logging(level="WARNING")
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.1, 2)
+    q = ServiceQ(env, 1.0, t_service, s_service)
+    p = ServiceP(env, q, mean_interarrival=0.1, num_requests=20)
+
+    with patch.object(service_p.logger, "debug") as debug, patch.object(
+        service_p.logger, "info"
+    ) as info:
+        env.run(until=p.action)
+
+    assert len(p.results) == 20
+    debug.assert_not_called()
+    # Только сообщения о старте и завершении генерации, не по одному на запрос
+    assert info.call_count == 2
+
+
+@pytest.mark.parametrize("handler", ["stream", "buffered", "queued"])
+def test_configure_logging_handlers(handler, capsys):
+    configure_logging(level="DEBUG", handler=handler, buffer_size=100)
+    logging.getLogger("services.test").debug("hello %s", handler)
+    flush_logging()
+    assert f"hello {handler}" in capsys.readouterr().err
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from main import run_simulation
+from services import LatencySketch, StageStats, StreamingAggregator
+
+
+def test_sketch_relative_accuracy():
+    """Квантили скетча отличаются от точных не более чем на относительную точность."""
+    rng = random.Random(1)
+    values = [rng.expovariate(2.0) for _ in range(20000)] + [0.0] * 100
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert sketch.quantile(0.0) == 0.0
+    assert sketch.max == max(values)
+    assert len(sketch.buckets) < 2000
+
+
+def test_sketch_merge():
+    a, b, both = LatencySketch(), LatencySketch(), LatencySketch()
+    for i in range(1, 1000):
+        (a if i % 2 else b).add(i / 100)
+        both.add(i / 100)
+    a.merge(b)
+    assert a.count == both.count
+    assert a.buckets == both.buckets
+    assert a.quantile(0.99) == both.quantile(0.99)
+
+
+def test_streaming_aggregator_windows():
+    agg = StreamingAggregator(window=1.0, max_windows=2)
+    for t in (0.1, 0.5, 1.2, 2.5, 2.7, 2.9):
+        agg.record("write", 1, "OK", t - 0.1, t)
+    agg.record("read", 1, "ERROR: T failed", 3.0, 3.5)
+
+    summary = agg.summary()
+    assert summary["successes"] == 6 and summary["errors"] == 1
+    # Хранятся только последние max_windows закрытых окон + текущее
+    assert agg.throughput_windows() == [(1.0, 1.0), (2.0, 3.0), (3.0, 1.0)]
+
+
+def test_streaming_mode_matches_detailed(sim_config):
+    """В режиме streaming счетчики совпадают с detailed, но details не возвращается."""
+    sim_config["seed"] = 3
+    detailed = run_simulation(sim_config)
+    sim_config["metrics_mode"] = "streaming"
+    streaming = run_simulation(sim_config)
+
+    assert "details" not in streaming and "times" not in streaming
+    assert streaming["successes"] == detailed["successes"]
+    assert streaming["errors"] == detailed["errors"]
+    assert streaming["avg_time"] == pytest.approx(detailed["avg_time"])
+    assert streaming["throughput"] == pytest.approx(detailed["throughput"])
+    assert streaming["max_time"] == pytest.approx(detailed["max_time"])
+    assert streaming["throughput_windows"]
+
+
+def test_stage_stats_summary():
+    stages = StageStats()
+    for i in range(1, 101):
+        stages.record("Q->S", "read", i / 100)
+    stages.record("Q->S", "write", 5.0)
+
+    summary = stages.summary()
+    assert summary["Q->S"]["read"]["count"] == 100
+    assert summary["Q->S"]["read"]["p50"] == pytest.approx(0.5, rel=0.03)
+    assert summary["Q->S"]["read"]["max"] == 1.0
+    assert summary["Q->S"]["all"]["count"] == 101
+    assert summary["Q->S"]["all"]["max"] == 5.0
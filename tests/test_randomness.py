@@ -0,0 +1,45 @@
+import numpy as np
+
+from main import run_simulation
+from services import RandomStreams
+
+
+def test_stream_matches_generator_across_blocks():
+    """Значения потока совпадают с последовательными блоками генератора."""
+    streams = RandomStreams(seed=5, block_size=4)
+    stream = streams.uniform("x", 0.0, 2.0)
+    values = [stream.next() for _ in range(10)]
+
+    g = streams.generator("x")
+    expected = np.concatenate([g.uniform(0.0, 2.0, 4) for _ in range(3)])[:10]
+    np.testing.assert_allclose(values, expected)
+
+
+def test_substreams_are_independent_of_consumption():
+    """Подпоток зависит только от seed и имени, а не от других потоков."""
+    a = RandomStreams(seed=1)
+    b = RandomStreams(seed=1)
+    other = b.exponential("other", 1.0)
+    for _ in range(10000):
+        other.next()
+
+    s1 = a.exponential("P0.interarrival", 0.2)
+    s2 = b.exponential("P0.interarrival", 0.2)
+    assert [s1.next() for _ in range(100)] == [s2.next() for _ in range(100)]
+    assert a.exponential("P1.interarrival", 0.2).next() != s1.next()
+
+
+def test_bernoulli_stream_rate():
+    flags = RandomStreams(seed=2).bernoulli("read", 0.3)
+    draws = [flags.next() for _ in range(20000)]
+    assert all(isinstance(d, bool) for d in draws[:10])
+    assert abs(sum(draws) / len(draws) - 0.3) < 0.02
+
+
+def test_pregenerated_run_reproducible(sim_config):
+    sim_config["seed"] = 11
+    sim_config["randomness"] = {"mode": "pregenerated", "block_size": 16}
+    first = run_simulation(sim_config)
+    second = run_simulation(sim_config)
+    assert first["successes"] == second["successes"]
+    np.testing.assert_array_equal(first["times"], second["times"])
@@ -0,0 +1,79 @@
+import numpy as np
+
+from main import run_simulation
+from services import ResultRecorder
+from services import StreamingAggregator
+from services.recorder import OUTCOME_ERROR, OUTCOME_OK, OUTCOME_REJECTED
+
+
+def test_recorder_grows_and_summarizes():
+    """Рекордер растет сверх начальной емкости и считает сводку векторно."""
+    rec = ResultRecorder(capacity=2)
+    rec.record("write", 1, "OK", 0.0, 1.0)
+    rec.record("read", 1, "data_1", 1.0, 1.5)
+    rec.record("write", 2, "ERROR: S failed: S failed", 2.0, 4.0)
+    rec.record("read", 3, "ERROR: S failed: S: data not found", 3.0, 3.5)
+
+    assert len(rec) == 4
+    summary = rec.summary()
+    assert (summary["successes"], summary["errors"], summary["avg_time"]) == (2, 2, 1.0)
+    assert summary["max_time"] == 2.0
+    np.testing.assert_allclose(rec.duration, [1.0, 0.5, 2.0, 0.5])
+
+    counts = rec.outcome_counts()
+    assert counts[0, OUTCOME_OK] == 1 and counts[0, OUTCOME_ERROR] == 1
+    assert counts[1, OUTCOME_OK] == 1 and counts[1, OUTCOME_ERROR] == 1
+
+
+def test_rejected_is_separate_outcome():
+    """Отказ контроля допуска — отдельный исход: ни успех, ни ошибка."""
+    for rec in (ResultRecorder(), StreamingAggregator()):
+        rec.record("write", 1, "OK", 0.0, 1.0)
+        rec.record("write", 2, "REJECTED: S overloaded", 0.0, 0.0)
+        rec.record("read", 3, "ERROR: S read timeout", 0.0, 2.0)
+        summary = rec.summary()
+        assert (summary["successes"], summary["errors"], summary["rejected"]) == (1, 1, 1)
+    counts = rec.counts
+    assert counts[1][OUTCOME_REJECTED] == 1
+
+
+def test_recorder_interns_reasons():
+    rec = ResultRecorder()
+    for i in range(100):
+        rec.record("write", i, "ERROR: T failed: T failed", i, i + 1)
+    assert rec.reasons == ["ERROR: T failed: T failed"]
+    assert set(rec.reason.tolist()) == {0}
+
+
+def test_recorder_iter_and_cumulative_errors():
+    rec = ResultRecorder()
+    rec.record("write", 1, "OK", 0.0, 3.0)
+    rec.record("write", 2, "ERROR: write timeout", 0.0, 1.0)
+    assert list(rec)[1] == ("write", 2, "ERROR: write timeout", 0.0, 1.0, 1.0)
+
+    times, errors = rec.cumulative_errors()
+    np.testing.assert_allclose(times, [1.0, 3.0])
+    assert errors.tolist() == [1, 1]
+
+
+def test_run_simulation_summary(sim_config):
+    summary = run_simulation(sim_config)
+    total = sim_config["P"]["num_requests"] * sim_config["P"]["num_users"]
+    assert summary["successes"] + summary["errors"] == total
+    assert len(summary["details"]) == total
+    assert summary["avg_time"] == float(np.mean(summary["times"]))
+
+
+def test_run_simulation_small_cache_increases_fallback(sim_config):
+    """Маленький кеш T дает промахи, и больше чтений уходит в S."""
+    sim_config["seed"] = 3
+    sim_config["P"]["num_requests"] = 200
+    unbounded = run_simulation(sim_config)
+
+    sim_config["T"]["capacity"] = 2
+    bounded = run_simulation(sim_config)
+
+    assert unbounded["T"]["evictions"] == 0
+    assert bounded["T"]["evictions"] > 0
+    assert bounded["T"]["hit_ratio"] < unbounded["T"]["hit_ratio"]
+    assert bounded["s_fallback_reads"] > unbounded["s_fallback_reads"]
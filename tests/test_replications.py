@@ -0,0 +1,35 @@
+import pytest
+
+from replications import merge_metric, replication_seeds, run_replications
+
+
+def test_replication_seeds_deterministic():
+    """Один и тот же base_seed даёт одинаковые и попарно различные seed'ы."""
+    seeds = replication_seeds(42, 5)
+    assert seeds == replication_seeds(42, 5)
+    assert len(set(seeds)) == 5
+
+
+def test_merge_metric():
+    stats = merge_metric([1.0, 2.0, 3.0, 4.0])
+    assert stats["mean"] == pytest.approx(2.5)
+    assert stats["stddev"] == pytest.approx(1.2909944)
+    # t(0.975, df=3) = 3.182
+    assert stats["half_width"] == pytest.approx(3.182 * 1.2909944 / 2)
+    lo, hi = stats["ci95"]
+    assert lo < stats["mean"] < hi
+
+
+def test_run_replications_reproducible(sim_config):
+    """Результат не зависит от количества воркеров при одинаковом seed."""
+    serial = run_replications(sim_config, n=3, workers=1, base_seed=7)
+    parallel = run_replications(sim_config, n=3, workers=2, base_seed=7)
+
+    assert serial["seeds"] == parallel["seeds"]
+    assert serial["replications"] == parallel["replications"]
+    for name in ("successes", "errors", "avg_time"):
+        assert name in serial["metrics"]
+
+    total = sim_config["P"]["num_requests"] * sim_config["P"]["num_users"]
+    for rep in serial["replications"]:
+        assert rep["successes"] + rep["errors"] == total
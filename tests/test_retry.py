@@ -0,0 +1,155 @@
+import pytest
+
+from services import (
+    NotFoundError,
+    RetryBudget,
+    RetryPolicy,
+    ServiceQ,
+    ServiceS,
+    ServiceSCluster,
+    ServiceT,
+)
+
+
+class FlakyS:
+    """S, отказывающий первые failures чтений/записей; затем отвечает за 0.1."""
+
+    def __init__(self, env, failures, error=RuntimeError("S failed")):
+        self.env = env
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.storage = {}
+
+    def _operation(self):
+        self.calls += 1
+        yield self.env.timeout(0.1)
+        if self.calls <= self.failures:
+            raise self.error
+
+    def read(self, req_id):
+        yield from self._operation()
+        return f"data_{req_id}"
+
+    def write(self, req_id, data):
+        yield from self._operation()
+        self.storage[req_id] = data
+
+
+def run_request(env, q, req_type, req_id, data=None):
+    process = env.process(q.process_request(req_type, req_id, data))
+    env.run(until=process)
+    return process.value
+
+
+def test_policy_validation(env):
+    with pytest.raises(ValueError):
+        RetryPolicy(env, max_attempts=0)
+    with pytest.raises(ValueError):
+        RetryPolicy(env, jitter="equal")
+
+
+def test_backoff_bounds(env):
+    policy = RetryPolicy(env, base_delay=0.1, max_delay=0.5, jitter="none")
+    assert [policy.backoff(n, 0.0) for n in (1, 2, 3, 4)] == [0.1, 0.2, 0.4, 0.5]
+
+    full = RetryPolicy(env, base_delay=0.1, max_delay=0.5, jitter="full")
+    assert all(0 <= full.backoff(3, 0.0) <= 0.4 for _ in range(100))
+
+    decorrelated = RetryPolicy(env, base_delay=0.1, max_delay=10.0, jitter="decorrelated")
+    assert all(0.1 <= decorrelated.backoff(2, 0.2) <= 0.6 for _ in range(100))
+
+
+def test_budget_limits_retries(env):
+    budget = RetryBudget(env, ratio=0.5, capacity=1.0)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def test_budget_refills_over_time(env):
+    budget = RetryBudget(env, ratio=0.0, min_rate=0.5, capacity=1.0)
+    assert budget.withdraw()
+    env.run(until=1.0)
+    assert not budget.withdraw()
+    env.run(until=2.0)
+    assert budget.withdraw()
+
+
+def test_q_retries_transient_s_failures(env):
+    s_service = FlakyS(env, failures=2)
+    policy = RetryPolicy(env, max_attempts=3, base_delay=0.05, jitter="none")
+    q = ServiceQ(env, 1.0, ServiceT(env, 0.0, 0.0), s_service, s_retry=policy)
+
+    assert run_request(env, q, "write", 1, "data") == "OK"
+    assert s_service.calls == 3
+    # Три попытки по 0.1 и задержки 0.05 и 0.1
+    assert env.now == pytest.approx(0.45)
+    assert q.stats()["s_retries"] == 2
+
+
+def test_q_gives_up_after_max_attempts(env):
+    s_service = FlakyS(env, failures=10)
+    policy = RetryPolicy(env, max_attempts=2, base_delay=0.01)
+    q = ServiceQ(env, 1.0, ServiceT(env, 0.0, 0.0), s_service, s_retry=policy)
+
+    assert run_request(env, q, "write", 1, "data").startswith("ERROR")
+    assert s_service.calls == 2
+    assert policy.exhausted == 1
+
+
+def test_q_does_not_retry_not_found(env):
+    """Отсутствие ключа — ответ, а не сбой: чтение не повторяется."""
+    s_service = FlakyS(env, failures=10, error=NotFoundError("S: data not found"))
+    policy = RetryPolicy(env, max_attempts=3)
+    q = ServiceQ(env, 1.0, ServiceT(env, 0.0, 0.0), s_service, s_retry=policy)
+
+    assert "not found" in run_request(env, q, "read", 1)
+    assert s_service.calls == 1
+    assert policy.retries == 0
+
+
+def test_q_does_not_retry_not_found_in_replicated_cluster(env):
+    """Ключа нет ни на одной реплике: кворум не набран, но это NotFoundError, а не сбой."""
+    shards = [ServiceS(env, 0.0, 0.0, 0.1, 0.1, 2, name=f"S{i}") for i in range(3)]
+    cluster = ServiceSCluster(env, shards, replication_factor=3, read_quorum=1)
+    policy = RetryPolicy(env, max_attempts=4)
+    q = ServiceQ(env, 1.0, ServiceT(env, 0.0, 0.0), cluster, s_retry=policy)
+
+    result = run_request(env, q, "read", 1)
+    assert "not found" in result
+    assert q.stats()["s_retries"] == 0
+    assert q.stats()["s_retries_exhausted"] == 0
+    assert sum(shard.reads for shard in shards) == 3
+
+
+def test_q_retry_budget_rejects(env):
+    s_service = FlakyS(env, failures=10)
+    policy = RetryPolicy(env, max_attempts=5, budget_ratio=0.1, budget_capacity=1.0)
+    q = ServiceQ(env, 1.0, ServiceT(env, 0.0, 0.0), s_service, s_retry=policy)
+
+    assert run_request(env, q, "write", 1, "data").startswith("ERROR")
+    # Одного токена хватает на один повтор
+    assert s_service.calls == 2
+    assert policy.budget_rejections == 1
+
+
+def test_q_retries_t_failures(env):
+    """Сбой T повторяется; промах T сразу уходит в S."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    t_service.storage.insert(1, "t_data", 0.0)
+    policy = RetryPolicy(env, max_attempts=3, base_delay=0.01, jitter="none")
+    q = ServiceQ(env, 1.0, t_service, FlakyS(env, failures=0), t_retry=policy)
+
+    t_service.read_failure_probability = 1.0
+    process = env.process(q.process_request("read", 1))
+    env.run(until=0.005)
+    t_service.read_failure_probability = 0.0
+    env.run(until=process)
+    assert process.value == "t_data"
+    assert policy.retries == 1
+
+    assert run_request(env, q, "read", 2) == "data_2"
+    assert policy.retries == 1
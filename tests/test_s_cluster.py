@@ -0,0 +1,125 @@
+from services import ServiceS, ServiceSCluster
+
+
+def make_cluster(env, shards=3, read_failures=(), write_failures=(), **kwargs):
+    nodes = [
+        ServiceS(
+            env,
+            1.0 if i in read_failures else 0.0,
+            1.0 if i in write_failures else 0.0,
+            0.1,
+            0.1,
+            2,
+            name=f"S{i}",
+        )
+        for i in range(shards)
+    ]
+    return ServiceSCluster(env, nodes, virtual_nodes=50, **kwargs)
+
+
+def run(env, operation):
+    process = env.process(operation)
+    env.run()
+    return process
+
+
+def test_cluster_routes_by_ring(env):
+    cluster = make_cluster(env)
+    for key in range(30):
+        run(env, cluster.write(key, f"data_{key}"))
+
+    for key in range(30):
+        owner = cluster.ring.node_for(key)
+        assert [name for name, s in cluster.shards.items() if key in s.storage] == [owner]
+        assert run(env, cluster.read(key)).value == f"data_{key}"
+
+    stats = cluster.stats()
+    assert stats["writes"] == 30
+    assert sum(row["writes"] for row in stats["shards"].values()) == 30
+
+
+def test_cluster_write_quorum_tolerates_replica_failure(env):
+    """R = 3, W = 2: отказ одной реплики не мешает подтвердить запись."""
+    cluster = make_cluster(env, write_failures={0}, replication_factor=3)
+    assert cluster.write_quorum == 2
+    assert run(env, cluster.write(1, "data")).ok
+    assert sum(1 in s.storage for s in cluster.shards.values()) == 2
+
+
+def test_cluster_write_quorum_failure(env):
+    cluster = make_cluster(env, write_failures={0, 1}, replication_factor=3)
+    process = env.process(cluster.write(1, "data"))
+    process.defused = True
+    env.run()
+    assert not process.ok
+    assert "quorum not reached" in str(process.value)
+
+
+def test_cluster_read_falls_back_to_next_replica(env):
+    """Отказавшая реплика при чтении заменяется следующей по кругу."""
+    cluster = make_cluster(env, read_failures={0}, replication_factor=3, read_quorum=1)
+    run(env, cluster.write(7, "data"))
+    env.run()  # дописываем оставшиеся реплики
+    for _ in range(6):
+        assert run(env, cluster.read(7)).value == "data"
+    # Чтения распределяются по репликам, начиная с очередной
+    reads = [s.reads for s in cluster.shards.values()]
+    assert all(count >= 2 for count in reads)
+
+
+def test_cluster_hot_shard_detection(env):
+    cluster = make_cluster(env, shards=4, hot_factor=1.5)
+    hot_key = 0
+    hot = cluster.ring.node_for(hot_key)
+    for _ in range(20):
+        run(env, cluster.write(hot_key, "data"))
+    stats = cluster.stats()
+    assert stats["hot_shards"] == [hot]
+    assert stats["imbalance"] > 1.5
+
+
+def test_run_simulation_with_shards(sim_config):
+    from main import run_simulation
+
+    sim_config["S"].update(shards=3, replication_factor=2, read_quorum=1)
+    summary = run_simulation(sim_config)
+
+    total = sim_config["P"]["num_requests"] * sim_config["P"]["num_users"]
+    assert summary["successes"] + summary["errors"] == total
+    assert set(summary["S"]["shards"]) == {"S0", "S1", "S2"}
+    assert summary["s_imbalance"] >= 1.0
+
+
+def test_cluster_interrupted_read_cancels_replicas(env):
+    """Прерванное чтение с кворумом прерывает и чтения реплик, симуляция не падает."""
+    cluster = make_cluster(env, replication_factor=3, read_quorum=2)
+    for shard in cluster.shards.values():
+        shard.storage[1] = "data"
+    process = env.process(cluster.read(1))
+
+    def cancel():
+        yield env.timeout(0.001)
+        process.interrupt()
+
+    env.process(cancel())
+    process.defused = True
+    env.run()
+    assert all(shard.resource.count == 0 for shard in cluster.shards.values())
+    assert sum(shard.cancelled_reads for shard in cluster.shards.values()) == 2
+
+
+def test_cluster_passes_deadline_to_replicas(env):
+    cluster = make_cluster(env, shards=2, replication_factor=2, read_quorum=2)
+    run(env, cluster.write(1, "data"))
+
+    # Дедлайн уже прошел: ни одна реплика не выполняет чтение
+    process = env.process(cluster.read(1, deadline=env.now))
+    process.defused = True
+    env.run()
+    assert not process.ok
+    assert "deadline expired" in str(process.value)
+
+    stats = cluster.stats()
+    assert stats["expired"] == 2
+    assert stats["classes"]["read"]["expired"] == 2
+    assert stats["classes"]["write"]["count"] == 2
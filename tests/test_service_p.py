@@ -0,0 +1,105 @@
+from services import ServiceP
+
+
+class SlowQ:
+    """Q, отвечающий OK через фиксированное время."""
+
+    def __init__(self, env, delay):
+        self.env = env
+        self.delay = delay
+
+    def process_request(self, req_type, req_id, data=None):
+        yield self.env.timeout(self.delay)
+        return "OK"
+
+
+def test_closed_loop_waits_for_responses(env):
+    p = ServiceP(env, SlowQ(env, 1.0), mean_interarrival=0.5, num_requests=4)
+    env.run(until=p.action)
+    # Каждый запрос: интервал 0.5 + ответ 1.0
+    assert env.now == 6.0
+    assert p.results.duration.tolist() == [1.0] * 4
+
+
+def test_open_loop_sends_on_schedule(env):
+    """Открытый цикл отправляет запросы по расписанию, не дожидаясь ответов."""
+    p = ServiceP(
+        env, SlowQ(env, 1.0), mean_interarrival=0.5, num_requests=4, open_loop=True
+    )
+    env.run(until=p.action)
+    assert p.results.start_time.tolist() == [0.5, 1.0, 1.5, 2.0]
+    assert env.now == 3.0
+    assert p.max_observed_in_flight == 2
+    assert p.delayed_sends == 0
+
+
+def test_open_loop_latency_from_intended_time(env):
+    """При max_in_flight отправка откладывается, но латентность считается от расписания."""
+    p = ServiceP(
+        env,
+        SlowQ(env, 1.0),
+        mean_interarrival=0.5,
+        num_requests=4,
+        open_loop=True,
+        max_in_flight=1,
+    )
+    env.run(until=p.action)
+    assert p.max_observed_in_flight == 1
+    assert p.results.start_time.tolist() == [0.5, 1.0, 1.5, 2.0]
+    # Фактические отправки: 0.5, 1.5, 2.5, 3.5
+    assert p.results.end_time.tolist() == [1.5, 2.5, 3.5, 4.5]
+    assert p.results.duration.tolist() == [1.0, 1.5, 2.0, 2.5]
+    assert p.delayed_sends == 3
+    assert p.stats()["send_delay_max"] == 1.5
+
+
+def test_run_simulation_open_loop(sim_config):
+    from main import run_simulation
+
+    sim_config["P"].update(open_loop=True, max_in_flight=2)
+    summary = run_simulation(sim_config)
+    total = sim_config["P"]["num_requests"] * sim_config["P"]["num_users"]
+    assert summary["successes"] + summary["errors"] == total
+    assert summary["P"]["max_in_flight"] <= 2
+    assert summary["P"]["offered_load"] == 3 / 0.2
+
+
+def test_max_written_ids_keeps_uniform_sample(env):
+    """Сверх max_written_ids список записанных id не растет, но остается выборкой из всех записей."""
+    p = ServiceP(
+        env,
+        SlowQ(env, 0.1),
+        mean_interarrival=0.1,
+        read_probability=0.0,
+        num_requests=200,
+        max_written_ids=10,
+    )
+    env.run(until=p.action)
+
+    assert p.written_count == 200
+    assert len(p.written_ids) == 10
+    assert len(set(p.written_ids)) == 10
+    assert set(p.written_ids) <= set(range(1, 201))
+    # Выборка не сводится к первым записям
+    assert max(p.written_ids) > 10
+
+
+def test_streaming_mode_bounds_written_ids(sim_config):
+    from main import build_simulation
+
+    sim_config["metrics_mode"] = "streaming"
+    sim_config["P"]["max_written_ids"] = 4
+    sim = build_simulation(sim_config)
+    sim["env"].run()
+
+    assert all(len(p.written_ids) <= 4 for p in sim["P"])
+    assert sum(p.written_count for p in sim["P"]) > 4 * len(sim["P"])
+
+
+def test_streaming_mode_limits_written_ids_by_default(sim_config):
+    from main import STREAMING_MAX_WRITTEN_IDS, build_simulation
+
+    assert all(p.max_written_ids is None for p in build_simulation(sim_config)["P"])
+    sim_config["metrics_mode"] = "streaming"
+    sim = build_simulation(sim_config)
+    assert all(p.max_written_ids == STREAMING_MAX_WRITTEN_IDS for p in sim["P"])
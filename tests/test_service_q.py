@@ -1,4 +1,8 @@
-from services import ServiceQ, ServiceS, ServiceT
+from unittest.mock import patch
+
+import pytest
+
+from services import CircuitBreaker, RetryPolicy, ServiceQ, ServiceS, ServiceT, StageStats
 
 
 def test_q_write_success(env):
@@ -62,6 +66,23 @@ def test_q_read_fallback_s(env):
     env.run()
 
 
+def test_q_counts_s_fallback_reads(env):
+    """Чтение, которого нет в T, идет в S и учитывается в s_fallback_reads; попадание в T — нет."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.1, 2)
+    q = ServiceQ(env, 1.0, t_service, s_service)
+
+    def scenario():
+        yield env.process(s_service.write(20, "s_data"))
+        t_service.write(21, "t_data")
+        assert (yield env.process(q.process_request("read", 20))) == "s_data"
+        assert (yield env.process(q.process_request("read", 21))) == "t_data"
+
+    env.process(scenario())
+    env.run()
+    assert q.s_fallback_reads == 1
+
+
 def test_q_write_t_failure(env):
     """При записи T отказывает, значит Q сразу вернёт ошибку, не дойдя до S."""
     t_service = ServiceT(env, 0.0, 1.0)  # 100% отказ при записи
@@ -130,3 +151,316 @@ def test_q_timeout(env):
     env.process(scenario())
     env.run()
  """
+
+
+def test_q_records_stages_on_fallback(env):
+    """При промахе в T записываются оба этапа чтения: Q->T и Q->S."""
+    stages = StageStats()
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.1, 2)
+    s_service.storage[5] = "s_data"
+    q = ServiceQ(env, 1.0, t_service, s_service, stages=stages)
+
+    def scenario():
+        res = yield env.process(q.process_request("read", 5))
+        assert res == "s_data"
+
+    env.process(scenario())
+    env.run()
+
+    summary = stages.summary()
+    assert summary["Q->T"]["read"]["count"] == 1
+    assert summary["Q->S"]["read"]["count"] == 1
+    assert "write" not in summary["Q->S"]
+
+
+def test_q_read_through_fills_t(env):
+    """После чтения из S значение попадает в T, и следующее чтение не идет в S."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.1, 2)
+    s_service.storage[7] = "s_data"
+    q = ServiceQ(env, 1.0, t_service, s_service, read_through=True)
+
+    def scenario():
+        first = yield env.process(q.process_request("read", 7))
+        second = yield env.process(q.process_request("read", 7))
+        assert first == second == "s_data"
+
+    env.process(scenario())
+    env.run()
+
+    assert t_service.storage.get(7) == "s_data"
+    assert q.read_through_fills == 1
+    assert q.s_fallback_reads == 1
+    assert s_service.reads == 1
+
+
+def test_q_single_flight_coalesces_concurrent_misses(env):
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.5, 10)
+    s_service.storage[8] = "s_data"
+    q = ServiceQ(env, 1.0, t_service, s_service, single_flight=True)
+
+    results = []
+
+    def reader():
+        results.append((yield env.process(q.process_request("read", 8))))
+
+    for _ in range(3):
+        env.process(reader())
+    env.run()
+
+    assert results == ["s_data"] * 3
+    assert s_service.reads == 1
+    assert q.coalesced_reads == 2
+
+
+def test_q_single_flight_shares_errors(env):
+    """Ошибка единственного чтения S достается всем ожидающим, а симуляция не падает."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 0.5, 10)
+    q = ServiceQ(env, 1.0, t_service, s_service, single_flight=True)
+
+    results = []
+
+    def reader():
+        results.append((yield env.process(q.process_request("read", 9))))
+
+    env.process(reader())
+    env.process(reader())
+    env.run()
+
+    assert len(results) == 2
+    assert all(res.startswith("ERROR") and "not found" in res for res in results)
+    assert s_service.reads == 1
+
+
+class ScriptedS:
+    """S с заданными по порядку временами чтения; без ограничения слотов."""
+
+    def __init__(self, env, read_times):
+        self.env = env
+        self.read_times = list(read_times)
+        self.active = 0
+
+    def read(self, req_id):
+        self.active += 1
+        try:
+            yield self.env.timeout(self.read_times.pop(0))
+        finally:
+            self.active -= 1
+        return f"data_{req_id}"
+
+
+def test_q_hedged_read_wins_and_cancels_loser(env):
+    """Медленное первое чтение: через hedge_delay уходит второе, первое прерывается."""
+    s_service = ScriptedS(env, [5.0, 0.5])
+    q = ServiceQ(
+        env, 10.0, ServiceT(env, 0.0, 0.0), s_service, hedge_reads=True, hedge_delay=1.0
+    )
+    process = env.process(q.process_request("read", 1))
+    env.run(until=process)
+
+    assert process.value == "data_1"
+    assert env.now == 1.5
+    assert s_service.active == 0
+    assert q.stats()["hedged_reads"] == 1
+    assert q.hedge_wins == 1
+    assert q.cancelled_reads == 1
+
+
+def test_q_hedged_read_with_per_call_timeouts(env):
+    """Без DeadlineScheduler второе чтение тоже уходит через hedge_delay, а не считается таймаутом."""
+    s_service = ScriptedS(env, [5.0, 0.5])
+    q = ServiceQ(
+        env,
+        10.0,
+        ServiceT(env, 0.0, 0.0),
+        s_service,
+        hedge_reads=True,
+        hedge_delay=1.0,
+        cancellable_timeouts=False,
+    )
+    process = env.process(q.process_request("read", 1))
+    env.run(until=process)
+
+    assert process.value == "data_1"
+    assert env.now == 1.5
+    assert q.hedged_reads == 1
+
+
+def test_q_hedge_delay_does_not_use_deadline_scheduler(env):
+    """Задержка второго чтения — обычный таймер: дедлайн у hedged-чтения один, response_timeout."""
+    s_service = ScriptedS(env, [5.0, 0.5])
+    q = ServiceQ(
+        env, 10.0, ServiceT(env, 0.0, 0.0), s_service, hedge_reads=True, hedge_delay=1.0
+    )
+    with patch.object(q.deadlines, "schedule", wraps=q.deadlines.schedule) as schedule:
+        process = env.process(q.process_request("read", 1))
+        env.run(until=process)
+
+    assert q.hedged_reads == 1
+    # Единственный дедлайн — response_timeout hedged-чтения S
+    assert [call.args for call in schedule.call_args_list] == [(10.0,)]
+
+
+def test_q_hedged_read_not_sent_for_fast_reads(env):
+    s_service = ScriptedS(env, [0.5])
+    q = ServiceQ(
+        env, 10.0, ServiceT(env, 0.0, 0.0), s_service, hedge_reads=True, hedge_delay=1.0
+    )
+    process = env.process(q.process_request("read", 1))
+    env.run()
+
+    assert process.value == "data_1"
+    assert q.hedged_reads == 0
+    assert q.s_read_latency.count == 1
+
+
+def test_q_hedge_delay_from_percentile(env):
+    """Без hedge_delay задержка — перцентиль латентности, после hedge_min_samples чтений."""
+    q = ServiceQ(
+        env,
+        10.0,
+        ServiceT(env, 0.0, 0.0),
+        ScriptedS(env, []),
+        hedge_reads=True,
+        hedge_percentile=0.5,
+        hedge_min_samples=3,
+    )
+    q.s_read_latency.add(1.0)
+    q.s_read_latency.add(2.0)
+    assert q.current_hedge_delay() is None
+    q.s_read_latency.add(3.0)
+    assert q.current_hedge_delay() == pytest.approx(2.0, rel=0.02)
+
+
+def test_q_hedged_read_frees_s_slot(env):
+    """Прерванное чтение реального S сразу освобождает слот и учитывается в stats."""
+    s_service = ServiceS(env, 0.0, 0.0, 0.1, 4.0, 2)
+    s_service.storage[1] = "s_data"
+    q = ServiceQ(
+        env, 10.0, ServiceT(env, 0.0, 0.0), s_service, hedge_reads=True, hedge_delay=0.01
+    )
+    with patch("services.service_s.random.uniform", side_effect=[3.0, 0.5]):
+        process = env.process(q.process_request("read", 1))
+        env.run(until=process)
+
+    assert process.value == "s_data"
+    assert env.now == pytest.approx(0.51)
+    assert s_service.resource.count == 0
+    assert s_service.stats()["cancelled_reads"] == 1
+    assert s_service.busy_time == pytest.approx(1.01)
+
+
+def test_q_propagates_deadline_to_s(env):
+    """S получает дедлайн вызова и сразу отказывает записи, которой не хватит остатка."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1, expected_service_time=1.0)
+    q = ServiceQ(
+        env,
+        response_timeout=1.5,
+        service_t=t_service,
+        service_s=s_service,
+        propagate_deadlines=True,
+    )
+    results = []
+
+    def writer(req_id):
+        res = yield env.process(q.process_request("write", req_id, "d"))
+        results.append((env.now, res))
+
+    env.process(writer(1))
+    env.process(writer(2))
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    # Вторая запись получила слот в 1.0, до дедлайна 1.5 меньше оценки 1.0:
+    # ошибка без ожидания таймаута
+    assert results[0] == (1.0, "OK")
+    assert results[1][0] == 1.0
+    assert "deadline expired" in results[1][1]
+    assert s_service.stats()["expired"] == 1
+
+
+def test_q_expired_s_call_is_not_retried_or_counted_by_breaker(env):
+    """Сброс по дедлайну — не сбой S: без повтора и без отказа в окне автомата."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1, expected_service_time=1.0)
+    policy = RetryPolicy(env, max_attempts=3)
+    breaker = CircuitBreaker(env, "Q.S", min_calls=1, failure_threshold=0.5)
+    q = ServiceQ(
+        env,
+        response_timeout=1.5,
+        service_t=t_service,
+        service_s=s_service,
+        s_retry=policy,
+        s_breaker=breaker,
+        propagate_deadlines=True,
+    )
+    results = []
+
+    def writer(req_id):
+        results.append((yield env.process(q.process_request("write", req_id, "d"))))
+
+    env.process(writer(1))
+    env.process(writer(2))
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    assert results[0] == "OK"
+    assert "deadline expired" in results[1]
+    assert policy.retries == 0
+    assert policy.exhausted == 0
+    assert s_service.writes == 1
+    assert breaker.state == "closed"
+    assert breaker.opened == 0
+
+
+def test_q_read_through_does_not_overwrite_newer_write(env):
+    """Медленное чтение S не затирает в T значение записи, начавшейся во время чтения."""
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 2)
+    s_service.storage[7] = "old"
+    q = ServiceQ(env, 5.0, t_service, s_service, read_through=True)
+    results = []
+
+    def reader():
+        results.append((yield env.process(q.process_request("read", 7))))
+
+    def writer():
+        yield env.timeout(0.5)
+        results.append((yield env.process(q.process_request("write", 7, "new"))))
+
+    env.process(reader())
+    env.process(writer())
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    assert results == ["old", "OK"]
+    assert t_service.storage.get(7) == "new"
+    assert q.read_through_fills == 0
+    assert q.read_through_skips == 1
+
+
+def test_q_read_through_skips_fill_after_write_evicted_from_t(env):
+    """Новое значение уже вытеснено из T: версия записи все равно не дает положить старое."""
+    t_service = ServiceT(env, 0.0, 0.0, capacity=1)
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 3)
+    s_service.storage[7] = "old"
+    q = ServiceQ(env, 5.0, t_service, s_service, read_through=True)
+
+    def writer(delay, req_id, data):
+        yield env.timeout(delay)
+        yield env.process(q.process_request("write", req_id, data))
+
+    env.process(q.process_request("read", 7))
+    env.process(writer(0.5, 7, "new"))
+    env.process(writer(0.6, 8, "other"))
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    assert 7 not in t_service.storage
+    assert s_service.storage[7] == "new"
+    assert q.read_through_skips == 1
+    assert not q._fill_versions
@@ -2,7 +2,7 @@ from unittest.mock import patch
 
 import pytest
 
-from services import ServiceS
+from services import DeadlineExceededError, ServiceS, StageStats
 
 
 def test_s_write_read_success(env):
@@ -197,3 +197,246 @@ def test_s_queue_concurrency(env):
     assert fourth_op_end > min(first_op_end, second_op_end, third_op_end)
 
     print("S: concurrency queue test passed")
+
+
+def test_s_records_queue_wait_and_service(env):
+    """Ожидание слота и время обслуживания записываются раздельно."""
+    stages = StageStats()
+    s_service = ServiceS(
+        env,
+        read_failure_probability=0.0,
+        write_failure_probability=0.0,
+        max_write_time=0.5,
+        max_read_time=0.5,
+        concurrency_limit=1,
+        stages=stages,
+    )
+
+    env.process(s_service.write(1, "a"))
+    env.process(s_service.write(2, "b"))
+    env.run()
+
+    summary = stages.summary()
+    assert summary["S.queue"]["write"]["count"] == 2
+    assert summary["S.service"]["write"]["count"] == 2
+    # Первая запись получила слот сразу, вторая ждала, пока первая его освободит
+    queue = stages.sketches[("S.queue", "write")]
+    assert queue.zero_count == 1
+    assert queue.max > 0
+
+
+def test_s_utilization(env):
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 2)
+
+    def scenario():
+        with patch("random.uniform", return_value=1.0):
+            yield env.process(s_service.write(1, "data"))
+        yield env.timeout(1.0)
+
+    env.process(scenario())
+    env.run()
+
+    stats = s_service.stats()
+    assert stats["writes"] == 1
+    assert stats["busy_time"] == 1.0
+    # Один из двух слотов занят 1 из 2 единиц времени
+    assert stats["utilization"] == 0.25
+
+
+def test_s_group_commit_batches_concurrent_writes(env):
+    """Одновременные записи фиксируются одной операцией стоимостью fixed + n * per_item."""
+    s_service = ServiceS(
+        env,
+        0.0,
+        0.0,
+        1.0,
+        1.0,
+        1,
+        group_commit=True,
+        max_batch=8,
+        linger=0.1,
+        fixed_cost=1.0,
+        per_item_cost=0.1,
+    )
+    finished = []
+
+    def writer(req_id):
+        yield env.process(s_service.write(req_id, f"data_{req_id}"))
+        finished.append(env.now)
+
+    for req_id in range(5):
+        env.process(writer(req_id))
+    env.run()
+
+    # linger 0.1 + (1.0 + 5 * 0.1)
+    assert finished == [pytest.approx(1.6)] * 5
+    assert s_service.storage == {i: f"data_{i}" for i in range(5)}
+    stats = s_service.stats()
+    assert stats["batches"] == 1
+    assert stats["avg_batch_size"] == 5
+    assert stats["busy_time"] == pytest.approx(1.5)
+
+
+def test_s_group_commit_respects_max_batch(env):
+    s_service = ServiceS(
+        env, 0.0, 0.0, 1.0, 1.0, 1, group_commit=True, max_batch=3, linger=10.0, fixed_cost=1.0
+    )
+    for req_id in range(7):
+        env.process(s_service.write(req_id, "d"))
+    env.run()
+
+    stats = s_service.stats()
+    assert stats["writes"] == 7
+    assert stats["max_batch_size"] == 3
+    # Полные группы не ждут linger; последняя неполная ждет
+    assert stats["batches"] == 3
+
+
+def test_s_group_commit_failure_fails_whole_batch(env):
+    s_service = ServiceS(
+        env, 0.0, 1.0, 1.0, 1.0, 1, group_commit=True, max_batch=4, linger=0.1
+    )
+    errors = []
+
+    def writer(req_id):
+        try:
+            yield env.process(s_service.write(req_id, "d"))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    for req_id in range(3):
+        env.process(writer(req_id))
+    env.run()
+
+    assert errors == ["S failed"] * 3
+    assert not s_service.storage
+
+
+def run_concurrently(env, operations):
+    """Запускает операции S одновременно и возвращает имена в порядке завершения."""
+    done = []
+
+    def run(name, operation):
+        try:
+            yield env.process(operation)
+        except RuntimeError:
+            pass
+        done.append(name)
+
+    for name, operation in operations:
+        env.process(run(name, operation))
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+    return done
+
+
+@pytest.mark.parametrize(
+    "scheduler, expected",
+    [("fifo", ["w1", "w2", "r"]), ("priority", ["w1", "r", "w2"])],
+)
+def test_s_priority_scheduler_serves_reads_first(env, scheduler, expected):
+    """Со строгим приоритетом чтение обгоняет ждущую запись, в FIFO — нет."""
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1, scheduler=scheduler)
+    s_service.storage[1] = "a"
+    done = run_concurrently(
+        env,
+        [
+            ("w1", s_service.write(1, "b")),
+            ("w2", s_service.write(2, "c")),
+            ("r", s_service.read(1)),
+        ],
+    )
+    assert done == expected
+
+
+def test_s_edf_serves_earliest_deadline_first(env):
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1, scheduler="edf")
+    s_service.storage[1] = "a"
+    done = run_concurrently(
+        env,
+        [
+            ("w", s_service.write(2, "b")),
+            ("late", s_service.read(1, deadline=10.0)),
+            ("early", s_service.read(1, deadline=5.0)),
+            ("none", s_service.read(1)),
+        ],
+    )
+    # Операции без дедлайна — последними
+    assert done == ["w", "early", "late", "none"]
+
+
+def test_s_wfq_shares_slots_by_class_weight(env):
+    """Метки wfq: при весе чтений 3 два чтения проходят раньше ждущих записей."""
+    s_service = ServiceS(
+        env, 0.0, 0.0, 1.0, 1.0, 1, scheduler="wfq", class_weights={"read": 3.0}
+    )
+    s_service.storage[1] = "a"
+    done = run_concurrently(
+        env,
+        [
+            ("w0", s_service.write(1, "b")),
+            ("w1", s_service.write(2, "c")),
+            ("w2", s_service.write(3, "d")),
+            ("r1", s_service.read(1)),
+            ("r2", s_service.read(1)),
+        ],
+    )
+    assert done == ["w0", "r1", "r2", "w1", "w2"]
+
+
+def test_s_drops_work_past_deadline(env):
+    """Операция, чей дедлайн наступил до получения слота, не занимает его и считается в expired.
+
+    Фактическое время обслуживания S заранее не знает: операция, которая опоздает
+    уже в процессе выполнения, обслуживается.
+    """
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1)
+    s_service.storage[1] = "a"
+    errors = []
+
+    def read(deadline):
+        try:
+            yield env.process(s_service.read(1, deadline=deadline))
+        except DeadlineExceededError as e:
+            errors.append((env.now, str(e)))
+
+    env.process(s_service.write(2, "b"))
+    env.process(read(0.8))
+    env.process(read(1.5))
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    # Слот освободился в 1.0: дедлайн первого чтения прошел, второе выполняется до 2.0
+    assert errors == [(1.0, "S deadline expired")]
+    assert env.now == 2.0
+    stats = s_service.stats()
+    assert stats["reads"] == 1
+    assert stats["busy_time"] == 2.0
+    assert stats["expired"] == 1
+    assert stats["classes"]["read"]["expired"] == 1
+    assert stats["classes"]["read"]["count"] == 1
+    # Чтение ждало слот 1.0 и обслуживалось 1.0
+    assert stats["classes"]["read"]["max"] == pytest.approx(2.0, rel=0.01)
+    assert stats["classes"]["write"]["count"] == 1
+
+
+def test_s_expected_service_time_drops_work_early(env):
+    """С оценкой времени обслуживания S сбрасывает операцию, которой не хватит остатка."""
+    s_service = ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1, expected_service_time=0.6)
+    s_service.storage[1] = "a"
+    env.process(s_service.write(2, "b"))
+    late = env.process(s_service.read(1, deadline=1.5))
+    late.defused = True
+    in_time = env.process(s_service.read(1, deadline=1.7))
+    # Слот освобождается в 1.0: остатка 0.5 меньше оценки 0.6, остатка 0.7 хватает
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    assert isinstance(late.value, DeadlineExceededError)
+    assert in_time.value == "a"
+    assert s_service.expired == {"read": 1, "write": 0}
+
+
+def test_s_unknown_scheduler(env):
+    with pytest.raises(ValueError, match="Unknown S scheduler"):
+        ServiceS(env, 0.0, 0.0, 1.0, 1.0, 1, scheduler="lifo")
@@ -40,3 +40,30 @@ def test_t_write_error(env):
     with pytest.raises(RuntimeError, match="failed"):
         t_service.write(1, "data")
     print("T: write error test passed")
+
+
+def test_t_capacity_and_stats(env):
+    """Переполненный кеш вытесняет ключи; промахи и попадания считаются."""
+    t_service = ServiceT(env, 0.0, 0.0, capacity=2, eviction_policy="lru")
+    for key in (1, 2, 3):
+        t_service.write(key, f"data_{key}")
+    assert len(t_service.storage) == 2
+
+    with pytest.raises(RuntimeError, match="data not found"):
+        t_service.read(1)
+    assert t_service.read(3) == "data_3"
+
+    stats = t_service.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["hit_ratio"] == pytest.approx(0.5)
+
+
+def test_t_ttl_uses_sim_time(env):
+    t_service = ServiceT(env, 0.0, 0.0, eviction_policy="ttl", ttl=2.0)
+    t_service.write(1, "data")
+    env.run(until=3.0)
+    with pytest.raises(RuntimeError, match="data not found"):
+        t_service.read(1)
+    assert t_service.stats()["expirations"] == 1
@@ -0,0 +1,76 @@
+import csv
+
+import sweep
+from sweep import (
+    apply_point,
+    config_hash,
+    export_table,
+    flatten_config,
+    grid_design,
+    lhs_design,
+    random_design,
+    run_sweep,
+)
+
+
+def test_grid_design():
+    points = grid_design({"P.num_users": [1, 2], "S.concurrency_limit": [1, 2, 3]})
+    assert len(points) == 6
+    assert {"P.num_users": 2, "S.concurrency_limit": 3} in points
+
+
+def test_lhs_design_stratified():
+    """В каждом из n интервалов ровно одна точка, целочисленные границы дают int."""
+    n = 10
+    points = lhs_design({"P.mean_interarrival": (0.0, 1.0), "P.num_users": (1, 100)}, n, seed=1)
+    bins = sorted(int(p["P.mean_interarrival"] * n) for p in points)
+    assert bins == list(range(n))
+    assert all(isinstance(p["P.num_users"], int) for p in points)
+
+
+def test_random_design_choices():
+    points = random_design({"P.arrival_process": ["poisson", "fixed_interval"]}, 5, seed=3)
+    assert all(p["P.arrival_process"] in ("poisson", "fixed_interval") for p in points)
+
+
+def test_apply_point_and_hash(sim_config):
+    cfg = apply_point(sim_config, {"S.concurrency_limit": 7})
+    assert cfg["S"]["concurrency_limit"] == 7
+    assert sim_config["S"]["concurrency_limit"] == 3
+    assert config_hash(cfg) != config_hash(sim_config)
+    assert flatten_config(cfg)["S.concurrency_limit"] == 7
+
+
+def test_run_sweep_uses_cache(sim_config, tmp_path):
+    """Повторный свип берет все точки из кеша, изменённая точка пересчитывается."""
+    points = grid_design({"P.mean_interarrival": [0.1, 0.2]})
+    first = run_sweep(sim_config, points, workers=1, cache_dir=tmp_path)
+    assert not any(row["cached"] for row in first)
+
+    second = run_sweep(sim_config, points, workers=1, cache_dir=tmp_path)
+    assert all(row["cached"] for row in second)
+    assert [r["errors"] for r in first] == [r["errors"] for r in second]
+
+    points[1]["P.mean_interarrival"] = 0.3
+    third = run_sweep(sim_config, points, workers=1, cache_dir=tmp_path)
+    assert [row["cached"] for row in third] == [True, False]
+
+    path = tmp_path / "sweep.csv"
+    export_table(third, path)
+    with open(path, newline="") as f:
+        table = list(csv.DictReader(f))
+    assert len(table) == 2
+    assert {"P.mean_interarrival", "successes", "errors", "avg_time"} <= set(table[0])
+
+
+def test_run_sweep_cache_is_keyed_on_model_code(sim_config, tmp_path, monkeypatch):
+    """После изменения кода модели старые результаты из кеша не берутся."""
+    points = grid_design({"P.mean_interarrival": [0.2]})
+    run_sweep(sim_config, points, workers=1, cache_dir=tmp_path)
+    assert run_sweep(sim_config, points, workers=1, cache_dir=tmp_path)[0]["cached"]
+
+    monkeypatch.setattr(sweep, "_code_digest", "changed model")
+    row = run_sweep(sim_config, points, workers=1, cache_dir=tmp_path)[0]
+    assert not row["cached"]
+    # Хеш конфига (и выведенный из него seed) от кода не зависит
+    assert row["config_hash"] == config_hash(apply_point(sim_config, points[0]))
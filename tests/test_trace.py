@@ -0,0 +1,125 @@
+import pytest
+
+from main import run_simulation
+from services import TraceReplayP, read_trace, write_trace
+from services.trace import trace_user
+
+RECORDS = [
+    (100.0, "write", 1, 10),
+    (101.0, "write", 2, 20),
+    (102.0, "read", 1, 0),
+    (104.0, "read", 3, 0),
+]
+
+
+class EchoQ:
+    """Q, мгновенно отвечающий OK и запоминающий запросы."""
+
+    def __init__(self, env):
+        self.env = env
+        self.requests = []
+
+    def process_request(self, req_type, req_id, data=None):
+        self.requests.append((self.env.now, req_type, req_id, data))
+        return "OK"
+        yield
+
+
+@pytest.mark.parametrize("name", ["trace.jsonl", "trace.bin"])
+def test_trace_round_trip(tmp_path, name):
+    path = tmp_path / name
+    write_trace(path, RECORDS)
+    assert list(read_trace(path)) == RECORDS
+
+
+def test_binary_trace_is_read_lazily(tmp_path, monkeypatch):
+    """Бинарная трасса читается блоками, а не целиком."""
+    monkeypatch.setattr("services.trace.READ_CHUNK_RECORDS", 2)
+    path = tmp_path / "trace.bin"
+    write_trace(path, RECORDS)
+    records = read_trace(path)
+    assert next(records) == RECORDS[0]
+    assert list(records) == RECORDS[1:]
+
+
+def test_truncated_binary_trace(tmp_path):
+    path = tmp_path / "trace.bin"
+    write_trace(path, RECORDS)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="Truncated"):
+        list(read_trace(path))
+
+
+def test_replay_with_speedup(env, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    write_trace(path, RECORDS)
+    q = EchoQ(env)
+    p = TraceReplayP(env, q, path, speedup=2.0)
+    env.run(until=p.action)
+
+    assert q.requests == [
+        (0.0, "write", 1, 10),
+        (0.5, "write", 2, 20),
+        (1.0, "read", 1, None),
+        (2.0, "read", 3, None),
+    ]
+    assert len(p.results) == 4
+    assert p.written_ids == []
+
+
+def test_replay_splits_keys_between_users(env, tmp_path):
+    path = tmp_path / "trace.bin"
+    records = [(float(i), "write", i % 17, 1) for i in range(200)]
+    write_trace(path, records)
+    q = EchoQ(env)
+    users = [
+        TraceReplayP(env, q, path, user=i, num_users=3, name=f"P{i}") for i in range(3)
+    ]
+    env.run(until=env.all_of([p.action for p in users]))
+
+    assert len(q.requests) == 200
+    for i, p in enumerate(users):
+        keys = set(p.results.req_id.tolist())
+        assert all(trace_user(key, 3) == i for key in keys)
+    # Время отправки сохраняется при делении между пользователями
+    assert sorted(t for t, *_ in q.requests) == [float(i) for i in range(200)]
+
+
+def test_run_simulation_from_trace(sim_config, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    records = [(i * 0.1, "read" if i % 2 else "write", i // 2, 8) for i in range(60)]
+    write_trace(path, records)
+    sim_config["P"].update(trace_path=str(path), trace_speedup=2.0, num_users=2)
+    sim_config["metrics_mode"] = "streaming"
+
+    summary = run_simulation(sim_config)
+    assert summary["successes"] + summary["errors"] == 60
+    assert summary["P"]["offered_load"] == pytest.approx(60 / 2.95)
+
+
+def test_jsonl_string_keys_get_integer_ids(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    write_trace(
+        path,
+        [
+            (0.0, "write", "user:0", 1),
+            (1.0, "write", 7, 1),
+            (2.0, "read", "user:0", 0),
+            (3.0, "read", "user:1", 0),
+        ],
+    )
+    assert [key for _, _, key, _ in read_trace(path)] == [-1, 7, -1, -2]
+
+
+def test_run_simulation_from_trace_with_string_keys(sim_config, tmp_path):
+    """Трасса со строковыми ключами проходит в режиме detailed (ключ в рекордере — int64)."""
+    path = tmp_path / "trace.jsonl"
+    records = [
+        (i * 0.1, "read" if i % 2 else "write", f"user:{i // 2}", 8) for i in range(40)
+    ]
+    write_trace(path, records)
+    sim_config["P"].update(trace_path=str(path), num_users=2)
+
+    summary = run_simulation(sim_config)
+    assert summary["successes"] + summary["errors"] == 40
+    assert sorted(set(summary["details"].req_id)) == list(range(-20, 0))
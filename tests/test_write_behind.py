@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+from main import run_simulation
+from services import ServiceQ, ServiceS, ServiceT
+
+
+def make_q(env, capacity=10, flush_workers=1, s_write_failure=0.0, timeout=100.0):
+    t_service = ServiceT(env, 0.0, 0.0)
+    s_service = ServiceS(env, 0.0, s_write_failure, 1.0, 0.1, 3)
+    q = ServiceQ(
+        env,
+        timeout,
+        t_service,
+        s_service,
+        write_policy="write_behind",
+        write_queue_size=capacity,
+        flush_workers=flush_workers,
+    )
+    return q, s_service
+
+
+def test_write_behind_acks_after_t(env):
+    """Запись подтверждается сразу после T, S получает ее позже."""
+    q, s_service = make_q(env)
+
+    def scenario():
+        res = yield env.process(q.process_request("write", 1, "data"))
+        assert res == "OK"
+        assert env.now == 0
+        assert 1 not in s_service.storage
+
+    env.process(scenario())
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    assert s_service.storage[1] == "data"
+    stats = q.write_behind.stats()
+    assert stats["flushed"] == 1
+    assert stats["lag_mean"] == 1.0
+
+
+def test_write_behind_counts_lost_writes(env):
+    q, s_service = make_q(env, s_write_failure=1.0)
+
+    def scenario():
+        for req_id in range(3):
+            res = yield env.process(q.process_request("write", req_id, "data"))
+            assert res == "OK"
+
+    env.process(scenario())
+    env.run()
+
+    stats = q.write_behind.stats()
+    assert stats["lost"] == 3
+    assert stats["flushed"] == 0
+    assert not s_service.storage
+    assert not q.write_behind.unflushed
+
+
+def test_write_behind_full_queue_backpressure(env):
+    """Переполненная очередь задерживает подтверждение, а по таймауту — ошибка."""
+    q, _ = make_q(env, capacity=1, timeout=0.5)
+    results = []
+
+    def writer(req_id):
+        results.append((yield env.process(q.process_request("write", req_id, "d"))))
+
+    # Первую запись забирает воркер, вторая занимает очередь, третья ждет места
+    for req_id in range(3):
+        env.process(writer(req_id))
+    with patch("random.uniform", return_value=1.0):
+        env.run()
+
+    assert results.count("OK") == 2
+    assert results[-1] == "ERROR: write-behind queue full"
+    stats = q.write_behind.stats()
+    assert stats["enqueued"] == 2
+    assert stats["max_depth"] == 1
+
+
+def test_run_simulation_drains_write_behind(sim_config):
+    sim_config["Q"]["write_policy"] = "write_behind"
+    sim_config["S"]["write_failure_probability"] = 0.0
+    summary = run_simulation(sim_config)
+
+    stats = summary["Q"]["write_behind"]
+    assert stats["pending"] == 0
+    assert stats["flushed"] == stats["enqueued"]